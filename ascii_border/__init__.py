@@ -1,4 +1,6 @@
 """
 ASCII Border
 """
-__version__ = "0.1.0"
\ No newline at end of file
+__version__ = "0.1.0"
+
+from .core import render_ascii_border  # noqa: E402
@@ -6,15 +6,27 @@ Wraps an existing image with an ASCII-art border, preserving the original center
 """
 import argparse
 import sys
-from PIL import Image, ImageDraw, ImageFont
 
-def parse_args():
+from asciiart_common.batch import (
+    add_batch_arguments, batch_exit_code, check_io_arguments, run_batch)
+from asciiart_common.cache import add_result_cache_arguments, run_cached
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import add_input_arguments, add_output_arguments
+from asciiart_common.profile import add_profile_argument, write_records
+from asciiart_common.serve import serve_main
+
+from .canvas import MATCH_MODES
+from .core import process, warm
+from .maskcache import DEFAULT_MEMORY_MB
+from .text import add_text_arguments, text_outputs
+
+def build_parser():
     parser = argparse.ArgumentParser(
         description="Add an ASCII art border to an image, preserving the original center.")
     parser.add_argument(
-        "input", help="Path to the input image file")
+        "input", nargs="?", help="Path to the input image file")
     parser.add_argument(
-        "output", help="Path to save the output image file")
+        "output", nargs="?", help="Path to save the output image file")
     parser.add_argument(
         "--border", type=int, default=10,
         help="Border thickness in characters (default: 10)")
@@ -26,124 +38,83 @@ def parse_args():
     parser.add_argument(
         "--chars", default="@%#*+=-:. ",
         help="Characters ordered dark-to-light for ASCII art (default: '@%#*+=-:. ')")
+    parser.add_argument(
+        "--match", choices=MATCH_MODES, default="ramp",
+        help="Glyph per cell: by brightness along --chars (ramp, the default) or the glyph "
+             "whose bitmap best fits the cell's full-resolution luminance (shape)")
     parser.add_argument(
         "--color", action="store_true",
         help="Colorize ASCII characters sampling from original image")
     parser.add_argument(
         "--fade", type=int, default=None,
         help="Fade width in characters (default: same as --border)")
-    return parser.parse_args()
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Render in horizontal strips so peak memory follows the strip size, not the image size")
+    parser.add_argument(
+        "--strip_rows", type=int, default=32,
+        help="Character rows per strip with --stream (default: 32)")
+    parser.add_argument(
+        "--glyph_cache", default=None,
+        help="Directory for the persistent glyph atlas cache "
+             "(default: $ASCIIART_GLYPH_CACHE or ~/.cache/asciiart/glyphs)")
+    parser.add_argument(
+        "--no_glyph_cache", action="store_true",
+        help="Do not read or write the on-disk glyph atlas cache")
+    parser.add_argument(
+        "--mask_cache", default=None,
+        help="Directory for an on-disk cache of full-resolution masks shared across runs "
+             "(default: $ASCIIART_MASK_CACHE, or memory only)")
+    parser.add_argument(
+        "--mask_cache_mb", type=int, default=DEFAULT_MEMORY_MB,
+        help="Memory for masks reused across same-size images, in MB; 0 disables "
+             "(default: 256)")
+    parser.add_argument(
+        "--threads", type=int, default=1,
+        help="Threads rendering bands of one image in parallel, 0 for one per CPU; "
+             "the output is identical (default: 1; not used with --stream)")
+    add_text_arguments(parser)
+    add_input_arguments(parser)
+    add_output_arguments(parser)
+    add_batch_arguments(parser)
+    add_result_cache_arguments(parser)
+    add_profile_argument(parser)
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not text_outputs(args):
+        check_io_arguments(parser, args)
+    elif args.batch:
+        parser.error("--text_out/--ansi_out/--html_out cannot be combined with --batch")
+    elif not args.input:
+        parser.error("the following arguments are required: input")
+    return args
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        serve_main("ascii_border", sys.argv[2:])
+        return
     args = parse_args()
-
-    # Load original image
-    try:
-        img = Image.open(args.input).convert("RGB")
-    except Exception as e:
-        print(f"Error opening input image: {e}", file=sys.stderr)
-        sys.exit(1)
-    width, height = img.size
-
-    # Load font
-    if args.font:
-        try:
-            font = ImageFont.truetype(args.font, args.font_size)
-        except Exception as e:
-            print(f"Error loading font '{args.font}': {e}", file=sys.stderr)
-            sys.exit(1)
-    else:
-        try:
-            font = ImageFont.load_default()
-        except Exception:
-            print("Could not load default font; specify --font", file=sys.stderr)
-            sys.exit(1)
-
-    # Character cell size: use font metrics or mask as fallback
-    try:
-        # Preferred: getbbox returns (x0, y0, x1, y1)
-        bbox = font.getbbox("A")
-        cell_w = bbox[2] - bbox[0]
-        cell_h = bbox[3] - bbox[1]
-    except AttributeError:
-        # Fallback: getmask returns an image of the glyph
-        mask = font.getmask("A")
-        cell_w, cell_h = mask.size
-
-    # Grid size in characters
-    cols = width // cell_w
-    rows = height // cell_h
-    if cols < 1 or rows < 1:
-        print("Image too small for given font size.", file=sys.stderr)
-        sys.exit(1)
-
-    # Create grayscale thumbnail for ASCII conversion
-    gs = img.convert("L").resize((cols, rows), resample=Image.BILINEAR)
-
-    # Map brightness to ASCII chars
-    chars = args.chars
-    n_chars = len(chars)
-    ascii_grid = []
-    for y in range(rows):
-        row = []
-        for x in range(cols):
-            pixel = gs.getpixel((x, y))
-            idx = pixel * (n_chars - 1) // 255
-            row.append(chars[idx])
-        ascii_grid.append(row)
-
-    # Prepare ASCII canvas on white background
-    ascii_canvas = Image.new("RGB", (width, height), color="white")
-    draw = ImageDraw.Draw(ascii_canvas)
-    for y, row in enumerate(ascii_grid):
-        for x, ch in enumerate(row):
-            px = x * cell_w
-            py = y * cell_h
-            if args.color:
-                fill = img.getpixel((min(px, width-1), min(py, height-1)))
-            else:
-                fill = (0, 0, 0)
-            draw.text((px, py), ch, font=font, fill=fill)
-
-    # Determine fade parameters (in character cells)
-    border_chars = args.border
-    fade_chars = args.fade if args.fade is not None else border_chars
-    if fade_chars < 0:
-        print("Fade width must be non-negative.", file=sys.stderr)
-        sys.exit(1)
-    if fade_chars > border_chars:
-        fade_chars = border_chars
-
-    # Build per-cell mask (low-res) and scale to full image
-    # Mask value 255 = full ASCII, 0 = original image
-    cell_mask = Image.new("L", (cols, rows), 0)
-    for y in range(rows):
-        for x in range(cols):
-            d = min(x, cols - 1 - x, y, rows - 1 - y)
-            if d >= border_chars:
-                m = 0
-            elif d < border_chars - fade_chars:
-                m = 255
-            else:
-                m = int(round((border_chars - d) * 255.0 / fade_chars))
-                m = max(0, min(255, m))
-            cell_mask.putpixel((x, y), m)
-    mask = cell_mask.resize((width, height), resample=Image.NEAREST)
-
-    # Composite ASCII canvas over original image using mask
-    try:
-        result = Image.composite(ascii_canvas, img, mask)
-    except Exception as e:
-        print(f"Error compositing images: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    # Save output
+    if args.batch:
+        summary = run_batch(process, args, *args.batch, workers=args.workers, warm=warm)
+        sys.exit(batch_exit_code(summary))
     try:
-        result.save(args.output)
-        print(f"Saved bordered image to {args.output}")
-    except Exception as e:
-        print(f"Error saving output image: {e}", file=sys.stderr)
+        record, _ = run_cached(process, args, args.input, args.output)
+        if record is not None:
+            write_records(args.profile, [record])
+    except RenderError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
+    # Keep stdout for the grid when it is written there
+    texts = text_outputs(args)
+    log = sys.stderr if any(path == "-" for _, path in texts) else sys.stdout
+    for mode, path in texts:
+        if path != "-":
+            print(f"Saved {mode} grid to {path}", file=log)
+    if args.output:
+        print(f"Saved bordered image to {args.output}", file=log)
 
 if __name__ == "__main__":  # pragma: no cover
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,326 @@
+"""
+ASCII canvas assembly as whole-array NumPy operations.
+
+The canvas used to be drawn with one ``paste`` per visible cell. Here the
+Python work no longer depends on the grid size:
+
+1. A 256-entry lookup table maps the grayscale thumbnail to a ``(rows,
+   cols)`` array of ramp indices.
+2. Every glyph of the ramp is placed on a common frame anchored at its
+   cell's top-left corner. Glyphs overhang their cell (the cell size comes
+   from "A"), so the frame spans a few cells; cut into cell-sized tiles it
+   gives one layer per neighbour offset.
+3. A canvas region is white, then each layer is blended in: a gather
+   ``tile[idx]`` gives every cell's ink for that offset, and the ink color
+   is the cell's own color (black, or with ``--color`` the cell's average
+   color). Layers are applied in the order their cells would have been
+   pasted (row-major), with Pillow's rounding, so the result is
+   pixel-identical to pasting the glyphs one by one.
+
+Regions are assembled in blocks of whole cell rows to bound the
+temporaries.
+
+With ``--match shape`` step 1 is replaced by ``ShapeMatch``: the
+full-resolution luminance under every cell's glyph footprint is compared
+with every glyph's bitmap, and the glyph with the smallest sum of squared
+differences wins. The comparison is a few matrix products per block of
+cell rows.
+"""
+import numpy as np
+from PIL import Image
+
+from .glyphs import visible_cells
+from .masks import mask_ring
+from .tiles import cell_bands, run_bands
+
+# Pixels per block when assembling a canvas region or matching glyph shapes
+BLOCK_PIXELS = 1 << 20
+# Glyph selection: brightness ramp, or closest glyph bitmap (--match)
+MATCH_MODES = ("ramp", "shape")
+
+# Glyph stacks already built in this process
+_STACKS = {}
+
+
+def ramp_index(gs, chars):
+    """``(rows, cols)`` ramp indices of a grayscale thumbnail, via a 256-entry table."""
+    lut = (np.arange(256, dtype=np.int32) * (len(chars) - 1) // 255).astype(np.intp)
+    return lut[np.asarray(gs)]
+
+
+class ShapeMatch:
+    """
+    ``--match shape`` glyph indices of a ``(rows, cols)`` grid over an image
+    of ``size``, filled in from consecutive strips (``add``) and read from
+    ``idx``.
+
+    A glyph drawn in black on white turns its footprint (its cell and the
+    neighbours its ink overhangs into, see ``GlyphStack``) into ``255 -
+    ink``. For the luminance ``L`` under a cell's footprint and a glyph's
+    bitmap ``G`` the squared difference is ``|L|^2 - 2 L.G + |G|^2``, so the
+    best glyph is the argmin of ``|G|^2 - 2 L.G``: one product of a
+    ``(cells, pixels)`` and a ``(pixels, glyphs)`` matrix per cell offset of
+    the footprint, for a block of cell rows at a time. Beyond the image the
+    footprint is compared with white. The products are integers well within
+    float64 precision, so the scores are exact and the choice does not
+    depend on how the image is split into strips or blocks.
+    """
+
+    def __init__(self, stack, cols, rows, size):
+        self.cell_w = cw = stack.cell_w
+        self.cell_h = ch = stack.cell_h
+        self.extent = tx0, ty0, tx1, ty1 = stack.extent
+        self.size = size
+        # (pixels, glyphs) bitmaps of the glyphs at each cell offset they reach
+        self.offsets = []
+        self.norms = np.zeros(stack.blank)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                ink = stack.tiles[ty - ty0, tx - tx0][:stack.blank]
+                glyphs = (255.0 - ink.reshape(len(ink), -1)).T
+                self.offsets.append((ty - ty0, tx - tx0, glyphs))
+                self.norms += (glyphs ** 2).sum(axis=0)
+        self.idx = np.zeros((rows, cols), dtype=np.intp)
+        # Luminance rows not yet matched, from image row top, padded with
+        # white to the footprints' columns [tx0 * cw, (cols + tx1 + 1) * cw)
+        self.next = 0
+        self.top = ty0 * ch
+        self.lum = np.full((-ty0 * ch, (cols + tx1 - tx0 + 1) * cw), 255, dtype=np.uint8)
+
+    def add(self, y0, y1, strip):
+        """Take the next strip, image rows ``[y0, y1)``, and match every cell it completes."""
+        cw, ch = self.cell_w, self.cell_h
+        tx0, ty0, tx1, ty1 = self.extent
+        rows, cols = self.idx.shape
+        width, height = self.size
+        lum = np.full((y1 - y0, self.lum.shape[1]), 255, dtype=np.uint8)
+        x0, x1 = max(0, tx0 * cw), min(width, (cols + tx1 + 1) * cw)
+        lum[:, x0 - tx0 * cw:x1 - tx0 * cw] = np.asarray(
+            strip.crop((x0, 0, x1, y1 - y0)).convert("L"))
+        parts = [self.lum, lum]
+        if y1 >= height:
+            # White below the image, down to the last footprint's bottom
+            parts.append(np.full((max(0, (rows + ty1) * ch - y1), lum.shape[1]), 255,
+                                 dtype=np.uint8))
+        self.lum = np.concatenate(parts)
+        # Cell rows whose footprints are complete
+        ready = min(rows, (self.top + len(self.lum)) // ch - ty1)
+        step = max(1, BLOCK_PIXELS // max(1, self.lum.shape[1] * ch * (ty1 - ty0 + 1)))
+        for r in range(self.next, ready, step):
+            self._match(r, min(ready, r + step))
+        if ready > self.next:
+            self.next = ready
+            drop = (ready + ty0) * ch - self.top
+            self.lum = self.lum[drop:]
+            self.top += drop
+
+    def _match(self, r0, r1):
+        cw, ch = self.cell_w, self.cell_h
+        tx0, ty0, tx1, ty1 = self.extent
+        rows, cols = self.idx.shape
+        n = r1 - r0
+        a = (r0 + ty0) * ch - self.top
+        span = n + ty1 - ty0
+        # (cell rows, cell columns, pixels) blocks of the footprints' area
+        blocks = self.lum[a:a + span * ch].reshape(span, ch, -1, cw).transpose(0, 2, 1, 3)
+        blocks = blocks.reshape(span, blocks.shape[1], ch * cw).astype(np.float64)
+        dots = np.zeros((n * cols, len(self.norms)))
+        for dy, dx, glyphs in self.offsets:
+            cells = blocks[dy:dy + n, dx:dx + cols].reshape(n * cols, -1)
+            dots += cells @ glyphs
+        scores = self.norms - 2.0 * dots
+        self.idx[r0:r1] = scores.argmin(axis=1).reshape(n, cols)
+
+
+def glyph_index(img, gs, atlas, chars, cell_size, match="ramp"):
+    """
+    ``(rows, cols)`` indices into ``chars`` for the cells of ``img``: from
+    the grayscale thumbnail ``gs`` through the ramp, or with ``match``
+    ``"shape"`` the closest glyph bitmaps (see ``ShapeMatch``).
+    """
+    if match != "shape":
+        return ramp_index(gs, chars)
+    cols, rows = gs.size
+    shapes = ShapeMatch(glyph_stack(atlas, chars, *cell_size), cols, rows, img.size)
+    # Strips of whole cell rows bound the luminance copies
+    strip_h = max(1, BLOCK_PIXELS // max(1, img.width * cell_size[1])) * cell_size[1]
+    for y0 in range(0, img.height, strip_h):
+        y1 = min(img.height, y0 + strip_h)
+        shapes.add(y0, y1, img.crop((0, y0, img.width, y1)))
+    return shapes.idx
+
+
+def cell_colors(img, cols, rows, cell_w, cell_h):
+    """``(rows, cols, 3)`` average color of every cell, from one box resize."""
+    return np.asarray(img.resize((cols, rows), resample=Image.BOX,
+                                 box=(0, 0, cols * cell_w, rows * cell_h)))
+
+
+def _div255(v):
+    # Pillow's rounded division by 255 of a uint16 product sum
+    v += 128
+    v += v >> 8
+    v >>= 8
+    return v
+
+
+class GlyphStack:
+    """The ramp's glyphs as cell-sized tiles, one set per neighbour offset."""
+
+    def __init__(self, atlas, chars, cell_w, cell_h):
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        boxes = np.array([atlas.box(ch) for ch in chars], dtype=np.int64).reshape(-1, 4)
+        # Cell offsets (relative to the glyph's own cell) that its ink reaches
+        tx0 = min(0, int(boxes[:, 0].min()) // cell_w)
+        ty0 = min(0, int(boxes[:, 1].min()) // cell_h)
+        tx1 = max(0, -(-int(boxes[:, 2].max()) // cell_w) - 1)
+        ty1 = max(0, -(-int(boxes[:, 3].max()) // cell_h) - 1)
+        self.extent = tx0, ty0, tx1, ty1
+        nty, ntx = ty1 - ty0 + 1, tx1 - tx0 + 1
+        # One extra, empty glyph for cells that are not drawn
+        self.blank = len(chars)
+        frame = np.zeros((len(chars) + 1, nty * cell_h, ntx * cell_w), dtype=np.uint16)
+        for i, ch in enumerate(chars):
+            mask, (dx, dy) = atlas.glyph(ch)
+            if mask is not None:
+                x = dx - tx0 * cell_w
+                y = dy - ty0 * cell_h
+                frame[i, y:y + mask.height, x:x + mask.width] = np.asarray(mask)
+        # tiles[ty, tx] is the (glyphs, cell_h, cell_w) ink at cell offset (tx, ty)
+        self.tiles = np.ascontiguousarray(
+            frame.reshape(len(chars) + 1, nty, cell_h, ntx, cell_w).transpose(1, 3, 0, 2, 4))
+        # Offsets in paste order: a pixel's ink comes from cells (R - ty, C - tx),
+        # pasted in row-major order, i.e. by decreasing ty then tx
+        self.layers = [(ty, tx) for ty in range(ty1, ty0 - 1, -1)
+                       for tx in range(tx1, tx0 - 1, -1)
+                       if self.tiles[ty - ty0, tx - tx0].any()]
+
+    def render(self, idx, colors, box):
+        """
+        The canvas pixels in ``box`` ``(x0, y0, x1, y1)`` as an RGB image, for
+        glyph indices ``idx`` (``blank`` for undrawn cells) and per-cell
+        ``colors`` (``(rows, cols, 3)``, or None for black ink).
+        """
+        x0, y0, x1, y1 = box
+        cw, ch = self.cell_w, self.cell_h
+        c0, c1 = x0 // cw, -(-x1 // cw)
+        r0, r1 = y0 // ch, -(-y1 // ch)
+        step = max(1, BLOCK_PIXELS // max(1, (c1 - c0) * cw * ch))
+        planes = np.empty((1 if colors is None else 3, y1 - y0, x1 - x0), dtype=np.uint8)
+        for r in range(r0, r1, step):
+            block = self._assemble(idx, colors, r, min(r1, r + step), c0, c1)
+            a, b = max(y0, r * ch), min(y1, min(r1, r + step) * ch)
+            planes[:, a - y0:b - y0] = block[:, a - r * ch:b - r * ch, x0 - c0 * cw:x1 - c0 * cw]
+        if colors is None:
+            return Image.fromarray(planes[0]).convert("RGB")
+        return Image.merge("RGB", [Image.fromarray(p) for p in planes])
+
+    def _assemble(self, idx, colors, r0, r1, c0, c1):
+        """Channel planes of cell rows ``[r0, r1)`` and columns ``[c0, c1)``."""
+        tx0, ty0, tx1, ty1 = self.extent
+        n, m = r1 - r0, c1 - c0
+        # Source cells of every layer, with blank cells beyond the grid
+        ys = np.arange(r0 - ty1, r1 - ty0)
+        xs = np.arange(c0 - tx1, c1 - tx0)
+        vy = (ys >= 0) & (ys < idx.shape[0])
+        vx = (xs >= 0) & (xs < idx.shape[1])
+        src = np.full((len(ys), len(xs)), self.blank, dtype=np.intp)
+        src[np.ix_(vy, vx)] = idx[np.ix_(ys[vy], xs[vx])]
+        # Ink colors as per-channel cell grids; black ink needs no term
+        fills = []
+        if colors is not None:
+            rgb = np.zeros((3, len(ys), len(xs)), dtype=np.uint16)
+            rgb[:, vy[:, np.newaxis] & vx[np.newaxis, :]] = \
+                colors[np.ix_(ys[vy], xs[vx])].reshape(-1, 3).T
+            fills = list(rgb)
+        # Planar (channel, cell row, pixel row, cell column, pixel column) layout
+        # keeps every operation on contiguous arrays
+        out = np.full((max(1, len(fills)), n, self.cell_h, m, self.cell_w), 255, dtype=np.uint16)
+        term = np.empty(out.shape[1:], dtype=np.uint16)
+        for ty, tx in self.layers:
+            cells = (slice(ty1 - ty, ty1 - ty + n), slice(tx1 - tx, tx1 - tx + m))
+            ink = np.ascontiguousarray(
+                self.tiles[ty - ty0, tx - tx0][src[cells]].transpose(0, 2, 1, 3))
+            inv = 255 - ink
+            for c, plane in enumerate(out):
+                # out = (out * (255 - ink) + fill * ink) / 255, rounded as Pillow does
+                plane *= inv
+                if fills:
+                    np.multiply(fills[c][cells][:, np.newaxis, :, np.newaxis], ink, out=term)
+                    plane += term
+                _div255(plane)
+        return out.reshape(len(out), n * self.cell_h, m * self.cell_w).astype(np.uint8)
+
+
+def glyph_stack(atlas, chars, cell_w, cell_h):
+    """Return the process-wide glyph stack of a ramp in an atlas."""
+    key = (atlas.key, chars, cell_w, cell_h)
+    stack = _STACKS.get(key)
+    if stack is None:
+        stack = GlyphStack(atlas, chars, cell_w, cell_h)
+        _STACKS[key] = stack
+    return stack
+
+
+class CellGlyphs:
+    """Visible glyphs of the grid, drawable onto any horizontal strip."""
+
+    def __init__(self, atlas, chars, idx, cell_w, cell_h, cell_mask, size, colors=None):
+        self.size = size
+        self.colors = colors
+        self.stack = glyph_stack(atlas, chars, cell_w, cell_h)
+        visible = visible_cells(atlas, chars, idx, cell_w, cell_h, cell_mask, size)
+        self.cells = np.where(visible, idx, self.stack.blank)
+        # Only pixels inside the mask's ring can show the canvas
+        self.boxes = mask_ring(cell_mask, size)
+        # Visible cells in row-major order and the pixel rows their ink spans
+        self.ys, self.xs = np.nonzero(visible)
+        boxes = np.array([atlas.box(ch) for ch in chars], dtype=np.int64).reshape(-1, 4)
+        glyph = idx[self.ys, self.xs]
+        self.top = self.ys * cell_h + boxes[glyph, 1]
+        self.bottom = self.ys * cell_h + boxes[glyph, 3]
+
+    def draw(self, canvas, y0, y1, origin=None):
+        """
+        Draw the visible glyphs' ink in rows ``[y0, y1)`` onto ``canvas``,
+        whose first row is image row ``origin`` (default ``y0``), within the
+        mask's ring.
+        """
+        origin = y0 if origin is None else origin
+        for x0, by0, x1, by1 in self.boxes:
+            a, b = max(by0, y0), min(by1, y1)
+            if a < b:
+                canvas.paste(self.stack.render(self.cells, self.colors, (x0, a, x1, b)),
+                             (x0, a - origin))
+
+
+def canvas_key(atlas, chars, color, size, cell_size, match="ramp"):
+    """Everything an ASCII canvas depends on besides the image and the cell mask."""
+    return ("canvas", atlas.key, chars, bool(color), tuple(size), tuple(cell_size), match)
+
+
+def draw_ascii_canvas(img, gs, atlas, chars, cell_size, cell_mask, color=False, threads=1,
+                      match="ramp"):
+    """
+    White canvas the size of ``img`` with the glyphs of every cell visible
+    through ``cell_mask``, in black or (with ``color``) each cell's average
+    color of ``img``. ``gs`` is the grayscale thumbnail, one pixel per cell;
+    ``match`` selects the glyphs (see ``glyph_index``). Bands of cell rows
+    are assembled on ``threads`` threads (see ``ascii_border.tiles``).
+    Returns ``(canvas, cells_drawn)``.
+    """
+    cell_w, cell_h = cell_size
+    cols, rows = gs.size
+    # Map brightness (or cell shape) to indices into the ASCII ramp
+    idx = glyph_index(img, gs, atlas, chars, cell_size, match)
+    # Ink color per cell: black, or the cell's average color
+    colors = cell_colors(img, cols, rows, cell_w, cell_h) if color else None
+    # Rasterize each character once, then assemble the glyphs of the cells
+    # that can show through the mask onto a white canvas
+    atlas.prepare(chars)
+    glyphs = CellGlyphs(atlas, chars, idx, cell_w, cell_h, cell_mask, img.size, colors)
+    canvas = Image.new("RGB", img.size, color="white")
+    run_bands(lambda y0, y1: glyphs.draw(canvas, y0, y1, origin=0),
+              cell_bands(img.height, cell_h, threads), threads)
+    return canvas, len(glyphs.ys)
@@ -0,0 +1,170 @@
+"""
+Library entry points for the ASCII border filter.
+
+``render`` takes an RGB image and the parsed CLI options and returns the
+bordered image; ``process`` wraps it with decoding and saving for one file,
+and writes the text outputs (see ``ascii_border.text``).
+``render_ascii_border`` is the public entry point for in-memory images.
+Failures raise ``RenderError`` with the message the CLI prints.
+"""
+from PIL import Image
+
+from asciiart_common.api import like_input, resolve_options, to_image
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import open_rgb, save_image
+from asciiart_common.pipeline import NO_SHARING
+from asciiart_common.profile import NULL_PROFILER
+
+from .canvas import canvas_key, draw_ascii_canvas
+from .glyphs import atlas_cache_dir, cell_size, get_atlas, load_font
+from .maskcache import get_mask_cache
+from .masks import border_params, mask_ring, scaled_border_masks
+from .stream import render_stream
+from .text import text_outputs, write_text
+from .tiles import cell_bands, composite_bands, thread_count
+
+
+def warm(args):
+    """Load the font and glyph atlas ahead of the first render (e.g. per worker)."""
+    font = load_font(args.font, args.font_size)
+    get_atlas(font, args.font, cache_dir=atlas_cache_dir(args)).prepare(args.chars)
+
+
+def masks(args, size, cell_size, profiler=NULL_PROFILER):
+    """
+    Per-cell mask (``ascii_cells``) and its upscale to ``size`` (``ascii``),
+    reused across images of the same geometry. 255 selects the ASCII canvas
+    and 0 the original image.
+    """
+    # Determine fade parameters (in character cells)
+    border_chars, fade_chars = border_params(args)
+    return get_mask_cache(args).get(
+        ("ascii_border",) + tuple(size) + tuple(cell_size) + (border_chars, fade_chars),
+        lambda: scaled_border_masks(size, cell_size, border_chars, fade_chars,
+                                    thread_count(args)),
+        profiler)
+
+
+def register_canvas(size, args, shared, profiler=NULL_PROFILER):
+    """
+    Register the ASCII cells of a ``size`` render with ``shared`` so that
+    pipeline variants draw one canvas (see ``asciiart_common.pipeline``).
+    """
+    font = load_font(args.font, args.font_size)
+    cell = cell_size(font)
+    if size[0] < cell[0] or size[1] < cell[1]:
+        # render reports the error
+        return
+    atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+    shared.add_canvas_mask(canvas_key(atlas, args.chars, args.color, size, cell, args.match),
+                           masks(args, size, cell, profiler)["ascii_cells"])
+
+
+def render(img, args, font=None, profiler=NULL_PROFILER, shared=NO_SHARING):
+    """
+    Wrap ``img`` (RGB) with an ASCII-art border and return the result.
+    Stages are timed on ``profiler`` (see ``asciiart_common.profile``);
+    ``shared`` holds intermediates reused by pipeline variants of the same
+    image (see ``asciiart_common.pipeline``). With ``--threads`` the image
+    is rendered in bands on a thread pool (see ``ascii_border.tiles``).
+    """
+    width, height = img.size
+    threads = thread_count(args)
+
+    with profiler.stage("font"):
+        # Load font unless the caller passed a preloaded one
+        if font is None:
+            font = load_font(args.font, args.font_size)
+
+        # Character cell size: use font metrics or mask as fallback
+        cell_w, cell_h = cell_size(font)
+
+    # Grid size in characters
+    cols = width // cell_w
+    rows = height // cell_h
+    if cols < 1 or rows < 1:
+        raise RenderError("Image too small for given font size.")
+
+    # Create grayscale thumbnail for ASCII conversion
+    with profiler.stage("grayscale"):
+        gs = shared.get(
+            ("grayscale", cols, rows),
+            lambda: img.convert("L").resize((cols, rows), resample=Image.BILINEAR),
+            profiler)
+
+    with profiler.stage("masks"):
+        # Per-cell mask (low-res) scaled to full image
+        border_masks = masks(args, (width, height), (cell_w, cell_h), profiler)
+        cell_mask, mask = border_masks["ascii_cells"], border_masks["ascii"]
+
+    with profiler.stage("glyphs"):
+        # Glyphs of the cells that can show through the mask, on a white canvas
+        atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+        key = canvas_key(atlas, args.chars, args.color, (width, height), (cell_w, cell_h),
+                         args.match)
+        ascii_canvas, cells_drawn = shared.get(
+            key,
+            lambda: draw_ascii_canvas(img, gs, atlas, args.chars, (cell_w, cell_h),
+                                      shared.canvas_mask(key, cell_mask), args.color,
+                                      threads, args.match),
+            profiler)
+    profiler.note(image=[width, height], grid=[cols, rows], cells=cols * rows,
+                  cells_drawn=cells_drawn)
+
+    # Composite ASCII canvas over original image using mask
+    with profiler.stage("composite"):
+        try:
+            if threads <= 1:
+                return Image.composite(ascii_canvas, img, mask)
+            # Outside the mask's ring the result is the original image
+            return composite_bands(ascii_canvas, img.copy(), mask,
+                                   mask_ring(cell_mask, (width, height)),
+                                   cell_bands(height, cell_h, threads), threads)
+        except Exception as e:
+            raise RenderError(f"Error compositing images: {e}") from e
+
+
+
+def render_ascii_border(img, options=None, font=None, profiler=NULL_PROFILER, **params):
+    """
+    Return ``img`` (a PIL image or ``uint8`` array) wrapped with an ASCII-art
+    border, as the same type.
+
+    ``options`` is a namespace or dict of CLI options (``border``, ``fade``,
+    ``chars``, ``color``, ...); keyword ``params`` override it and anything
+    unset takes the CLI default. ``font`` is a preloaded PIL font used instead
+    of ``font``/``font_size``. Pass an ``asciiart_common.profile.Profiler``
+    as ``profiler`` to time the stages. Raises ``RenderError`` on invalid input.
+    """
+    # Imported here: __main__ imports this module
+    from .__main__ import build_parser
+
+    opts = resolve_options(build_parser, options, **params)
+    image, was_array = to_image(img)
+    with profiler:
+        return like_input(render(image, opts, font=font, profiler=profiler), was_array)
+
+
+def process(args, input_path, output_path, profiler=NULL_PROFILER):
+    """
+    Decode ``input_path``, render it and save the result to ``output_path``;
+    write the requested text outputs first. Without ``output_path`` only
+    the text is written.
+    """
+    if text_outputs(args):
+        write_text(input_path, args, profiler=profiler)
+        if not output_path:
+            return
+    if args.stream:
+        render_stream(input_path, output_path, args, profiler=profiler)
+        return
+
+    # Load original image
+    with profiler.stage("decode"):
+        img = open_rgb(input_path, args)
+
+    result = render(img, args, profiler=profiler)
+
+    # Save output
+    with profiler.stage("save"):
+        save_image(result, output_path, args)
@@ -0,0 +1,280 @@
+"""
+Glyph atlas for ASCII rendering.
+
+Each character is rasterized once per (font, size) into an "L" mask and then
+pasted per cell, instead of calling ``ImageDraw.text`` for every cell.
+Atlases are persisted as small JSON files in a cache directory with
+least-recently-used eviction, so separate CLI runs and batch workers do not
+re-rasterize the same font.
+"""
+import base64
+import hashlib
+import json
+import os
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+from asciiart_common.cache import atomic_write, evict
+from asciiart_common.errors import RenderError
+
+# Bump when the on-disk atlas layout changes
+ATLAS_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "asciiart", "glyphs")
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+# Fonts and atlases already loaded in this process
+_FONTS = {}
+_ATLASES = {}
+
+
+def load_font(font_path=None, font_size=12):
+    """
+    Load a TrueType font, or PIL's default font when ``font_path`` is empty.
+    Fonts are cached per process so batch workers and services load them once.
+    """
+    key = (font_path, font_size)
+    font = _FONTS.get(key)
+    if font is not None:
+        return font
+    if font_path:
+        try:
+            font = ImageFont.truetype(font_path, font_size)
+        except Exception as e:
+            raise RenderError(f"Error loading font '{font_path}': {e}") from e
+    else:
+        try:
+            font = ImageFont.load_default()
+        except Exception as e:
+            raise RenderError("Could not load default font; specify --font") from e
+    _FONTS[key] = font
+    return font
+
+
+def cell_size(font):
+    """Character cell size ``(width, height)`` from the glyph "A"."""
+    try:
+        # Preferred: getbbox returns (x0, y0, x1, y1)
+        bbox = font.getbbox("A")
+        cell_w = bbox[2] - bbox[0]
+        cell_h = bbox[3] - bbox[1]
+    except AttributeError:
+        # Fallback: getmask returns an image of the glyph
+        mask = font.getmask("A")
+        cell_w, cell_h = mask.size
+    if cell_w <= 0 or cell_h <= 0:
+        raise RenderError("Invalid font cell size.")
+    return cell_w, cell_h
+
+
+def default_cache_dir():
+    """Return the glyph cache directory, honouring $ASCIIART_GLYPH_CACHE."""
+    return os.environ.get("ASCIIART_GLYPH_CACHE") or DEFAULT_CACHE_DIR
+
+
+def font_key(font, font_path=None):
+    """
+    Identify a font for caching: file path (with size and mtime so edited
+    fonts are re-rasterized), point size and the Pillow version that renders it.
+    Fonts whose file cannot be found are identified by name.
+    """
+    if isinstance(getattr(font, "path", None), str):
+        # The file Pillow opened: --font may name a font in the system font
+        # directories rather than a path
+        font_path = font.path
+    if font_path:
+        try:
+            st = os.stat(font_path)
+            source = f"{os.path.realpath(font_path)}:{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            source = f"<name:{font_path}>"
+    else:
+        source = f"<default:{type(font).__name__}>"
+    size = getattr(font, "size", 0)
+    return f"{source}|{size}|{PIL.__version__}|{ATLAS_FORMAT}"
+
+
+class GlyphAtlas:
+    """Per-font cache of rasterized glyph masks."""
+
+    def __init__(self, font, font_path=None, cache_dir=None,
+                 max_bytes=DEFAULT_CACHE_BYTES):
+        self.font = font
+        self.key = font_key(font, font_path)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # char -> (mask image or None for blank glyphs, (x offset, y offset))
+        self.glyphs = {}
+        self.rasterized = 0
+        self._load()
+
+    @property
+    def path(self):
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(self.key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def glyph(self, ch):
+        """Return ``(mask, (dx, dy))`` for a character, rasterizing it on first use."""
+        try:
+            return self.glyphs[ch]
+        except KeyError:
+            pass
+        entry = self._rasterize(ch)
+        self.glyphs[ch] = entry
+        self.rasterized += 1
+        return entry
+
+    def prepare(self, chars):
+        """Rasterize any missing characters and persist the atlas if it grew."""
+        before = self.rasterized
+        for ch in chars:
+            self.glyph(ch)
+        if self.rasterized != before:
+            self.save()
+
+    def box(self, ch):
+        """Ink box ``(x0, y0, x1, y1)`` of a character relative to its draw position."""
+        mask, (dx, dy) = self.glyph(ch)
+        if mask is None:
+            return 0, 0, 0, 0
+        return dx, dy, dx + mask.width, dy + mask.height
+
+    def draw(self, canvas, xy, ch, fill):
+        """
+        Paint a character onto ``canvas`` at ``xy``; equivalent to
+        ``ImageDraw.Draw(canvas).text(xy, ch, font=font, fill=fill)``.
+        """
+        mask, (dx, dy) = self.glyph(ch)
+        if mask is None:
+            return
+        x = xy[0] + dx
+        y = xy[1] + dy
+        canvas.paste(fill, (x, y, x + mask.width, y + mask.height), mask)
+
+    def _rasterize(self, ch):
+        try:
+            bbox = self.font.getbbox(ch)
+        except AttributeError:
+            # Bitmap fonts without getbbox: glyph mask anchored at the origin
+            w, h = self.font.getmask(ch).size
+            bbox = (0, 0, w, h)
+        w = bbox[2] - bbox[0]
+        h = bbox[3] - bbox[1]
+        if w <= 0 or h <= 0:
+            return None, (0, 0)
+        mask = Image.new("L", (w, h), 0)
+        ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), ch, font=self.font, fill=255)
+        return mask, (bbox[0], bbox[1])
+
+    def _load(self):
+        path = self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("key") != self.key:
+                return
+            for ch, g in data["glyphs"].items():
+                if g["size"][0] <= 0 or g["size"][1] <= 0:
+                    self.glyphs[ch] = (None, (0, 0))
+                    continue
+                mask = Image.frombytes("L", tuple(g["size"]), base64.b64decode(g["data"]))
+                self.glyphs[ch] = (mask, tuple(g["offset"]))
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            # A corrupt or concurrently replaced atlas is simply rebuilt
+            self.glyphs = {}
+
+    def save(self):
+        """Write the atlas to the cache directory and evict old atlases."""
+        path = self.path
+        if not path:
+            return
+        glyphs = {}
+        for ch, (mask, offset) in self.glyphs.items():
+            if mask is None:
+                glyphs[ch] = {"size": [0, 0], "offset": [0, 0], "data": ""}
+            else:
+                glyphs[ch] = {
+                    "size": list(mask.size),
+                    "offset": list(offset),
+                    "data": base64.b64encode(mask.tobytes()).decode("ascii"),
+                }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with atomic_write(path, "w", encoding="utf-8") as fh:
+                json.dump({"key": self.key, "glyphs": glyphs}, fh)
+            evict(self.cache_dir, self.max_bytes, keep=path)
+        except OSError:
+            # The on-disk cache is an optimization only
+            pass
+
+
+def nearest_source(n_cells, n_pixels):
+    """
+    Cell index each pixel samples when an ``n_cells`` long axis is upscaled
+    to ``n_pixels`` with ``Image.NEAREST``, as computed by Pillow itself.
+    """
+    line = Image.fromarray(np.arange(n_cells, dtype=np.int32)[np.newaxis, :])
+    return np.asarray(line.resize((n_pixels, 1), resample=Image.NEAREST))[0]
+
+
+def visible_cells(atlas, chars, idx, cell_w, cell_h, cell_mask, size):
+    """
+    Boolean ``(rows, cols)`` array of grid cells whose glyph can put ink on a
+    pixel where ``cell_mask`` (upscaled to ``size`` with ``Image.NEAREST``) is
+    nonzero. Glyphs overhang their cells, so a cell outside the mask can
+    still be visible through a neighbour; drawing only these cells, in
+    row-major order, leaves every visible pixel identical to a full render.
+
+    ``idx`` is the ``(rows, cols)`` array of indices into ``chars``.
+    """
+    width, height = size
+    rows, cols = idx.shape
+    m = np.asarray(cell_mask) > 0
+    # Summed-area table of nonzero mask cells; int32 keeps the per-cell
+    # temporaries small on large grids
+    sat = np.zeros((m.shape[0] + 1, m.shape[1] + 1), dtype=np.int32)
+    sat[1:, 1:] = m.cumsum(axis=0, dtype=np.int32).cumsum(axis=1)
+    src_x = nearest_source(m.shape[1], width)
+    src_y = nearest_source(m.shape[0], height)
+    boxes = np.array([atlas.box(ch) for ch in chars], dtype=np.int32).reshape(-1, 4)
+    px = (np.arange(cols, dtype=np.int32) * cell_w)[np.newaxis, :]
+    py = (np.arange(rows, dtype=np.int32) * cell_h)[:, np.newaxis]
+    x0 = np.clip(px + boxes[idx, 0], 0, width)
+    x1 = np.clip(px + boxes[idx, 2], 0, width)
+    y0 = np.clip(py + boxes[idx, 1], 0, height)
+    y1 = np.clip(py + boxes[idx, 3], 0, height)
+    inked = (x1 > x0) & (y1 > y0)
+    # Pixel ranges map to contiguous mask-cell ranges since NEAREST is monotonic
+    c0 = src_x[np.minimum(x0, width - 1)]
+    c1 = src_x[np.maximum(x1 - 1, 0)] + 1
+    r0 = src_y[np.minimum(y0, height - 1)]
+    r1 = src_y[np.maximum(y1 - 1, 0)] + 1
+    count = sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+    return inked & (count > 0)
+
+
+def atlas_cache_dir(args):
+    """Glyph cache directory selected by ``--glyph_cache``/``--no_glyph_cache``."""
+    if args.no_glyph_cache:
+        return None
+    return args.glyph_cache or default_cache_dir()
+
+
+def get_atlas(font, font_path=None, cache_dir=None):
+    """Return the process-wide atlas for a font, loading it from disk if cached."""
+    key = font_key(font, font_path)
+    atlas = _ATLASES.get(key)
+    if atlas is None or atlas.cache_dir != cache_dir:
+        atlas = GlyphAtlas(font, font_path, cache_dir=cache_dir)
+        _ATLASES[key] = atlas
+    return atlas
@@ -0,0 +1,136 @@
+"""
+Cache of full-resolution masks keyed by geometry.
+
+A render's masks depend only on the image size, the cell size and the
+border parameters, never on the pixels, and catalog images come in a
+handful of sizes. Finished masks (cell-level and upscaled "L" images) are
+kept in a per-process LRU bounded by bytes and, with a cache directory,
+as uncompressed ``.npz`` files shared across runs and batch workers, with
+the same least-recently-used eviction as the glyph atlases.
+
+Cached images are shared between renders and must not be modified.
+Every lookup counts as a memory hit, disk hit or miss on the profiler
+(``mask_cache_hits``, ``mask_cache_disk_hits``, ``mask_cache_misses``).
+"""
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from asciiart_common.cache import atomic_write, evict
+from asciiart_common.profile import NULL_PROFILER
+
+# Bump when the on-disk layout or the mask construction changes
+MASK_FORMAT = 1
+
+DEFAULT_MEMORY_MB = 256
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+
+# Mask caches already created in this process
+_CACHES = {}
+
+
+def _nbytes(masks):
+    return sum(m.width * m.height for m in masks.values())
+
+
+class MaskCache:
+    """LRU of named "L" mask images per geometry key, optionally backed by disk."""
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_MB * 1024 * 1024, cache_dir=None,
+                 max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key, build, profiler=NULL_PROFILER):
+        """
+        Return the ``{name: image}`` masks of ``key`` (a tuple of ints and
+        strings), calling ``build()`` to make them on a miss.
+        """
+        masks = self.entries.get(key)
+        if masks is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            profiler.count("mask_cache_hits")
+            return masks
+        masks = self._load(key)
+        if masks is not None:
+            self.disk_hits += 1
+            profiler.count("mask_cache_disk_hits")
+        else:
+            masks = build()
+            self.misses += 1
+            profiler.count("mask_cache_misses")
+            self._save(key, masks)
+        self._remember(key, masks)
+        return masks
+
+    def _remember(self, key, masks):
+        size = _nbytes(masks)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = masks
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= _nbytes(old)
+
+    def path(self, key):
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(repr((MASK_FORMAT,) + key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def _load(self, key):
+        path = self.path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["__key__"]) != repr((MASK_FORMAT,) + key):
+                    return None
+                masks = {name: Image.fromarray(data[name])
+                         for name in data.files if name != "__key__"}
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+            return masks
+        except (OSError, ValueError, KeyError):
+            # A corrupt or concurrently replaced file is simply rebuilt
+            return None
+
+    def _save(self, key, masks):
+        path = self.path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with atomic_write(path) as fh:
+                np.savez(fh, __key__=np.array(repr((MASK_FORMAT,) + key)),
+                         **{name: np.asarray(m) for name, m in masks.items()})
+            evict(self.cache_dir, self.max_disk_bytes, keep=path, suffix=".npz")
+        except OSError:
+            # The on-disk cache is an optimization only
+            pass
+
+
+def mask_cache_dir(args):
+    """On-disk mask cache directory from ``--mask_cache`` or $ASCIIART_MASK_CACHE, if any."""
+    return args.mask_cache or os.environ.get("ASCIIART_MASK_CACHE") or None
+
+
+def get_mask_cache(args):
+    """Return the process-wide mask cache configured by ``--mask_cache``/``--mask_cache_mb``."""
+    key = (mask_cache_dir(args), args.mask_cache_mb)
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = MaskCache(max_bytes=args.mask_cache_mb * 1024 * 1024, cache_dir=key[0])
+        _CACHES[key] = cache
+    return cache
@@ -0,0 +1,130 @@
+"""
+Cell-level border masks built as whole-array NumPy operations.
+
+Masks are computed on the character grid (one value per cell) from a
+distance field to the nearest image edge; 255 selects the ASCII canvas and
+0 the original image. Their nonzero cells form a ring around the untouched
+center, covered by up to four pixel strips (``mask_ring``).
+"""
+import numpy as np
+from PIL import Image
+
+from asciiart_common.errors import RenderError
+
+from .glyphs import nearest_source
+from .tiles import cell_bands, upscale_nearest
+
+
+def edge_distance(cols, rows):
+    """Return a ``(rows, cols)`` array of each cell's distance to the nearest edge."""
+    x = np.arange(cols)
+    y = np.arange(rows)
+    dx = np.minimum(x, cols - 1 - x)
+    dy = np.minimum(y, rows - 1 - y)
+    return np.minimum(dx[np.newaxis, :], dy[:, np.newaxis])
+
+
+def ramp(numerator, fade):
+    """
+    Fade ramp ``round(numerator * 255 / fade)`` clipped to 0..255, using the
+    same float64 arithmetic and round-half-even rule as Python's ``round``.
+    """
+    m = np.rint(numerator * 255.0 / max(fade, 1))
+    return np.clip(m, 0, 255)
+
+
+def border_mask_array(cols, rows, border, fade):
+    """Per-cell ASCII mask for ``ascii_border`` as a ``uint8`` array."""
+    d = edge_distance(cols, rows)
+    m = np.select(
+        [d >= border, d < border - fade],
+        [0, 255],
+        default=ramp(border - d, fade))
+    return m.astype(np.uint8)
+
+
+def border_mask(cols, rows, border, fade):
+    """Per-cell ASCII mask for ``ascii_border`` as an "L" image of size ``(cols, rows)``."""
+    return Image.fromarray(border_mask_array(cols, rows, border, fade))
+
+
+def scaled_border_masks(size, cell_size, border, fade, threads=1):
+    """
+    ``{"ascii_cells": ..., "ascii": ...}``: the per-cell mask of the grid
+    that fits ``size`` with cells of ``cell_size``, and its
+    ``Image.NEAREST`` upscale to ``size`` (in bands on ``threads`` threads).
+    """
+    cols, rows = size[0] // cell_size[0], size[1] // cell_size[1]
+    cells = border_mask(cols, rows, border, fade)
+    return {"ascii_cells": cells, "ascii": upscale(cells, size, cell_size, threads)}
+
+
+def upscale(cells, size, cell_size, threads=1):
+    """``Image.NEAREST`` upscale of a cell mask to ``size``, band-parallel with ``threads``."""
+    if threads <= 1:
+        return cells.resize(size, resample=Image.NEAREST)
+    return upscale_nearest(cells, size, cell_bands(size[1], cell_size[1], threads), threads)
+
+
+def border_params(args):
+    """Border and fade widths in character cells, validated and clamped."""
+    border_chars = args.border
+    fade_chars = args.fade if args.fade is not None else border_chars
+    if fade_chars < 0:
+        raise RenderError("Fade width must be non-negative.")
+    if fade_chars > border_chars:
+        fade_chars = border_chars
+    return border_chars, fade_chars
+
+
+def inset_box(inset, cols, rows, size):
+    """
+    Pixel box ``(x0, y0, x1, y1)`` covered by the cells at least ``inset``
+    cells from every edge once the cell grid is upscaled to ``size`` with
+    ``Image.NEAREST``.
+    """
+    width, height = size
+    src_x = nearest_source(cols, width)
+    src_y = nearest_source(rows, height)
+    x0 = int(np.searchsorted(src_x, inset, side="left"))
+    x1 = int(np.searchsorted(src_x, cols - inset, side="left"))
+    y0 = int(np.searchsorted(src_y, inset, side="left"))
+    y1 = int(np.searchsorted(src_y, rows - inset, side="left"))
+    if x1 <= x0 or y1 <= y0:
+        # Ring closes over the whole box: the inner region is empty
+        return x0, y0, x0, y0
+    return x0, y0, x1, y1
+
+
+def ring_strips(outer, inner):
+    """
+    Non-empty boxes covering ``outer`` minus ``inner``: full-width top and
+    bottom strips, then left and right strips beside ``inner``.
+    """
+    ox0, oy0, ox1, oy1 = outer
+    ix0, iy0, ix1, iy1 = inner
+    if ix1 <= ix0 or iy1 <= iy0:
+        strips = [outer]
+    else:
+        strips = [
+            (ox0, oy0, ox1, iy0),
+            (ox0, iy1, ox1, oy1),
+            (ox0, iy0, ix0, iy1),
+            (ix1, iy0, ox1, iy1),
+        ]
+    return [b for b in strips if b[2] > b[0] and b[3] > b[1]]
+
+
+def mask_ring(cell_mask, size):
+    """
+    Strips of the tightest ring, measured in whole cells from the edges,
+    that contains every nonzero cell of ``cell_mask``.
+    """
+    m = np.asarray(cell_mask)
+    rows, cols = m.shape
+    d = edge_distance(cols, rows)[m > 0]
+    if d.size == 0:
+        return []
+    outer = inset_box(int(d.min()), cols, rows, size)
+    inner = inset_box(int(d.max()) + 1, cols, rows, size)
+    return ring_strips(outer, inner)
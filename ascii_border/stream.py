@@ -0,0 +1,150 @@
+"""
+Strip-by-strip rendering for images too large to hold in memory.
+
+The image is processed in horizontal strips whose height is a multiple of
+the character cell height, in two passes over the input:
+
+1. ``scan`` reads every strip once to build the grayscale thumbnail (the
+   horizontal resample per strip, the vertical one over the collected
+   rows, exactly as ``Image.resize`` does it) and the per-cell average
+   colors (strips hold whole cell rows, so each cell is averaged in one).
+2. Each strip is then rendered on its own: mask rows are gathered from the
+   cell mask, the canvas rows of the strip are assembled from the glyphs
+   (see ``ascii_border.canvas``; glyphs overhang cell rows, so one glyph
+   can touch two strips), and the composite is handed to the writer.
+
+Besides one strip of each buffer, only grid-sized state is kept: the cell
+masks, the glyph indices and a ``cols`` x ``height`` grayscale intermediate.
+"""
+import numpy as np
+from PIL import Image
+
+from asciiart_common.errors import RenderError
+from asciiart_common.profile import NULL_PROFILER
+from asciiart_common.strips import open_reader, open_writer
+
+from .canvas import CellGlyphs, ShapeMatch, glyph_stack, ramp_index
+from .glyphs import atlas_cache_dir, cell_size, get_atlas, load_font, nearest_source
+from .masks import border_mask, border_params
+
+
+def strip_height(args, cell_h):
+    """Strip height in pixels: ``--strip_rows`` whole cell rows."""
+    if args.strip_rows < 1:
+        raise RenderError("--strip_rows must be at least 1")
+    return args.strip_rows * cell_h
+
+
+def strips(height, strip_h):
+    """Yield ``(y0, y1)`` row ranges covering ``height``."""
+    for y0 in range(0, height, strip_h):
+        yield y0, min(height, y0 + strip_h)
+
+
+def scan(reader, cols, rows, cell_w, cell_h, strip_h, color, visit=None):
+    """
+    First pass: return the ``(cols, rows)`` grayscale thumbnail and, with
+    ``color``, the ``(rows, cols, 3)`` average color of every cell.
+    ``visit(y0, y1, strip)`` is called for each strip read.
+    """
+    width, height = reader.size
+    # Horizontal resample of each row, identical whether done per strip or whole
+    rows_l = np.empty((height, cols), dtype=np.uint8)
+    colors = np.zeros((rows, cols, 3), dtype=np.uint8) if color else None
+    for y0, y1 in strips(height, strip_h):
+        strip = reader.read(y0, y1)
+        rows_l[y0:y1] = np.asarray(
+            strip.convert("L").resize((cols, y1 - y0), resample=Image.BILINEAR))
+        if colors is not None:
+            # Cell rows lying wholly in this strip
+            a, b = -(-y0 // cell_h), min(rows, y1 // cell_h)
+            if a < b:
+                colors[a:b] = np.asarray(strip.resize(
+                    (cols, b - a), resample=Image.BOX,
+                    box=(0, a * cell_h - y0, cols * cell_w, b * cell_h - y0)))
+        if visit is not None:
+            visit(y0, y1, strip)
+    gs = Image.fromarray(rows_l).resize((cols, rows), resample=Image.BILINEAR)
+    return gs, colors
+
+
+class MaskRows:
+    """Rows of a cell mask upscaled with ``Image.NEAREST``, without the full-size mask."""
+
+    def __init__(self, cell_mask, size):
+        self.cells = np.asarray(cell_mask)
+        self.src_x = nearest_source(self.cells.shape[1], size[0])
+        self.src_y = nearest_source(self.cells.shape[0], size[1])
+
+    def rows(self, y0, y1):
+        return Image.fromarray(self.cells[self.src_y[y0:y1]][:, self.src_x])
+
+    def box(self, box, y0=0):
+        """The mask in ``box``, given relative to a strip starting at row ``y0``."""
+        x0, a, x1, b = box
+        return Image.fromarray(self.cells[self.src_y[a + y0:b + y0]][:, self.src_x[x0:x1]])
+
+
+def render_stream(input_path, output_path, args, font=None, profiler=NULL_PROFILER):
+    """
+    Render ``input_path`` to ``output_path`` one strip at a time. Stage
+    times on ``profiler`` are summed over the strips.
+    """
+    try:
+        reader = open_reader(input_path, args)
+    except RenderError:
+        raise
+    except Exception as e:
+        raise RenderError(f"Error opening input image: {e}") from e
+    with reader:
+        width, height = reader.size
+        with profiler.stage("font"):
+            if font is None:
+                font = load_font(args.font, args.font_size)
+            cell_w, cell_h = cell_size(font)
+        cols = width // cell_w
+        rows = height // cell_h
+        if cols < 1 or rows < 1:
+            raise RenderError("Image too small for given font size.")
+        strip_h = strip_height(args, cell_h)
+        with profiler.stage("masks"):
+            border_chars, fade_chars = border_params(args)
+            cell_mask = border_mask(cols, rows, border_chars, fade_chars)
+            mask = MaskRows(cell_mask, (width, height))
+
+        chars = args.chars
+        atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+        atlas.prepare(chars)
+        # --match shape fits glyphs to the cells of each strip as it is read
+        shapes = None
+        if args.match == "shape":
+            shapes = ShapeMatch(glyph_stack(atlas, chars, cell_w, cell_h), cols, rows,
+                                (width, height))
+        with profiler.stage("scan"):
+            gs, colors = scan(reader, cols, rows, cell_w, cell_h, strip_h, args.color,
+                              shapes and shapes.add)
+        with profiler.stage("glyphs"):
+            ascii_idx = shapes.idx if shapes else ramp_index(gs, chars)
+            glyphs = CellGlyphs(atlas, chars, ascii_idx, cell_w, cell_h, cell_mask,
+                                (width, height), colors)
+        profiler.note(image=[width, height], grid=[cols, rows], cells=cols * rows,
+                      cells_drawn=len(glyphs.ys), strip_height=strip_h)
+
+        try:
+            writer = open_writer(output_path, (width, height), args)
+        except Exception as e:
+            raise RenderError(f"Error saving output image: {e}") from e
+        try:
+            for y0, y1 in strips(height, strip_h):
+                with profiler.stage("decode"):
+                    strip = reader.read(y0, y1)
+                with profiler.stage("glyphs"):
+                    canvas = Image.new("RGB", (width, y1 - y0), color="white")
+                    glyphs.draw(canvas, y0, y1)
+                with profiler.stage("composite"):
+                    result = Image.composite(canvas, strip, mask.rows(y0, y1))
+                with profiler.stage("save"):
+                    writer.write(result)
+        finally:
+            with profiler.stage("save"):
+                writer.close()
@@ -0,0 +1,186 @@
+"""
+The ASCII grid as text: ``--text_out``, ``--ansi_out`` and ``--html_out``.
+
+Nothing is rasterized and no full-resolution buffer is made. The image is
+reduced to one pixel per character cell (JPEG inputs are already reduced
+while decoding), brightness is mapped to characters through the 256-entry
+ramp table (see ``ascii_border.canvas.ramp_index``), and the grid is
+written one row at a time:
+
+``text``
+    Plain characters, one line per cell row.
+``ansi``
+    The same lines for a terminal; with ``--color`` each run of
+    characters is preceded by a 24-bit color escape (``ESC[38;2;R;G;Bm``)
+    of its cells' average color, and every line ends with a reset.
+``html``
+    A standalone page with the grid in a ``<pre>``; with ``--color`` runs
+    of characters are ``<span>`` elements with their color.
+
+The grid covers the whole image: ``--border`` only shapes rendered images.
+Its width is ``--columns``, or as many cells of the font as fit; the rows
+keep the font cell's aspect ratio.
+"""
+import html
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import input_format, open_rgb
+from asciiart_common.profile import NULL_PROFILER
+
+from .canvas import ramp_index
+from .glyphs import cell_size, load_font
+
+TEXT_MODES = ("text", "ansi", "html")
+
+HTML_HEADER = (
+    '<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>ASCII art</title></head>\n'
+    '<body>\n<pre style="font-family: monospace; line-height: 1">\n')
+HTML_FOOTER = "</pre>\n</body>\n</html>\n"
+
+
+def add_text_arguments(parser):
+    """Add ``--text_out``, ``--ansi_out``, ``--html_out`` and ``--columns``."""
+    parser.add_argument(
+        "--text_out", "--text-out", metavar="FILE", default=None,
+        help="Write the ASCII grid as plain text to FILE ('-' for stdout)")
+    parser.add_argument(
+        "--ansi_out", "--ansi-out", metavar="FILE", default=None,
+        help="Write the ASCII grid for a terminal to FILE ('-' for stdout), "
+             "in 24-bit color with --color")
+    parser.add_argument(
+        "--html_out", "--html-out", metavar="FILE", default=None,
+        help="Write the ASCII grid as an HTML page to FILE ('-' for stdout), "
+             "colored with --color")
+    parser.add_argument(
+        "--columns", type=int, default=None,
+        help="Grid width in characters for the text outputs "
+             "(default: as many font cells as fit the image)")
+
+
+def text_outputs(args):
+    """``(mode, path)`` of every text output requested in ``args``."""
+    return [(mode, getattr(args, f"{mode}_out")) for mode in TEXT_MODES
+            if getattr(args, f"{mode}_out", None)]
+
+
+def grid_size(size, cell, columns=None):
+    """
+    ``(cols, rows)`` of the text grid of an image of ``size``: ``columns``
+    wide with rows in the font cell's aspect ratio, or the whole font cells
+    that fit.
+    """
+    width, height = size
+    cell_w, cell_h = cell
+    if columns is None:
+        cols, rows = width // cell_w, height // cell_h
+    else:
+        if columns < 1:
+            raise RenderError("--columns must be at least 1")
+        cols = columns
+        rows = round(height * columns * cell_w / (width * cell_h))
+    if cols < 1 or rows < 1:
+        raise RenderError("Image too small for given font size.")
+    return cols, rows
+
+
+def open_for_grid(path, args, font=None):
+    """
+    Decode ``path`` for a text grid and return ``(image, (cols, rows))``.
+    The size of the grid comes from the full image; the decoder may reduce
+    the image (JPEG DCT scaling) as long as every cell keeps a pixel.
+    """
+    if font is None:
+        font = load_font(args.font, args.font_size)
+    if input_format(path, args):
+        img = open_rgb(path, args)
+        return img, grid_size(img.size, cell_size(font), args.columns)
+    try:
+        img = Image.open(path)
+        grid = grid_size(img.size, cell_size(font), args.columns)
+        img.draft("RGB", grid)
+        img.load()
+        return (img if img.mode == "RGB" else img.convert("RGB")), grid
+    except RenderError:
+        raise
+    except Exception as e:
+        raise RenderError(f"Error opening input image: {e}") from e
+
+
+def cell_grid(img, grid, chars, color=False):
+    """
+    The lines of characters of ``img`` (RGB) on a ``grid`` of ``(cols,
+    rows)`` cells and, with ``color``, their ``(rows, cols, 3)`` average
+    colors (else None).
+    """
+    gs = img.convert("L").resize(grid, resample=Image.BILINEAR)
+    table = np.array(list(chars))
+    # Each row of single characters viewed as one string
+    lines = table[ramp_index(gs, chars)].view(f"U{grid[0]}").ravel().tolist()
+    colors = np.asarray(img.resize(grid, resample=Image.BOX)) if color else None
+    return lines, colors
+
+
+def _runs(colors):
+    # Start columns of the runs of equal colors in one row
+    return [0] + (np.flatnonzero(np.any(colors[1:] != colors[:-1], axis=1)) + 1).tolist()
+
+
+def _escape(text):
+    return html.escape(text, quote=False)
+
+
+def grid_lines(lines, colors, mode):
+    """Yield the output of ``mode`` (see ``TEXT_MODES``) line by line."""
+    if mode == "html":
+        yield HTML_HEADER
+    for y, line in enumerate(lines):
+        if colors is None or mode == "text":
+            yield (_escape(line) if mode == "html" else line) + "\n"
+            continue
+        starts = _runs(colors[y])
+        ends = starts[1:] + [len(line)]
+        rgb = colors[y, starts].tolist()
+        if mode == "ansi":
+            parts = [f"\x1b[38;2;{r};{g};{b}m{line[start:end]}"
+                     for (r, g, b), start, end in zip(rgb, starts, ends)]
+            parts.append("\x1b[0m")
+        else:
+            escape = _escape if "&" in line or "<" in line or ">" in line else str
+            parts = [f'<span style="color:#{r:02x}{g:02x}{b:02x}">'
+                     f"{escape(line[start:end])}</span>"
+                     for (r, g, b), start, end in zip(rgb, starts, ends)]
+        yield "".join(parts) + "\n"
+    if mode == "html":
+        yield HTML_FOOTER
+
+
+@contextmanager
+def _open_text(path):
+    if path == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        yield fh
+
+
+def write_text(input_path, args, font=None, profiler=NULL_PROFILER):
+    """Decode ``input_path`` and write every text output requested in ``args``."""
+    with profiler.stage("decode"):
+        img, grid = open_for_grid(input_path, args, font)
+    with profiler.stage("grayscale"):
+        lines, colors = cell_grid(img, grid, args.chars, args.color)
+    profiler.note(image=list(img.size), grid=list(grid))
+    with profiler.stage("save"):
+        for mode, path in text_outputs(args):
+            try:
+                with _open_text(path) as fh:
+                    for line in grid_lines(lines, colors, mode):
+                        fh.write(line)
+            except OSError as e:
+                raise RenderError(f"Error writing {mode} output: {e}") from e
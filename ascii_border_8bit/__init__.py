@@ -1,4 +1,6 @@
 """
 ASCII + 8-bit + Original Composite Filter
 """
-__version__ = "0.1.0"
\ No newline at end of file
+__version__ = "0.1.0"
+
+from .core import render_composite  # noqa: E402
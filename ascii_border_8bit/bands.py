@@ -0,0 +1,42 @@
+"""
+Ring-shaped regions of the image and band-restricted quantization.
+
+The ASCII and 8-bit regions are rings around the untouched center. A ring
+is handled as up to four strips (top, bottom, left, right; see
+``ascii_border.masks.mask_ring``) so compositing and quantization only
+touch the pixels inside it.
+"""
+import numpy as np
+from PIL import Image
+
+from ascii_border.masks import mask_ring
+from ascii_border.tiles import composite_bands
+from asciiart_common.quantize import learn_palette, map_palette
+
+
+def quantize_strips(img, strips, colors, method, dither, sample=None,
+                    sample_method="stratified"):
+    """
+    Learn a palette with ``method`` (see ``asciiart_common.quantize``) from
+    the pixels of ``strips`` only, or about ``sample`` of them, and map each
+    strip against it. Returns a list of RGB images, one per strip.
+    """
+    if not strips:
+        return []
+    crops = [img.crop(box) for box in strips]
+    # All band pixels as a single row so the palette sees exactly the band
+    pixels = np.concatenate([np.asarray(c).reshape(-1, 3) for c in crops])
+    pixels = Image.fromarray(pixels[np.newaxis, :, :])
+    palette = learn_palette(pixels, colors, method, sample, sample_method)
+    return [map_palette(c, palette, dither, box[:2]).convert("RGB")
+            for c, box in zip(crops, strips)]
+
+
+def composite_strips(fg, bg, mask, strips, bands=None, threads=1):
+    """
+    ``Image.composite`` restricted to ``strips``, written into ``bg`` in place.
+    ``fg`` is either a full-size image or a list of per-strip images. Given
+    row ``bands`` (see ``ascii_border.tiles``), they are composited on
+    ``threads`` threads.
+    """
+    return composite_bands(fg, bg, mask, strips, bands or [(0, bg.height)], threads)
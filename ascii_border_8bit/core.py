@@ -0,0 +1,230 @@
+"""
+Library entry points for the ASCII + 8-bit composite filter.
+
+``render`` takes an RGB image and the parsed CLI options and returns the
+composite; ``process`` wraps it with decoding and saving for one file.
+``render_composite`` is the public entry point for in-memory images.
+Failures raise ``RenderError`` with the message the CLI prints.
+"""
+from PIL import Image
+
+from ascii_border.canvas import canvas_key, draw_ascii_canvas
+from ascii_border.glyphs import atlas_cache_dir, cell_size, get_atlas, load_font
+from ascii_border.maskcache import get_mask_cache
+from ascii_border.tiles import cell_bands, composite_bands, thread_count
+from asciiart_common.api import like_input, resolve_options, to_image
+from asciiart_common.dither import args_dither
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import open_rgb, save_image
+from asciiart_common.palette import get_lut
+from asciiart_common.pipeline import NO_SHARING
+from asciiart_common.profile import NULL_PROFILER
+from asciiart_common.quantize import quantize
+
+from .bands import composite_strips, mask_ring, quantize_strips
+from .masks import region_params, scaled_region_masks
+from .sequence import render_sequence
+from .stream import low_memory, render_low_memory, render_stream
+
+
+def warm(args):
+    """Load the font and glyph atlas ahead of the first render (e.g. per worker)."""
+    font = load_font(args.font, args.font_size)
+    get_atlas(font, args.font, cache_dir=atlas_cache_dir(args)).prepare(args.chars)
+    if args.palette_from:
+        get_lut(args.palette_from, args.lut_bits)
+
+
+def masks(args, size, cell_size, profiler=NULL_PROFILER):
+    """
+    Cell-level masks with fades and corner rounding (``ascii_cells``,
+    ``quant_cells``), their upscales to ``size`` (``ascii``, ``quant``) and
+    the rounding mask (``round``, with ``--radius``), reused across images
+    of the same geometry, and the resolved ``region_params``.
+    """
+    width, height = size
+    cell_w, cell_h = cell_size
+    # Determine region thickness, fade widths and rounding radius
+    params = region_params(args, width // cell_w, height // cell_h)
+    return get_mask_cache(args).get(
+        ("ascii_border_8bit", width, height, cell_w, cell_h) + params,
+        lambda: scaled_region_masks(size, cell_size, *params, threads=thread_count(args)),
+        profiler), params
+
+
+def register_canvas(size, args, shared, profiler=NULL_PROFILER):
+    """
+    Register the ASCII cells of a ``size`` render with ``shared`` so that
+    pipeline variants draw one canvas (see ``asciiart_common.pipeline``).
+    """
+    font = load_font(args.font, args.font_size)
+    cell = cell_size(font)
+    if size[0] < cell[0] or size[1] < cell[1]:
+        # render reports the error
+        return
+    atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+    shared.add_canvas_mask(canvas_key(atlas, args.chars, args.color, size, cell, args.match),
+                           masks(args, size, cell, profiler)[0]["ascii_cells"])
+
+
+def render(img, args, font=None, inplace=False, profiler=NULL_PROFILER, shared=NO_SHARING):
+    """
+    Wrap ``img`` (RGB) with the ASCII border and 8-bit mid-region and return
+    the composite. With ``inplace`` the result reuses ``img``'s buffer.
+    Stages are timed on ``profiler`` (see ``asciiart_common.profile``);
+    ``shared`` holds intermediates reused by pipeline variants of the same
+    image (see ``asciiart_common.pipeline``). With ``--threads`` the image
+    is rendered in bands on a thread pool (see ``ascii_border.tiles``).
+    When the one-pass render would exceed ``--max_memory``, the image is
+    composited strip by strip instead (see ``stream.render_low_memory``).
+    """
+    width, height = img.size
+    threads = thread_count(args)
+    if low_memory(args, img.size):
+        return render_low_memory(img, args, font=font, inplace=inplace, profiler=profiler)
+
+    with profiler.stage("font"):
+        # Load font unless the caller passed a preloaded one
+        if font is None:
+            font = load_font(args.font, args.font_size)
+
+        # Character cell size
+        cell_w, cell_h = cell_size(font)
+
+    # Grid dimensions
+    cols = width // cell_w
+    rows = height // cell_h
+    if cols < 1 or rows < 1:
+        raise RenderError("Image too small for given font size.")
+
+    # Precompute grayscale thumbnail for ASCII mapping
+    with profiler.stage("grayscale"):
+        gs = shared.get(
+            ("grayscale", cols, rows),
+            lambda: img.convert("L").resize((cols, rows), resample=Image.BILINEAR),
+            profiler)
+
+    with profiler.stage("masks"):
+        region, (bc, qc, fade_a, fade_q, rr) = masks(
+            args, (width, height), (cell_w, cell_h), profiler)
+        cell_mask_ascii = region["ascii_cells"]
+        mask_ascii, mask_quant = region["ascii"], region["quant"]
+        # Ring-shaped strips holding the ASCII border and the 8-bit region
+        ascii_strips = mask_ring(cell_mask_ascii, (width, height))
+        quant_strips = mask_ring(region["quant_cells"], (width, height))
+
+    # 8-bit quantization canvas: the whole image, or only the 8-bit band
+    dither = args_dither(args)
+    with profiler.stage("quantize"):
+        try:
+            if args.palette_from:
+                # A fixed palette needs no learning: map the band only
+                lut = get_lut(args.palette_from, args.lut_bits)
+                quant_canvas = shared.get(
+                    ("lut_quantize", args.palette_from, args.lut_bits, dither,
+                     tuple(quant_strips)),
+                    lambda: [lut.quantize(img.crop(box), dither, box[:2])
+                             for box in quant_strips],
+                    profiler)
+            elif args.band_palette:
+                quant_canvas = shared.get(
+                    ("band_quantize", args.colors, args.method, dither, args.palette_sample,
+                     args.sample_method, tuple(quant_strips)),
+                    lambda: quantize_strips(img, quant_strips, args.colors, args.method, dither,
+                                            args.palette_sample, args.sample_method),
+                    profiler)
+            else:
+                # Shared with eightbit_filter variants of the same image
+                key = ("quantize", args.colors, args.method, dither, args.palette_sample,
+                       args.sample_method)
+                pal = shared.get(
+                    key,
+                    lambda: quantize(img, args.colors, args.method, dither, args.palette_sample,
+                                     args.sample_method),
+                    profiler)
+                quant_canvas = shared.get(key + ("RGB",), lambda: pal.convert("RGB"), profiler)
+        except Exception as e:
+            raise RenderError(f"Error quantizing image: {e}") from e
+
+    with profiler.stage("glyphs"):
+        # Glyphs of the cells that can show through the ASCII mask on a white
+        # canvas, colored (with --color) before the 8-bit composite touches
+        # the image
+        atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+        key = canvas_key(atlas, args.chars, args.color, (width, height), (cell_w, cell_h),
+                         args.match)
+        ascii_canvas, cells_drawn = shared.get(
+            key,
+            lambda: draw_ascii_canvas(img, gs, atlas, args.chars, (cell_w, cell_h),
+                                      shared.canvas_mask(key, cell_mask_ascii), args.color,
+                                      threads, args.match),
+            profiler)
+    profiler.note(image=[width, height], grid=[cols, rows], cells=cols * rows,
+                  cells_drawn=cells_drawn)
+
+    with profiler.stage("composite"):
+        # Composite 8-bit region over original with fade; only the 8-bit ring
+        # changes, so the original center is reused
+        base = img if inplace else img.copy()
+        bands = cell_bands(height, cell_h, threads)
+        try:
+            base = composite_strips(quant_canvas, base, mask_quant, quant_strips, bands, threads)
+        except Exception as e:
+            raise RenderError(f"Error compositing quant region: {e}") from e
+        # Composite ASCII canvas over quantized base with fade, within the ASCII ring
+        try:
+            result = composite_strips(ascii_canvas, base, mask_ascii, ascii_strips, bands,
+                                      threads)
+        except Exception as e:
+            raise RenderError(f"Error compositing ASCII region: {e}") from e
+    # Apply outer rounding to final image over white background
+    if rr > 0:
+        with profiler.stage("rounding"):
+            white_bg = Image.new("RGB", (width, height), "white")
+            if threads <= 1:
+                result = Image.composite(result, white_bg, region["round"])
+            else:
+                result = composite_bands(result, white_bg, region["round"],
+                                         [(0, 0, width, height)], bands, threads)
+    return result
+
+
+
+def render_composite(img, options=None, font=None, profiler=NULL_PROFILER, **params):
+    """
+    Return ``img`` (a PIL image or ``uint8`` array) wrapped with the ASCII
+    border and 8-bit mid-region, as the same type. The input is not modified.
+
+    ``options`` is a namespace or dict of CLI options (``border``, ``quant``,
+    ``radius``, ``colors``, ...); keyword ``params`` override it and anything
+    unset takes the CLI default. ``font`` is a preloaded PIL font used instead
+    of ``font``/``font_size``. Pass an ``asciiart_common.profile.Profiler``
+    as ``profiler`` to time the stages. Raises ``RenderError`` on invalid input.
+    """
+    # Imported here: __main__ imports this module
+    from .__main__ import build_parser
+
+    opts = resolve_options(build_parser, options, **params)
+    image, was_array = to_image(img)
+    with profiler:
+        return like_input(render(image, opts, font=font, profiler=profiler), was_array)
+
+
+def process(args, input_path, output_path, profiler=NULL_PROFILER):
+    """Decode ``input_path``, render it and save the result to ``output_path``."""
+    if args.sequence:
+        profiler.note(**render_sequence(input_path, output_path, args, profiler=profiler))
+        return
+    if args.stream:
+        render_stream(input_path, output_path, args, profiler=profiler)
+        return
+
+    # Load original image
+    with profiler.stage("decode"):
+        img = open_rgb(input_path, args)
+
+    result = render(img, args, inplace=True, profiler=profiler)
+
+    # Save output
+    with profiler.stage("save"):
+        save_image(result, output_path, args)
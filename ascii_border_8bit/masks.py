@@ -0,0 +1,122 @@
+"""
+Cell-level masks for the ASCII border and 8-bit mid-region.
+
+Built from the same edge distance field as ``ascii_border.masks``; corner
+rounding is a circle test on each corner square of the grid.
+"""
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ascii_border.masks import edge_distance, ramp, upscale
+from asciiart_common.errors import RenderError
+
+
+def corner_outside(cols, rows, inset, rr):
+    """
+    Boolean ``(rows, cols)`` array of cells inside a corner square of side
+    ``inset`` but outside the circle of radius ``rr`` centred ``inset`` cells
+    in from both edges. Corner squares are tested top-left, top-right,
+    bottom-left, bottom-right; a cell claimed by an earlier corner is not
+    tested against a later one.
+    """
+    x = np.arange(cols, dtype=np.float64)[np.newaxis, :]
+    y = np.arange(rows, dtype=np.float64)[:, np.newaxis]
+    left = x < inset
+    right = x >= cols - inset
+    top = y < inset
+    bottom = y >= rows - inset
+    dx_left = inset - x - 0.5
+    dx_right = x - (cols - inset) + 0.5
+    dy_top = inset - y - 0.5
+    dy_bottom = y - (rows - inset) + 0.5
+    rr2 = rr * rr
+    return np.select(
+        [left & top, right & top, left & bottom, right & bottom],
+        [dx_left * dx_left + dy_top * dy_top > rr2,
+         dx_right * dx_right + dy_top * dy_top > rr2,
+         dx_left * dx_left + dy_bottom * dy_bottom > rr2,
+         dx_right * dx_right + dy_bottom * dy_bottom > rr2],
+        default=False)
+
+
+def region_mask_arrays(cols, rows, bc, qc, fade_a, fade_q, rr):
+    """
+    Per-cell ``(ascii, quant)`` masks as ``uint8`` arrays.
+
+    ``bc``/``qc`` are the ASCII and 8-bit region thickness, ``fade_a``/``fade_q``
+    their fade widths and ``rr`` the corner radius, all in character cells.
+    """
+    d = edge_distance(cols, rows)
+    # ASCII fade region
+    if fade_a > 0:
+        m1 = np.select(
+            [d <= bc - fade_a, d < bc],
+            [255, ramp(bc - d, fade_a)],
+            default=0)
+    else:
+        m1 = np.where(d < bc, 255, 0)
+    # Quant fade region
+    m2 = np.select(
+        [d < bc,
+         (d < bc + fade_a) & (fade_a > 0),
+         d <= bc + qc - fade_q,
+         (d < bc + qc) & (fade_q > 0)],
+        [0, ramp(d - bc, fade_a), 255, ramp(bc + qc - d, fade_q)],
+        default=0)
+    if rr > 0:
+        # Fill white background in the rounded ASCII corners
+        m1 = np.where(corner_outside(cols, rows, rr, rr), 255, m1)
+        # Round the ascii-8bit transition at distance bc from the edge
+        m2 = np.where(corner_outside(cols, rows, bc + rr, rr), 0, m2)
+    return m1.astype(np.uint8), m2.astype(np.uint8)
+
+
+def region_masks(cols, rows, bc, qc, fade_a, fade_q, rr):
+    """Per-cell ``(ascii, quant)`` masks as "L" images of size ``(cols, rows)``."""
+    m1, m2 = region_mask_arrays(cols, rows, bc, qc, fade_a, fade_q, rr)
+    return Image.fromarray(m1), Image.fromarray(m2)
+
+
+def scaled_region_masks(size, cell_size, bc, qc, fade_a, fade_q, rr, threads=1):
+    """
+    Masks of the grid that fits ``size`` with cells of ``cell_size``: the
+    per-cell ``ascii_cells``/``quant_cells``, their ``Image.NEAREST``
+    upscales ``ascii``/``quant`` (in bands on ``threads`` threads), and with
+    ``rr`` the outer rounding mask ``round`` (255 inside the rounded
+    rectangle).
+    """
+    width, height = size
+    cell_w, cell_h = cell_size
+    ascii_cells, quant_cells = region_masks(
+        width // cell_w, height // cell_h, bc, qc, fade_a, fade_q, rr)
+    masks = {
+        "ascii_cells": ascii_cells,
+        "quant_cells": quant_cells,
+        "ascii": upscale(ascii_cells, size, cell_size, threads),
+        "quant": upscale(quant_cells, size, cell_size, threads),
+    }
+    if rr > 0:
+        masks["round"] = Image.new("L", size, 0)
+        ImageDraw.Draw(masks["round"]).rounded_rectangle(
+            [(0, 0), (width, height)], radius=rr * cell_w, fill=255)
+    return masks
+
+
+def region_params(args, cols, rows):
+    """
+    Resolve ``(border, quant, fade_ascii, fade_quant, radius)`` in character
+    cells for a ``cols`` x ``rows`` grid, validated and clamped.
+    """
+    bc = args.border
+    qc = args.quant if args.quant is not None else bc
+    fade_a = args.fade_ascii if args.fade_ascii is not None else bc
+    fade_q = args.fade_quant if args.fade_quant is not None else qc
+    if bc < 0 or qc < 0:
+        raise RenderError("--border and --quant must be non-negative")
+    max_d = min(cols, rows) // 2
+    if bc + qc > max_d:
+        raise RenderError("Combined border exceeds image size.")
+    # Rounding radius (in character cells), clamped to border thickness
+    rr = max(0, args.radius)
+    rr = min(rr, bc)
+    return bc, qc, fade_a, fade_q, rr
@@ -0,0 +1,348 @@
+"""
+Animated GIF / frame-sequence rendering with reuse between frames.
+
+Everything that depends only on the frame size is built once per clip: the
+cell masks, their full-size upscales, the ring strips, the rounding mask,
+the glyph atlas and, with ``--shared_palette`` or ``--palette_from``, the
+palette lookup table. The ASCII canvas is kept from frame to frame; only
+the pixel rows touched by cells whose glyph or sampled color changed are
+redrawn, so stable borders cost a thumbnail and a few array comparisons per
+frame. 8-bit band strips whose pixels did not change reuse their previous
+quantization.
+
+Each frame matches a ``--band_palette`` render of that frame on its own, or
+with ``--shared_palette`` a mapping to one palette learned from the band
+pixels of up to ``PALETTE_FRAMES`` frames spread over the clip.
+"""
+import os
+import re
+
+import numpy as np
+from PIL import Image
+
+from ascii_border.glyphs import atlas_cache_dir, cell_size, get_atlas, load_font
+from ascii_border.canvas import CellGlyphs, cell_colors, glyph_index
+from ascii_border.maskcache import get_mask_cache
+from asciiart_common.batch import IMAGE_EXTENSIONS, collect_inputs
+from asciiart_common.dither import args_dither
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import open_rgb
+from asciiart_common.palette import PaletteLUT, get_lut, image_palette
+from asciiart_common.profile import NULL_PROFILER
+from asciiart_common.quantize import learn_palette
+
+from .bands import composite_strips, mask_ring, quantize_strips
+from .masks import region_params, scaled_region_masks
+
+# Frames sampled for the --shared_palette palette
+PALETTE_FRAMES = 8
+# Frame duration when neither the source nor --fps gives one (10 fps)
+DEFAULT_DURATION = 100
+
+
+def natural_key(path):
+    """Sort key ordering ``frame2`` before ``frame10``."""
+    return [int(part) if part.isdigit() else part
+            for part in re.split(r"(\d+)", os.path.basename(path))]
+
+
+class FrameSource:
+    """
+    Frames of an animated image (GIF, APNG, WebP), or of still images given
+    as a directory, glob pattern or manifest file, as RGB images.
+    """
+
+    def __init__(self, source, fps=None):
+        if fps is not None and fps <= 0:
+            raise RenderError("--fps must be positive")
+        self.image = None
+        self.paths = None
+        self.loop = 0
+        if os.path.isfile(source) and os.path.splitext(source)[1].lower() in IMAGE_EXTENSIONS:
+            try:
+                self.image = Image.open(source)
+            except Exception as e:
+                raise RenderError(f"Error opening input image: {e}") from e
+            self.count = getattr(self.image, "n_frames", 1)
+            self.loop = self.image.info.get("loop", 0)
+        else:
+            self.paths = sorted(collect_inputs(source), key=natural_key)
+            self.count = len(self.paths)
+            if not self.count:
+                raise RenderError(f"No frames found for {source}")
+        self.fps = fps
+
+    def __len__(self):
+        return self.count
+
+    def frame(self, i):
+        """Return ``(rgb_image, duration_ms)`` of frame ``i``."""
+        try:
+            if self.image is not None:
+                self.image.seek(i)
+                img = self.image.convert("RGB")
+                duration = self.image.info.get("duration") or DEFAULT_DURATION
+            else:
+                img = open_rgb(self.paths[i])
+                duration = DEFAULT_DURATION
+        except RenderError:
+            raise
+        except Exception as e:
+            raise RenderError(f"Error opening input image: {e}") from e
+        if self.fps is not None:
+            duration = 1000.0 / self.fps
+        return img, duration
+
+    def close(self):
+        if self.image is not None:
+            self.image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SequenceRenderer:
+    """Render consecutive same-size frames, reusing work between them."""
+
+    def __init__(self, args, size, font=None, profiler=NULL_PROFILER):
+        self.args = args
+        self.profiler = profiler
+        self.size = width, height = size
+        with profiler.stage("font"):
+            if font is None:
+                font = load_font(args.font, args.font_size)
+            self.cell_w, self.cell_h = cell_size(font)
+        self.cols = width // self.cell_w
+        self.rows = height // self.cell_h
+        if self.cols < 1 or self.rows < 1:
+            raise RenderError("Image too small for given font size.")
+        with profiler.stage("masks"):
+            self.build_masks()
+        self.chars = args.chars
+        with profiler.stage("glyphs"):
+            self.atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+            self.atlas.prepare(self.chars)
+        self.dither = args_dither(args)
+        # Lookup table of the clip's fixed palette, or None to learn one
+        # from each frame's band
+        self.lut = get_lut(args.palette_from, args.lut_bits) if args.palette_from else None
+
+        # State carried from the previous frame
+        self.canvas = None
+        self.glyphs = None
+        self.idx = None
+        self.colors = None
+        self.band = None
+        self.quant = None
+        # Per-clip counters: frames rendered, canvas rows redrawn, strips requantized
+        self.stats = {"frames": 0, "rows_redrawn": 0, "strips_quantized": 0}
+        profiler.note(image=list(size), grid=[self.cols, self.rows],
+                      cells=self.cols * self.rows)
+
+    def build_masks(self):
+        """Region masks, their rings and full-size versions, and the rounding mask."""
+        args, size = self.args, self.size
+        width, height = size
+        bc, qc, fade_a, fade_q, rr = region_params(args, self.cols, self.rows)
+        masks = get_mask_cache(args).get(
+            ("ascii_border_8bit", width, height, self.cell_w, self.cell_h,
+             bc, qc, fade_a, fade_q, rr),
+            lambda: scaled_region_masks(size, (self.cell_w, self.cell_h),
+                                        bc, qc, fade_a, fade_q, rr),
+            self.profiler)
+        self.cell_mask_ascii = masks["ascii_cells"]
+        self.ascii_strips = mask_ring(self.cell_mask_ascii, size)
+        self.quant_strips = mask_ring(masks["quant_cells"], size)
+        self.mask_ascii = masks["ascii"]
+        self.mask_quant = masks["quant"]
+        # Outer rounding, limited to the corner boxes the mask actually clips
+        self.round_mask = masks.get("round")
+        self.round_boxes = []
+        if rr > 0:
+            self.white_bg = Image.new("RGB", size, "white")
+            self.round_boxes = corner_boxes(np.asarray(self.round_mask) < 255)
+
+    def cells(self, frame):
+        """Glyph indices and (with ``--color``) average colors of ``frame``'s cells."""
+        gs = frame.convert("L").resize((self.cols, self.rows), resample=Image.BILINEAR)
+        idx = glyph_index(frame, gs, self.atlas, self.chars, (self.cell_w, self.cell_h),
+                          self.args.match)
+        colors = None
+        if self.args.color:
+            colors = cell_colors(frame, self.cols, self.rows, self.cell_w, self.cell_h)
+        return idx, colors
+
+    def update_canvas(self, idx, colors):
+        """Bring the ASCII canvas up to date with the new cells."""
+        width, height = self.size
+        glyphs = CellGlyphs(self.atlas, self.chars, idx, self.cell_w, self.cell_h,
+                             self.cell_mask_ascii, self.size, colors)
+        if self.canvas is None:
+            self.canvas = Image.new("RGB", self.size, color="white")
+            glyphs.draw(self.canvas, 0, height)
+            self.stats["rows_redrawn"] += height
+        else:
+            changed = idx != self.idx
+            if colors is not None:
+                changed |= (colors != self.colors).any(axis=2)
+            # Pixel rows inked by a changed cell, before or after the change
+            edges = np.zeros(height + 1, dtype=np.int64)
+            for g in (self.glyphs, glyphs):
+                sel = changed[g.ys, g.xs]
+                np.add.at(edges, np.clip(g.top[sel], 0, height), 1)
+                np.add.at(edges, np.clip(g.bottom[sel], 0, height), -1)
+            dirty = np.cumsum(edges[:-1]) > 0
+            for y0, y1 in runs(dirty):
+                # Redraw the rows from scratch: glyphs overlapping them blend
+                # in the same order as in a full render
+                strip = Image.new("RGB", (width, y1 - y0), color="white")
+                glyphs.draw(strip, y0, y1)
+                self.canvas.paste(strip, (0, y0))
+                self.stats["rows_redrawn"] += y1 - y0
+        self.glyphs, self.idx, self.colors = glyphs, idx, colors
+
+    def quantize_band(self, frame):
+        """8-bit band strips of ``frame``, requantizing only what changed."""
+        band = [np.asarray(frame.crop(box)) for box in self.quant_strips]
+        if self.band is None:
+            same = [False] * len(band)
+        else:
+            same = [np.array_equal(a, b) for a, b in zip(band, self.band)]
+        if self.lut is not None:
+            quant = []
+            for i, box in enumerate(self.quant_strips):
+                if same[i]:
+                    quant.append(self.quant[i])
+                    continue
+                quant.append(self.lut.quantize(Image.fromarray(band[i]), self.dither, box[:2]))
+                self.stats["strips_quantized"] += 1
+        elif self.quant is not None and all(same):
+            quant = self.quant
+        else:
+            # The palette is learned from the whole band, so any change redoes it
+            quant = quantize_strips(frame, self.quant_strips, self.args.colors,
+                                    self.args.method, self.dither, self.args.palette_sample,
+                                    self.args.sample_method)
+            self.stats["strips_quantized"] += len(quant)
+        self.band, self.quant = band, quant
+        return quant
+
+    def render(self, frame):
+        """Return the composite of ``frame`` (RGB, modified in place)."""
+        if frame.size != self.size:
+            raise RenderError(
+                f"Frame size {frame.size[0]}x{frame.size[1]} differs from the first "
+                f"frame's {self.size[0]}x{self.size[1]}")
+        profiler = self.profiler
+        with profiler.stage("grayscale"):
+            cells = self.cells(frame)
+        with profiler.stage("glyphs"):
+            self.update_canvas(*cells)
+        with profiler.stage("quantize"):
+            try:
+                quant = self.quantize_band(frame)
+            except Exception as e:
+                raise RenderError(f"Error quantizing image: {e}") from e
+        with profiler.stage("composite"):
+            try:
+                composite_strips(quant, frame, self.mask_quant, self.quant_strips)
+            except Exception as e:
+                raise RenderError(f"Error compositing quant region: {e}") from e
+            try:
+                composite_strips(self.canvas, frame, self.mask_ascii, self.ascii_strips)
+            except Exception as e:
+                raise RenderError(f"Error compositing ASCII region: {e}") from e
+        with profiler.stage("rounding"):
+            for box in self.round_boxes:
+                frame.paste(Image.composite(
+                    frame.crop(box), self.white_bg.crop(box), self.round_mask.crop(box)), box)
+        self.stats["frames"] += 1
+        return frame
+
+
+def runs(flags):
+    """``(start, stop)`` ranges of consecutive True values in a 1-D array."""
+    padded = np.concatenate([[False], flags, [False]]).astype(np.int8)
+    bounds = np.nonzero(np.diff(padded))[0]
+    return [(int(a), int(b)) for a, b in zip(bounds[::2], bounds[1::2])]
+
+
+def corner_boxes(outside):
+    """Bounding boxes of the True pixels of ``outside`` in each image quadrant."""
+    height, width = outside.shape
+    boxes = []
+    for ys in (slice(0, height // 2), slice(height // 2, height)):
+        for xs in (slice(0, width // 2), slice(width // 2, width)):
+            yy, xx = np.nonzero(outside[ys, xs])
+            if yy.size:
+                boxes.append((xs.start + int(xx.min()), ys.start + int(yy.min()),
+                              xs.start + int(xx.max()) + 1, ys.start + int(yy.max()) + 1))
+    return boxes
+
+
+def shared_palette(source, strips, colors, method, bits, sample=None,
+                   sample_method="stratified"):
+    """
+    Lookup table of a palette learned from the 8-bit band ``strips`` of
+    frames spread over the clip, or from about ``sample`` of those pixels.
+    """
+    picks = np.unique(np.linspace(0, len(source) - 1, PALETTE_FRAMES).round().astype(int))
+    band = []
+    for i in picks:
+        frame, _ = source.frame(int(i))
+        band.extend(np.asarray(frame.crop(box)).reshape(-1, 3) for box in strips)
+    if not band:
+        return None
+    try:
+        pixels = Image.fromarray(np.concatenate(band)[np.newaxis, :, :])
+        palette = learn_palette(pixels, colors, method, sample, sample_method)
+    except Exception as e:
+        raise RenderError(f"Error quantizing image: {e}") from e
+    return PaletteLUT(image_palette(palette), bits)
+
+
+def render_sequence(input_path, output_path, args, font=None, profiler=NULL_PROFILER):
+    """
+    Render every frame of ``input_path`` (an animated image, a directory or
+    glob of frames, or a manifest) into the animated ``output_path`` (GIF,
+    APNG or WebP, by extension). Returns the renderer's per-clip counters.
+    Stage times on ``profiler`` are summed over the frames.
+    """
+    with FrameSource(input_path, args.fps) as source:
+        with profiler.stage("decode"):
+            first, duration = source.frame(0)
+        renderer = SequenceRenderer(args, first.size, font=font, profiler=profiler)
+        if args.shared_palette and renderer.lut is None:
+            with profiler.stage("palette"):
+                renderer.lut = shared_palette(
+                    source, renderer.quant_strips, args.colors, args.method, args.lut_bits,
+                    args.palette_sample, args.sample_method)
+
+        def frames():
+            for i in range(1, len(source)):
+                with profiler.stage("decode"):
+                    frame, duration = source.frame(i)
+                out = renderer.render(frame)
+                out.info["duration"] = duration
+                yield out
+
+        head = renderer.render(first)
+        head.info["duration"] = duration
+        rest = frames()
+        ext = os.path.splitext(output_path)[1].lower()
+        if ext in (".png", ".apng"):
+            # The APNG writer walks the frame list twice
+            rest = list(rest)
+        # Frames still to come are rendered while saving; their stages are
+        # timed on their own and not counted as saving
+        with profiler.stage("save"):
+            try:
+                head.save(output_path, save_all=True, append_images=rest, loop=source.loop)
+            except RenderError:
+                raise
+            except Exception as e:
+                raise RenderError(f"Error saving output image: {e}") from e
+        return renderer.stats
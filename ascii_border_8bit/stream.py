@@ -0,0 +1,223 @@
+"""
+Strip-by-strip rendering of the ASCII + 8-bit composite.
+
+Follows ``ascii_border.stream``: a scan pass builds the grayscale
+thumbnail and cell colors, then each strip is rendered and written on its
+own. The 8-bit palette cannot come from the whole image without holding it,
+so it is learned from the 8-bit band pixels gathered during the scan (as
+with ``--band_palette``). Floyd–Steinberg dithering restarts in each strip
+piece; the ordered dither modes match the full render exactly. Within a
+strip only the pieces of the 8-bit and ASCII rings are composited.
+
+``--max_memory`` uses the same strips on an image already in memory
+(``render_low_memory``), writing each one back into a single output
+buffer instead of a file. It only does so where the strips give the same
+pixels as the one-pass render (see ``low_memory``).
+"""
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ascii_border.glyphs import atlas_cache_dir, cell_size, get_atlas, load_font
+from ascii_border.canvas import CellGlyphs, ShapeMatch, glyph_stack, ramp_index
+from ascii_border.stream import MaskRows, scan, strip_height, strips
+from asciiart_common.dither import args_dither
+from asciiart_common.errors import RenderError
+from asciiart_common.palette import get_lut
+from asciiart_common.profile import NULL_PROFILER
+from asciiart_common.quantize import learn_palette, map_palette
+from asciiart_common.strips import (
+    ImageStripReader, ImageStripWriter, open_reader, open_writer)
+
+from .bands import mask_ring
+from .masks import region_masks, region_params
+
+# Bytes per pixel of a one-pass render beyond the decoded image, and the
+# extra for --radius (see ``full_render_bytes``); measured as peak resident
+# growth on large images
+FULL_RENDER_BYTES = 14
+ROUNDING_BYTES = 9
+
+
+def clip_boxes(boxes, y0, y1):
+    """Intersect boxes with rows ``[y0, y1)``, shifted to strip coordinates."""
+    out = []
+    for x0, by0, x1, by1 in boxes:
+        a, b = max(by0, y0), min(by1, y1)
+        if a < b:
+            out.append((x0, a - y0, x1, b - y0))
+    return out
+
+
+def render_stream(input_path, output_path, args, font=None, profiler=NULL_PROFILER):
+    """
+    Render ``input_path`` to ``output_path`` one strip at a time. Stage
+    times on ``profiler`` are summed over the strips.
+    """
+    try:
+        reader = open_reader(input_path, args)
+    except RenderError:
+        raise
+    except Exception as e:
+        raise RenderError(f"Error opening input image: {e}") from e
+    with reader:
+        render_strips(reader, lambda size: open_writer(output_path, size, args), args,
+                      font=font, profiler=profiler)
+
+
+def full_render_bytes(size, args):
+    """
+    Estimated peak memory, beyond the decoded image, of rendering ``size``
+    in one pass: the ASCII and quantized canvases (Pillow keeps RGB in 4
+    bytes per pixel), the quantizer's working copies and the full-size
+    masks, plus the rounding mask and white background with ``--radius``.
+    """
+    per_pixel = FULL_RENDER_BYTES + (ROUNDING_BYTES if args.radius > 0 else 0)
+    return size[0] * size[1] * per_pixel
+
+
+def low_memory(args, size):
+    """
+    Whether ``--max_memory`` calls for compositing ``size`` strip by strip.
+    Only renders whose strips match the one-pass render qualify: a palette
+    from ``--palette_from`` or ``--band_palette`` (the whole-image palette
+    needs the whole image) and no Floyd–Steinberg dithering, which would
+    restart in each strip.
+    """
+    budget = getattr(args, "max_memory", None)
+    if budget is None:
+        return False
+    if budget < 0:
+        raise RenderError("--max_memory must be non-negative")
+    if not (args.palette_from or args.band_palette) or args_dither(args) == "fs":
+        return False
+    return full_render_bytes(size, args) > budget * 1024 * 1024
+
+
+def render_low_memory(img, args, font=None, inplace=False, profiler=NULL_PROFILER):
+    """
+    Render ``img`` (RGB) strip by strip into a single output buffer: ``img``
+    itself with ``inplace``, else one copy. Only grid-sized masks and one
+    strip of temporaries are held besides it.
+    """
+    target = img if inplace else img.copy()
+    render_strips(ImageStripReader(img), lambda size: ImageStripWriter(target), args,
+                  font=font, profiler=profiler)
+    return target
+
+
+def render_strips(reader, open_output, args, font=None, profiler=NULL_PROFILER):
+    """
+    Render the strips of ``reader`` and write them in order to the writer
+    returned by ``open_output(size)``.
+    """
+    width, height = reader.size
+    with profiler.stage("font"):
+        if font is None:
+            font = load_font(args.font, args.font_size)
+        cell_w, cell_h = cell_size(font)
+    cols = width // cell_w
+    rows = height // cell_h
+    if cols < 1 or rows < 1:
+        raise RenderError("Image too small for given font size.")
+    strip_h = strip_height(args, cell_h)
+    with profiler.stage("masks"):
+        bc, qc, fade_a, fade_q, rr = region_params(args, cols, rows)
+        cell_mask_ascii, cell_mask_quant = region_masks(
+            cols, rows, bc, qc, fade_a, fade_q, rr)
+        quant_strips = mask_ring(cell_mask_quant, (width, height))
+        mask_ascii = MaskRows(cell_mask_ascii, (width, height))
+        mask_quant = MaskRows(cell_mask_quant, (width, height))
+
+    chars = args.chars
+    atlas = get_atlas(font, args.font, cache_dir=atlas_cache_dir(args))
+    atlas.prepare(chars)
+    shapes = None
+    if args.match == "shape":
+        shapes = ShapeMatch(glyph_stack(atlas, chars, cell_w, cell_h), cols, rows,
+                            (width, height))
+
+    # Scan pass, collecting the 8-bit band pixels for the palette unless
+    # a fixed one is given, straight into one array of the band's size, and
+    # with --match shape fitting glyphs to the cells of each strip
+    lut = get_lut(args.palette_from, args.lut_bits) if args.palette_from else None
+    band = None if lut else np.empty(
+        (sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in quant_strips), 3), dtype=np.uint8)
+    filled = 0
+
+    def visit(y0, y1, strip):
+        nonlocal filled
+        if shapes:
+            shapes.add(y0, y1, strip)
+        if band is None:
+            return
+        for box in clip_boxes(quant_strips, y0, y1):
+            piece = np.asarray(strip.crop(box)).reshape(-1, 3)
+            band[filled:filled + len(piece)] = piece
+            filled += len(piece)
+
+    with profiler.stage("scan"):
+        gs, colors = scan(reader, cols, rows, cell_w, cell_h, strip_h, args.color,
+                          visit if shapes or band is not None else None)
+    palette = None
+    if filled:
+        with profiler.stage("palette"):
+            try:
+                sample = Image.fromarray(band[np.newaxis, :, :])
+                palette = learn_palette(sample, args.colors, args.method,
+                                        args.palette_sample, args.sample_method)
+            except Exception as e:
+                raise RenderError(f"Error quantizing image: {e}") from e
+    del band
+
+    with profiler.stage("glyphs"):
+        ascii_idx = shapes.idx if shapes else ramp_index(gs, chars)
+        glyphs = CellGlyphs(atlas, chars, ascii_idx, cell_w, cell_h, cell_mask_ascii,
+                            (width, height), colors)
+    profiler.note(image=[width, height], grid=[cols, rows], cells=cols * rows,
+                  cells_drawn=len(glyphs.ys), strip_height=strip_h)
+    dither = args_dither(args)
+
+    try:
+        writer = open_output((width, height))
+    except Exception as e:
+        raise RenderError(f"Error saving output image: {e}") from e
+    try:
+        for y0, y1 in strips(height, strip_h):
+            with profiler.stage("decode"):
+                base = reader.read(y0, y1)
+            # 8-bit band pieces of this strip, mapped to the shared palette
+            for box in clip_boxes(quant_strips, y0, y1):
+                piece = base.crop(box)
+                # Position in the full image, so ordered dithering lines up
+                origin = (box[0], box[1] + y0)
+                with profiler.stage("quantize"):
+                    if lut is not None:
+                        quant = lut.quantize(piece, dither, origin)
+                    else:
+                        quant = map_palette(piece, palette, dither, origin).convert("RGB")
+                with profiler.stage("composite"):
+                    base.paste(Image.composite(quant, piece, mask_quant.box(box, y0)), box)
+            # ASCII ring pieces of this strip, drawn and composited only there
+            for box in clip_boxes(glyphs.boxes, y0, y1):
+                with profiler.stage("glyphs"):
+                    x0, a, x1, b = box
+                    canvas = glyphs.stack.render(glyphs.cells, glyphs.colors,
+                                                 (x0, a + y0, x1, b + y0))
+                with profiler.stage("composite"):
+                    base.paste(Image.composite(canvas, base.crop(box), mask_ascii.box(box, y0)),
+                               box)
+            # Outer rounding, drawn shifted so the strip matches a full-size mask;
+            # only strips through the rounded corners change
+            if rr > 0:
+                with profiler.stage("rounding"):
+                    mask = Image.new("L", (width, y1 - y0), 0)
+                    ImageDraw.Draw(mask).rounded_rectangle(
+                        [(0, -y0), (width, height - y0)], radius=rr * cell_w, fill=255)
+                    if mask.getextrema() != (255, 255):
+                        white_bg = Image.new("RGB", (width, y1 - y0), "white")
+                        base = Image.composite(base, white_bg, mask)
+            with profiler.stage("save"):
+                writer.write(base)
+    finally:
+        with profiler.stage("save"):
+            writer.close()
@@ -0,0 +1,4 @@
+"""
+Shared infrastructure for the ASCII art tools
+"""
+__version__ = "0.1.0"
@@ -0,0 +1,82 @@
+"""
+Helpers for the tools' in-process library functions.
+
+Options are the same ``argparse.Namespace`` the CLIs build, so any option
+documented for a CLI can be passed by its ``dest`` name (``font_size``,
+``fade_ascii``, ...). Images may be PIL images or NumPy ``uint8`` arrays.
+"""
+import argparse
+import os
+
+from PIL import Image
+
+from .errors import RenderError
+
+
+def resolve_options(build_parser, options=None, **params):
+    """
+    Return a namespace of the CLI defaults from ``build_parser()``, overlaid
+    with ``options`` (a namespace or dict) and then keyword ``params``.
+    Unknown option names raise ``TypeError``; values of the wrong type, or
+    not among an option's choices, raise ``RenderError``.
+    """
+    parser = build_parser()
+    values = vars(parser.parse_args([]))
+    known = set(values)
+    actions = {action.dest: action for action in parser._actions}
+    for source in (options, params):
+        if source is None:
+            continue
+        if not isinstance(source, dict):
+            source = vars(source)
+        unknown = sorted(set(source) - known)
+        if unknown:
+            raise TypeError(f"Unknown option(s): {', '.join(unknown)}")
+        for name, value in source.items():
+            check_option(actions[name], value)
+        values.update(source)
+    return argparse.Namespace(**values)
+
+
+def check_option(action, value):
+    """
+    Raise ``RenderError`` unless ``value`` is one the CLI could have parsed
+    for ``action``: of its ``type`` (a string or path if it has none) and among its
+    ``choices``. Switches and ``None`` are not checked.
+    """
+    if value is None or action.nargs == 0:
+        return
+    if action.type in (int, float):
+        # bool is an int, but never a number option
+        ok = (isinstance(value, (int, float) if action.type is float else int)
+              and not isinstance(value, bool))
+    elif action.type is None and action.nargs is None:
+        ok = isinstance(value, (str, os.PathLike))
+    else:
+        ok = True
+    if not ok:
+        kind = action.type.__name__ if action.type else "str"
+        raise RenderError(f"Option --{action.dest} must be {kind}, not {value!r}")
+    if action.choices is not None and value not in action.choices:
+        choices = ", ".join(map(str, action.choices))
+        raise RenderError(f"Option --{action.dest} must be one of {choices}, not {value!r}")
+
+
+def to_image(img):
+    """
+    Return ``(rgb_image, was_array)`` for a PIL image or a ``(H, W)`` /
+    ``(H, W, 3|4)`` ``uint8`` array.
+    """
+    if isinstance(img, Image.Image):
+        return (img if img.mode == "RGB" else img.convert("RGB")), False
+    return Image.fromarray(img).convert("RGB"), True
+
+
+def like_input(result, was_array):
+    """Return ``result`` as a NumPy array if the input was one, else unchanged."""
+    if was_array:
+        # NumPy is only needed when the caller already uses arrays
+        import numpy as np
+
+        return np.asarray(result)
+    return result
@@ -0,0 +1,184 @@
+"""
+Batch mode: run a tool over many images on a process pool.
+
+Each worker loads fonts and glyph data once (through the tool's ``warm``
+hook) and then processes files with the tool's ``process(args, input, output)``.
+Per-file failures are reported without aborting the batch, and a throughput
+summary is printed at the end. With ``--profile`` each worker profiles its
+files; the records are written together with their percentiles. With
+``--result_cache`` unchanged inputs are copied from the cache (see
+``asciiart_common.cache``) and the summary reports the hit rate.
+"""
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cache import run_cached
+from .errors import RenderError
+from .imagefile import ARRAY_EXTENSIONS
+from .profile import print_summary as print_profile, summarize, write_records
+
+IMAGE_EXTENSIONS = {
+    ".bmp", ".gif", ".jpeg", ".jpg", ".png", ".ppm", ".tif", ".tiff", ".webp",
+}
+# Inputs collected from directories: images and pixel arrays
+INPUT_EXTENSIONS = IMAGE_EXTENSIONS | set(ARRAY_EXTENSIONS)
+
+
+def add_batch_arguments(parser):
+    """Add ``--batch`` and ``--workers`` to a tool's argument parser."""
+    parser.add_argument(
+        "--batch", nargs=2, metavar=("INPUT", "OUTPUT_DIR"),
+        help="Process many images: INPUT is a directory, a glob pattern or a "
+             "manifest file listing one image path per line")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes for --batch (default: number of CPUs)")
+
+
+def check_io_arguments(parser, args):
+    """Require INPUT and OUTPUT unless ``--batch`` is given."""
+    if args.batch:
+        if args.input or args.output:
+            parser.error("INPUT/OUTPUT cannot be combined with --batch")
+    elif not (args.input and args.output):
+        parser.error("the following arguments are required: input, output")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+
+def collect_inputs(source):
+    """Resolve a directory, manifest file or glob pattern to a sorted list of images."""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if os.path.splitext(name)[1].lower() in INPUT_EXTENSIONS
+            and os.path.isfile(os.path.join(source, name)))
+    if os.path.isfile(source):
+        base = os.path.dirname(source)
+        with open(source, "r", encoding="utf-8") as fh:
+            lines = [line.strip() for line in fh]
+        return [os.path.join(base, line) for line in lines
+                if line and not line.startswith("#")]
+    return sorted(p for p in glob.glob(source, recursive=True) if os.path.isfile(p))
+
+
+def output_paths(inputs, out_dir):
+    """Mirror each input's path relative to the inputs' common directory under ``out_dir``."""
+    dirs = [os.path.dirname(os.path.abspath(p)) for p in inputs]
+    root = os.path.commonpath(dirs) if dirs else ""
+    return [os.path.join(out_dir, os.path.relpath(os.path.abspath(p), root))
+            for p in inputs]
+
+
+def _init_worker(warm, args):
+    try:
+        warm(args)
+    except Exception:
+        # Reported per file when process() hits the same failure
+        pass
+
+
+def _run_one(process, args, input_path, output_path):
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        record, cached = run_cached(process, args, input_path, output_path)
+    except Exception as e:
+        return input_path, output_path, str(e), None, None
+    return input_path, output_path, None, record, cached
+
+
+def run_batch(process, args, source, out_dir, workers=None, warm=None):
+    """
+    Run ``process`` over every image in ``source``, writing to ``out_dir``.
+
+    Returns a summary dict with ``images``, ``failed``, ``seconds``, ``bytes``,
+    ``images_per_s`` and ``mb_per_s``, plus ``cache_hits`` and
+    ``cache_misses`` with a result cache and ``profile`` percentiles (see
+    ``asciiart_common.profile.summarize``) when ``args.profile`` is set.
+    """
+    inputs = collect_inputs(source)
+    outputs = output_paths(inputs, out_dir)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, max(1, len(inputs)))
+
+    start = time.perf_counter()
+    results = []
+    if workers == 1:
+        if warm is not None:
+            _init_worker(warm, args)
+        for inp, out in zip(inputs, outputs):
+            results.append(_report(_run_one(process, args, inp, out)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(warm or _no_warm, args)) as pool:
+            futures = [pool.submit(_run_one, process, args, inp, out)
+                       for inp, out in zip(inputs, outputs)]
+            for future in as_completed(futures):
+                results.append(_report(future.result()))
+    seconds = time.perf_counter() - start
+
+    failed = sum(1 for _, _, err, _, _ in results if err)
+    done_bytes = sum(_size(inp) for inp, _, err, _, _ in results if not err)
+    summary = {
+        "images": len(results),
+        "failed": failed,
+        "seconds": seconds,
+        "bytes": done_bytes,
+        "images_per_s": (len(results) - failed) / seconds if seconds > 0 else 0.0,
+        "mb_per_s": done_bytes / 1e6 / seconds if seconds > 0 else 0.0,
+    }
+    statuses = [cached for _, _, _, _, cached in results if cached]
+    if statuses:
+        summary["cache_hits"] = statuses.count("hit")
+        summary["cache_misses"] = statuses.count("miss")
+    print_summary(summary, workers)
+    if getattr(args, "profile", None):
+        records = [rec for _, _, _, rec, _ in results if rec is not None]
+        summary["profile"] = summarize(records)
+        try:
+            write_records(args.profile, records + [{"summary": summary["profile"]}])
+        except RenderError as e:
+            print(e, file=sys.stderr)
+        print_profile(summary["profile"])
+    return summary
+
+
+def print_summary(summary, workers):
+    if not summary["images"]:
+        print("No input images found for --batch", file=sys.stderr)
+        return
+    print(f"Processed {summary['images']} images ({summary['failed']} failed) "
+          f"in {summary['seconds']:.2f}s with {workers} worker(s): "
+          f"{summary['images_per_s']:.2f} images/s, {summary['mb_per_s']:.2f} MB/s")
+    if "cache_hits" in summary:
+        looked_up = summary["cache_hits"] + summary["cache_misses"]
+        print(f"Result cache: {summary['cache_hits']} of {looked_up} hits "
+              f"({100.0 * summary['cache_hits'] / looked_up:.1f}%)")
+
+
+def batch_exit_code(summary):
+    """Exit status for a batch run: 1 if any file failed or nothing was found."""
+    return 1 if summary["failed"] or not summary["images"] else 0
+
+
+def _report(result):
+    inp, out, err, _, cached = result
+    if err:
+        print(f"Error processing {inp}: {err}", file=sys.stderr)
+    else:
+        print(f"Saved {inp} -> {out}" + (" (cached)" if cached == "hit" else ""))
+    return result
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _no_warm(args):
+    pass
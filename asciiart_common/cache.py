@@ -0,0 +1,263 @@
+"""
+On-disk caches: least-recently-used eviction, and the result cache.
+
+The glyph atlas, mask and result caches keep one file per entry in a
+directory and bound it by bytes with ``evict``; a cache hit touches its
+file so that eviction removes the least recently used ones first.
+
+The result cache (``--result_cache DIR``) stores finished outputs keyed by
+a hash of everything they depend on: the input file's bytes, the tool, a
+digest of the source of every package that renders (so an upgrade or a
+local change never serves outputs of older code), the Pillow version, the
+output format and every option that
+can change the pixels or their encoding, with ``--font`` and
+``--palette_from`` replaced by hashes of the files they name (a font name
+that Pillow looks up in the system font directories is kept as is).
+Options that only affect how a render runs (``--threads``, ``--workers``, the other
+caches, ``--profile``) are left out. On a hit the stored file is copied to
+the output path instead of rendering. Entries are copies, never hard links
+of outputs, so rewriting an output in place cannot change the cache.
+
+Runs that write more than their output (``--save_palette``, the text
+outputs) or read more than one input file (``--sequence``) are not cached.
+"""
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import PIL
+
+from .imagefile import output_format
+from .profile import NULL_PROFILER, run_profiled, tool_name
+
+# Bump when the key material or the stored layout changes
+RESULT_FORMAT = 2
+
+# Packages whose source the outputs depend on
+RENDER_PACKAGES = ("ascii_border", "ascii_border_8bit", "eightbit_filter", "asciiart_common")
+
+DEFAULT_RESULT_CACHE_MB = 1024
+
+# Options that never change the output file
+NEUTRAL_OPTIONS = {
+    "input", "output", "batch", "workers", "profile", "threads",
+    "glyph_cache", "no_glyph_cache", "mask_cache", "mask_cache_mb",
+    "result_cache", "result_cache_mb",
+}
+# Options naming files whose contents the output depends on
+FILE_OPTIONS = ("font", "palette_from")
+# Options that make a run uncacheable
+UNCACHEABLE_OPTIONS = ("save_palette", "sequence", "text_out", "ansi_out", "html_out")
+
+# Result caches already created in this process
+_CACHES = {}
+
+
+def evict(cache_dir, max_bytes, keep=None, suffix=".json"):
+    """
+    Delete least-recently-used cache files (those ending in ``suffix``) until
+    the directory fits ``max_bytes``.
+    """
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        p = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+        total += st.st_size
+    entries.sort()
+    for _, size, p in entries:
+        if total <= max_bytes:
+            break
+        if p == keep:
+            continue
+        try:
+            os.remove(p)
+            total -= size
+        except OSError:
+            pass
+
+
+@contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    """
+    Open a temporary file beside ``path`` that replaces ``path`` once the
+    block succeeds and is removed if it fails, so concurrent workers never
+    see a partial file and failed writes leave nothing behind.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as fh:
+            yield fh
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def add_result_cache_arguments(parser):
+    """Add ``--result_cache`` and ``--result_cache_mb`` to a tool's argument parser."""
+    parser.add_argument(
+        "--result_cache", "--result-cache", default=None, metavar="DIR",
+        help="Directory caching finished outputs by input and option hash; an unchanged "
+             "input is copied from it instead of rendered (default: $ASCIIART_RESULT_CACHE, "
+             "or no cache)")
+    parser.add_argument(
+        "--result_cache_mb", "--result-cache-mb", type=int, default=DEFAULT_RESULT_CACHE_MB,
+        metavar="MB",
+        help="Size of the --result_cache directory, least recently used outputs are "
+             f"evicted beyond it (default: {DEFAULT_RESULT_CACHE_MB})")
+
+
+@functools.lru_cache(maxsize=None)
+def code_digest():
+    """SHA-256 hex digest of the source files of ``RENDER_PACKAGES``."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    h = hashlib.sha256()
+    for package in RENDER_PACKAGES:
+        pkg_dir = os.path.join(root, package)
+        for dirpath, dirnames, filenames in os.walk(pkg_dir):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(".py"):
+                    path = os.path.join(dirpath, name)
+                    h.update(os.path.relpath(path, root).encode("utf-8") + b"\0")
+                    h.update(file_digest(path).encode("ascii"))
+    return h.hexdigest()
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Directory of rendered outputs keyed by content hash, bounded by bytes."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_RESULT_CACHE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, tool, args, input_path, output_path):
+        """
+        Hash of everything ``tool``'s output for ``input_path`` depends on,
+        or None when the run cannot be cached.
+        """
+        if any(getattr(args, name, None) for name in UNCACHEABLE_OPTIONS):
+            return None
+        if not isinstance(input_path, str) or not os.path.isfile(input_path):
+            return None
+        options = {}
+        for name, value in sorted(vars(args).items()):
+            if name in NEUTRAL_OPTIONS:
+                continue
+            if name in FILE_OPTIONS and value and os.path.isfile(value):
+                value = {"sha256": file_digest(value)}
+            options[name] = value
+        material = {
+            "format": RESULT_FORMAT,
+            "tool": tool,
+            "code": code_digest(),
+            "pillow": PIL.__version__,
+            "input": file_digest(input_path),
+            "output_format": output_format(output_path, args),
+            "options": options,
+        }
+        blob = json.dumps(material, sort_keys=True, default=repr).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.result")
+
+    def fetch(self, key, output_path):
+        """Copy the stored output of ``key`` to ``output_path``; False on a miss."""
+        path = self.path(key)
+        try:
+            _copy(path, output_path)
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key, output_path):
+        """Store the output just written to ``output_path`` under ``key``."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path(key)
+            _copy(output_path, path)
+            evict(self.cache_dir, self.max_bytes, keep=path, suffix=".result")
+        except OSError:
+            # The on-disk cache is an optimization only
+            pass
+
+
+def _copy(src, dst):
+    with open(src, "rb") as fsrc, atomic_write(dst) as fdst:
+        shutil.copyfileobj(fsrc, fdst)
+
+
+def result_cache_dir(args):
+    """Result cache directory from ``--result_cache`` or $ASCIIART_RESULT_CACHE, if any."""
+    return getattr(args, "result_cache", None) or os.environ.get("ASCIIART_RESULT_CACHE") or None
+
+
+def get_result_cache(args):
+    """Return the result cache configured by ``--result_cache``, or None."""
+    cache_dir = result_cache_dir(args)
+    if not cache_dir:
+        return None
+    key = (cache_dir, args.result_cache_mb)
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = ResultCache(cache_dir, args.result_cache_mb * 1024 * 1024)
+        _CACHES[key] = cache
+    return cache
+
+
+def run_cached(process, args, input_path, output_path):
+    """
+    ``run_profiled`` through the result cache. Returns ``(record, status)``
+    with status ``"hit"``, ``"miss"``, or None when the run is not cached.
+    Hits and misses are also counted on the profiler
+    (``result_cache_hits``, ``result_cache_misses``).
+    """
+    cache = get_result_cache(args)
+    if cache is None:
+        return run_profiled(process, args, input_path, output_path), None
+    status = None
+
+    def cached(args, input_path, output_path, profiler=NULL_PROFILER):
+        nonlocal status
+        with profiler.stage("result_cache"):
+            key = cache.key(tool_name(process), args, input_path, output_path)
+            if key is not None and cache.fetch(key, output_path):
+                status = "hit"
+                profiler.count("result_cache_hits")
+                return
+        process(args, input_path, output_path, profiler)
+        if key is not None:
+            status = "miss"
+            profiler.count("result_cache_misses")
+            with profiler.stage("result_cache"):
+                cache.store(key, output_path)
+
+    # Records name the tool from the function's module
+    cached.__module__ = process.__module__
+    return run_profiled(cached, args, input_path, output_path), status
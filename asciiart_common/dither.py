@@ -0,0 +1,158 @@
+"""
+Dithering modes selectable with ``--dither_mode`` (``--dither`` alone is ``fs``).
+
+``fs`` is Pillow's Floyd–Steinberg error diffusion: serial, so it cannot be
+split into tiles without seams. ``ordered`` (an 8x8 Bayer matrix) and
+``bluenoise`` (a 64x64 void-and-cluster mask) instead add a per-pixel
+threshold offset that depends only on the pixel's absolute position, and
+then map to the nearest palette color. Any tile, strip or frame rendered
+with its ``origin`` gives the same pixels as the whole image at once.
+
+The offset spans the palette's typical color step: the median distance
+from each palette color to its nearest neighbour, per channel.
+"""
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # fs needs Pillow only
+    np = None
+
+from .errors import RenderError
+
+MODES = ("fs", "ordered", "bluenoise")
+ORDERED_MODES = ("ordered", "bluenoise")
+
+BAYER_SIZE = 8
+BLUE_NOISE_SIZE = 64
+# Void-and-cluster Gaussian width and seed of the initial pattern
+BLUE_NOISE_SIGMA = 1.5
+BLUE_NOISE_SEED = 0
+# Pixels per block when applying a threshold map
+BLOCK_PIXELS = 1 << 18
+
+# Threshold maps already built in this process
+_MAPS = {}
+
+
+def dither_mode(value):
+    """
+    Normalize a ``--dither`` value: None/False for no dithering, True for
+    ``"fs"`` (the former on/off flag), or one of ``MODES``.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return "fs"
+    if value not in MODES:
+        raise RenderError(f"Unknown dither mode '{value}'")
+    return value
+
+
+def args_dither(args):
+    """The dither mode of parsed options: ``--dither_mode``, else ``--dither``."""
+    return dither_mode(getattr(args, "dither_mode", None) or args.dither)
+
+
+def pillow_dither(mode):
+    """The Pillow dither constant for mapping after any ordered offset is applied."""
+    return Image.FLOYDSTEINBERG if mode == "fs" else Image.NONE
+
+
+def bayer(n=BAYER_SIZE):
+    """``n`` x ``n`` Bayer index matrix (``n`` a power of two), values ``0..n*n-1``."""
+    m = np.zeros((1, 1), dtype=np.int64)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return m
+
+
+def void_and_cluster(n=BLUE_NOISE_SIZE, sigma=BLUE_NOISE_SIGMA, seed=BLUE_NOISE_SEED):
+    """
+    ``n`` x ``n`` blue-noise rank matrix (values ``0..n*n-1``) by Ulichney's
+    void-and-cluster method on a torus.
+    """
+    size = n * n
+    d = np.minimum(np.arange(n), n - np.arange(n))
+    kernel = np.exp(-(d[:, np.newaxis] ** 2 + d[np.newaxis, :] ** 2) / (2 * sigma * sigma))
+
+    def shifted(i):
+        # Energy contributed by a point at cell i, on the torus
+        return np.roll(kernel, (i // n, i % n), axis=(0, 1)).ravel()
+
+    rng = np.random.default_rng(seed)
+    ones = np.zeros(size, dtype=bool)
+    ones[rng.choice(size, size // 10, replace=False)] = True
+    energy = np.zeros(size)
+    for i in np.nonzero(ones)[0]:
+        energy += shifted(i)
+    # Move the tightest cluster into the largest void until they coincide
+    while True:
+        cluster = np.where(ones, energy, -np.inf).argmax()
+        ones[cluster] = False
+        energy -= shifted(cluster)
+        void = np.where(ones, np.inf, energy).argmin()
+        ones[void] = True
+        energy += shifted(void)
+        if void == cluster:
+            break
+    initial, initial_energy = ones.copy(), energy.copy()
+    rank = np.empty(size, dtype=np.int64)
+    # Rank the initial points, removing the tightest cluster first
+    count = int(ones.sum())
+    for r in range(count - 1, -1, -1):
+        cluster = np.where(ones, energy, -np.inf).argmax()
+        ones[cluster] = False
+        energy -= shifted(cluster)
+        rank[cluster] = r
+    # Then fill the largest void until every cell is ranked
+    ones, energy = initial, initial_energy
+    for r in range(count, size):
+        void = np.where(ones, np.inf, energy).argmin()
+        ones[void] = True
+        energy += shifted(void)
+        rank[void] = r
+    return rank.reshape(n, n)
+
+
+def threshold_map(mode):
+    """Thresholds in ``(0, 1)`` for an ordered ``mode``, built once per process."""
+    m = _MAPS.get(mode)
+    if m is None:
+        ranks = bayer() if mode == "ordered" else void_and_cluster()
+        m = ((ranks + 0.5) / ranks.size).astype(np.float32)
+        _MAPS[mode] = m
+    return m
+
+
+def palette_spread(colors):
+    """Per-channel color step of a palette: median nearest-neighbour distance / sqrt(3)."""
+    c = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    if len(c) < 2:
+        return 0.0
+    d = np.sqrt(((c[:, np.newaxis, :] - c[np.newaxis, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(d, np.inf)
+    return float(np.median(d.min(axis=1))) / np.sqrt(3.0)
+
+
+def ordered_offset(img, mode, colors, origin=(0, 0)):
+    """
+    Return ``img`` (RGB) with the ``mode`` threshold map added, scaled to the
+    spread of palette ``colors``; ``origin`` is the image's top-left position
+    in the full frame so tiles line up.
+    """
+    t = threshold_map(mode)
+    n = t.shape[0]
+    offsets = np.rint((t - 0.5) * palette_spread(colors)).astype(np.int16)
+    width, height = img.size
+    x0, y0 = origin
+    offsets = offsets[:, (np.arange(width) + x0) % n]
+    src = np.asarray(img)
+    out = np.empty_like(src)
+    rows = max(1, BLOCK_PIXELS // max(1, width))
+    for y in range(0, height, rows):
+        block = src[y:y + rows].astype(np.int16)
+        block += offsets[(np.arange(y, y + block.shape[0]) + y0) % n][:, :, np.newaxis]
+        np.clip(block, 0, 255, out=block)
+        out[y:y + block.shape[0]] = block
+    return Image.fromarray(out)
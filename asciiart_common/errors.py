@@ -0,0 +1,10 @@
+"""
+Error type shared by the tools' library entry points.
+"""
+
+
+class RenderError(Exception):
+    """
+    A failure reported to the user as-is: the CLIs print the message to
+    stderr and exit with status 1, batch runs record it against the file.
+    """
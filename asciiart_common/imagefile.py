@@ -0,0 +1,241 @@
+"""
+Decoding inputs and encoding outputs with the encoder options.
+
+``open_rgb`` decodes an input as RGB without the extra full-size copy that
+``convert("RGB")`` makes of an image that already is RGB. Every render
+composites the original pixels, so inputs are always decoded at full
+resolution.
+
+Inputs that already are decoded pixels, a raw 8-bit buffer
+(``--input_format raw`` with ``--input_width``, ``--input_height`` and
+``--input_channels``) or a NumPy ``.npy`` array, are memory-mapped by
+``map_array`` instead of decoded, and rows of the mapping are wrapped as
+images by ``array_image``: without a copy for 1 and 4 channels, unpacked
+into Pillow's four-byte pixels for RGB.
+
+``save_image`` writes a result in the format named by ``--format`` or the
+output extension, with ``--compress_level`` and ``--optimize``. Palette
+("P") results are written as indexed images where the format has them
+(PNG, GIF, BMP, TIFF), which is a third of the data of RGB and encodes
+faster; other formats get RGB. ``raw`` and ``npy`` outputs (``.raw`` and
+``.npy`` extensions) are the RGB pixels, ``(height, width, 3)`` uint8.
+"""
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+from .errors import RenderError
+
+# --format values and the Pillow format each one names
+FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP", "gif": "GIF", "raw": "RAW", "npy": "NPY"}
+MIME_TYPES = {
+    "PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "GIF": "image/gif",
+    "RAW": "application/octet-stream", "NPY": "application/octet-stream",
+}
+# Pillow formats that store "P" images as indexed color
+PALETTE_FORMATS = ("PNG", "GIF", "BMP", "TIFF")
+
+# --input_format values, read as pixel arrays instead of decoded by Pillow
+INPUT_FORMATS = ("raw", "npy")
+# Extensions of the pixel array formats, read and written without Pillow
+ARRAY_EXTENSIONS = {".raw": "RAW", ".npy": "NPY"}
+NPY_MAGIC = b"\x93NUMPY"
+# Image modes of pixel arrays by channel count
+ARRAY_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+
+
+def add_input_arguments(parser):
+    """Add ``--input_format`` and the raw input geometry to a tool's argument parser."""
+    parser.add_argument(
+        "--input_format", "--input-format", choices=INPUT_FORMATS, default=None,
+        help="Read INPUT as raw 8-bit pixels or a NumPy .npy array, memory-mapped "
+             "instead of decoded (default: npy for .npy files, else any image format)")
+    parser.add_argument(
+        "--input_width", "--input-width", type=int, default=None,
+        help="Width in pixels of a raw input")
+    parser.add_argument(
+        "--input_height", "--input-height", type=int, default=None,
+        help="Height in pixels of a raw input")
+    parser.add_argument(
+        "--input_channels", "--input-channels", type=int, choices=sorted(ARRAY_MODES),
+        default=3, help="Channels of a raw input: gray, RGB or RGBA (default: 3)")
+
+
+def add_output_arguments(parser):
+    """Add the output encoder options to a tool's argument parser."""
+    parser.add_argument(
+        "--format", choices=sorted(FORMATS), default=None,
+        help="Output format (default: from the output file extension)")
+    parser.add_argument(
+        "--compress_level", "--compress-level", type=int, choices=range(10), default=None,
+        metavar="0-9",
+        help="PNG zlib compression level, 0 (fastest) to 9 (smallest) (default: 6)")
+    parser.add_argument(
+        "--optimize", action="store_true",
+        help="Spend more encode time for smaller PNG, JPEG, GIF and WebP files")
+
+
+def input_format(path, args=None):
+    """
+    ``"raw"`` or ``"npy"`` when ``path`` (or a binary file) holds a pixel
+    array, from ``--input_format``, a ``.npy`` extension or the ``.npy``
+    magic; None when Pillow decodes it.
+    """
+    fmt = getattr(args, "input_format", None)
+    if fmt:
+        return fmt
+    if isinstance(path, str):
+        return "npy" if os.path.splitext(path)[1].lower() == ".npy" else None
+    pos = path.tell()
+    magic = path.read(len(NPY_MAGIC))
+    path.seek(pos)
+    return "npy" if magic == NPY_MAGIC else None
+
+
+def map_array(path, args=None):
+    """
+    Memory-map the pixels of a raw or ``.npy`` input as a ``(height, width,
+    channels)`` uint8 array; rows are only read from disk when used. Binary
+    files are read into memory. A raw input must be exactly the size its
+    geometry implies. Raises ``RenderError``.
+    """
+    try:
+        if input_format(path, args) == "npy":
+            arr = np.load(path, mmap_mode="r" if isinstance(path, str) else None,
+                          allow_pickle=False)
+        else:
+            width = getattr(args, "input_width", None)
+            height = getattr(args, "input_height", None)
+            if not (width and height) or width < 0 or height < 0:
+                raise RenderError("--input_format raw needs --input_width and --input_height")
+            shape = (height, width, getattr(args, "input_channels", 3))
+            expected = shape[0] * shape[1] * shape[2]
+            data = None if isinstance(path, str) else path.read()
+            size = os.path.getsize(path) if data is None else len(data)
+            # A wrong geometry must not silently read part of the file
+            if size != expected:
+                raise RenderError(
+                    f"Raw input is {size} bytes, but {width}x{height} with {shape[2]} "
+                    f"channels needs {expected}")
+            if data is None:
+                arr = np.memmap(path, dtype=np.uint8, mode="r", shape=shape)
+            else:
+                arr = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+    except RenderError:
+        raise
+    except Exception as e:
+        raise RenderError(f"Error opening input image: {e}") from e
+    if arr.ndim == 2:
+        arr = arr[:, :, np.newaxis]
+    if arr.dtype != np.uint8 or arr.ndim != 3 or arr.shape[2] not in ARRAY_MODES:
+        raise RenderError(
+            "Error opening input image: expected a (height, width[, 1|3|4]) uint8 array, "
+            f"got {arr.dtype} {arr.shape}")
+    return arr
+
+
+def array_image(arr):
+    """
+    Wrap rows of a ``(height, width, channels)`` uint8 array as an image,
+    sharing the array's memory where Pillow's layout allows (1 and 4
+    channels). Shared images are read-only; convert them before drawing.
+    """
+    height, width, channels = arr.shape
+    mode = ARRAY_MODES[channels]
+    if not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    return Image.frombuffer(mode, (width, height), arr, "raw", mode, 0, 1)
+
+
+def open_rgb(path, args=None):
+    """
+    Decode ``path`` (or a binary file) as an RGB image, raising
+    ``RenderError``. Pixel arrays (see ``input_format``) are mapped rather
+    than decoded; the result never shares their memory.
+    """
+    if input_format(path, args):
+        img = array_image(map_array(path, args))
+        return img if img.mode == "RGB" else img.convert("RGB")
+    try:
+        img = Image.open(path)
+        img.load()
+        return img if img.mode == "RGB" else img.convert("RGB")
+    except Exception as e:
+        raise RenderError(f"Error opening input image: {e}") from e
+
+
+def output_format(path, args=None):
+    """Pillow format for ``path``: ``--format`` if given, else from the extension."""
+    fmt = getattr(args, "format", None)
+    if fmt:
+        return FORMATS[fmt]
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ARRAY_EXTENSIONS:
+        return ARRAY_EXTENSIONS[ext]
+    try:
+        return Image.registered_extensions()[ext]
+    except KeyError:
+        raise RenderError(f"Unknown output format for '{path}'; use --format") from None
+
+
+def save_params(fmt, args=None):
+    """Pillow ``save`` keywords for the encoder options in ``args``."""
+    optimize = bool(getattr(args, "optimize", False))
+    level = getattr(args, "compress_level", None)
+    params = {}
+    if fmt == "PNG":
+        if level is not None:
+            params["compress_level"] = level
+        if optimize:
+            params["optimize"] = True
+    elif fmt in ("JPEG", "GIF"):
+        if optimize:
+            params["optimize"] = True
+    elif fmt == "WEBP":
+        if optimize:
+            # Slowest, smallest encoder method
+            params["method"] = 6
+    return params
+
+
+def npy_header(size):
+    """``.npy`` header of a ``(height, width, 3)`` uint8 array of an RGB image of ``size``."""
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buf, {"descr": "|u1", "fortran_order": False, "shape": (size[1], size[0], 3)})
+    return buf.getvalue()
+
+
+def save_array(img, fp, fmt):
+    """Write the RGB pixels of ``img`` to ``fp`` (a path or binary file) as ``fmt`` (RAW or NPY)."""
+    if isinstance(fp, str):
+        with open(fp, "wb") as fh:
+            save_array(img, fh, fmt)
+        return
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if fmt == "NPY":
+        fp.write(npy_header(img.size))
+    fp.write(img.tobytes())
+
+
+def save_image(img, path, args=None, fmt=None):
+    """
+    Save ``img`` to ``path`` (or a binary file, with ``fmt``) with the
+    encoder options in ``args``, keeping "P" images indexed where the
+    format allows. Raises ``RenderError``.
+    """
+    try:
+        fmt = fmt or output_format(path, args)
+        if fmt in ("RAW", "NPY"):
+            save_array(img, path, fmt)
+            return
+        if img.mode == "P" and fmt not in PALETTE_FORMATS:
+            img = img.convert("RGB")
+        img.save(path, fmt, **save_params(fmt, args))
+    except RenderError:
+        raise
+    except Exception as e:
+        raise RenderError(f"Error saving output image: {e}") from e
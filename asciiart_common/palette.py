@@ -0,0 +1,152 @@
+"""
+Fixed palettes: palette files and lookup-table mapping.
+
+A palette file is plain text with one ``RRGGBB`` hex color per line (the
+``.hex`` format used by common palette sites); blank lines and lines
+starting with ``;`` or ``//`` are ignored, and a leading ``#`` is accepted.
+
+Mapping an image to a fixed palette goes through ``PaletteLUT``: a table
+over the RGB cube quantized to ``bits`` per channel (32^3 for 5 bits, 64^3
+for 6) holding the index of the nearest palette color to each box centre,
+so each image costs one vectorized gather. Tables are built once per
+(palette file, bits) and process.
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+from .dither import ORDERED_MODES, ordered_offset
+from .errors import RenderError
+
+DEFAULT_LUT_BITS = 6
+LUT_BITS = (5, 6, 7)
+# Pixels per block when computing table keys
+CHUNK_PIXELS = 1 << 16
+
+# Tables already built in this process
+_LUTS = {}
+
+
+def load_palette(path):
+    """Read a palette file as an ``(n, 3)`` ``uint8`` array."""
+    colors = []
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line or line.startswith((";", "//")):
+                    continue
+                value = line.lstrip("#")
+                if len(value) != 6:
+                    raise ValueError(f"not an RRGGBB color: {line!r}")
+                colors.append([int(value[i:i + 2], 16) for i in (0, 2, 4)])
+    except (OSError, ValueError) as e:
+        raise RenderError(f"Error reading palette file '{path}': {e}") from e
+    if not 0 < len(colors) <= 256:
+        raise RenderError(
+            f"Error reading palette file '{path}': expected 1 to 256 colors, got {len(colors)}")
+    return np.array(colors, dtype=np.uint8)
+
+
+def save_palette(path, colors):
+    """Write an ``(n, 3)`` color array as a palette file."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            for r, g, b in np.asarray(colors, dtype=np.uint8).tolist():
+                fh.write(f"{r:02x}{g:02x}{b:02x}\n")
+    except OSError as e:
+        raise RenderError(f"Error writing palette file '{path}': {e}") from e
+
+
+def image_palette(pal_image):
+    """The colors of a "P" image's palette as an ``(n, 3)`` ``uint8`` array."""
+    return np.array(pal_image.getpalette("RGB"), dtype=np.uint8).reshape(-1, 3)
+
+
+class PaletteLUT:
+    """Nearest-color lookup table for a fixed palette."""
+
+    def __init__(self, colors, bits=DEFAULT_LUT_BITS):
+        if bits not in LUT_BITS:
+            raise RenderError(f"LUT bits must be one of {', '.join(map(str, LUT_BITS))}")
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        self.bits = bits
+        self.shift = 8 - bits
+        n = 1 << bits
+        # Box centres along one axis, then the nearest color for each box,
+        # one red plane at a time to bound the distance matrix
+        centre = (np.arange(n, dtype=np.int32) << self.shift) + ((1 << self.shift) >> 1)
+        g, b = np.meshgrid(centre, centre, indexing="ij")
+        gb = np.stack([g.ravel(), b.ravel()], axis=1)
+        pal = self.colors.astype(np.int32)
+        d_gb = ((gb[:, np.newaxis, :] - pal[np.newaxis, :, 1:]) ** 2).sum(axis=2)
+        self.table = np.empty((n, n * n), dtype=np.uint8)
+        for r in range(n):
+            d = d_gb + (centre[r] - pal[:, 0]) ** 2
+            self.table[r] = d.argmin(axis=1)
+        self.table = self.table.ravel()
+        self._image = None
+
+    @property
+    def image(self):
+        """A "P" image carrying the palette, for ``Image.quantize(palette=...)``."""
+        if self._image is None:
+            self._image = Image.new("P", (1, 1))
+            self._image.putpalette(self.colors.ravel().tolist())
+        return self._image
+
+    def indices(self, rgb):
+        """Palette indices of an ``(h, w, 3)`` ``uint8`` array, as ``(h, w)`` ``uint8``."""
+        s, bits = self.shift, self.bits
+        out = np.empty(rgb.shape[:2], dtype=np.uint8)
+        # Row blocks keep the uint32 keys cache-sized
+        rows = max(1, CHUNK_PIXELS // max(1, rgb.shape[1]))
+        key = np.empty((rows, rgb.shape[1]), dtype=np.uint32)
+        tmp = np.empty_like(key)
+        for y in range(0, rgb.shape[0], rows):
+            block = rgb[y:y + rows]
+            k, t = key[:block.shape[0]], tmp[:block.shape[0]]
+            np.right_shift(block[..., 0], s, out=k, casting="unsafe")
+            np.left_shift(k, 2 * bits, out=k)
+            np.right_shift(block[..., 1], s, out=t, casting="unsafe")
+            np.left_shift(t, bits, out=t)
+            k |= t
+            np.right_shift(block[..., 2], s, out=t, casting="unsafe")
+            k |= t
+            np.take(self.table, k, out=out[y:y + block.shape[0]])
+        return out
+
+    def to_palette(self, img, dither=None, origin=(0, 0)):
+        """
+        Map ``img`` (RGB) to the palette with a ``--dither`` mode and return
+        the "P" image. Floyd–Steinberg is sequential error diffusion, so it
+        goes through Pillow instead; ordered modes offset ``img`` (placed at
+        ``origin`` in the full frame) before the lookup.
+        """
+        if dither == "fs":
+            return img.quantize(palette=self.image, dither=Image.FLOYDSTEINBERG)
+        if dither in ORDERED_MODES:
+            img = ordered_offset(img, dither, self.colors, origin)
+        pal = Image.frombuffer("P", img.size, self.indices(np.asarray(img)), "raw", "P", 0, 1)
+        pal.putpalette(self.image.getpalette())
+        return pal
+
+    def quantize(self, img, dither=None, origin=(0, 0)):
+        """``to_palette`` returned as RGB."""
+        return self.to_palette(img, dither, origin).convert("RGB")
+
+
+def get_lut(path, bits=DEFAULT_LUT_BITS):
+    """The ``PaletteLUT`` for a palette file, built once per process."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        raise RenderError(f"Error reading palette file '{path}': {e}") from e
+    key = (os.path.abspath(path), mtime, bits)
+    lut = _LUTS.get(key)
+    if lut is None:
+        lut = PaletteLUT(load_palette(path), bits)
+        _LUTS[key] = lut
+    return lut
@@ -0,0 +1,238 @@
+"""
+Multi-variant pipeline runs: several outputs from one input in one process.
+
+A pipeline spec is a JSON object naming one input and a list of outputs,
+each rendered by one of the tools with its own options::
+
+    {
+      "input": "photo.png",
+      "options": {"border": 4, "colors": 64},
+      "outputs": [
+        {"tool": "ascii_border_8bit", "output": "r0.png", "options": {"radius": 0}},
+        {"tool": "ascii_border_8bit", "output": "r8.png", "options": {"radius": 8}},
+        {"tool": "ascii_border", "output": "plain.png"},
+        {"tool": "eightbit_filter", "output": "8bit.png", "options": {"colors": 16}}
+      ]
+    }
+
+Top-level ``options`` apply to every output whose tool has them and are
+overridden by the output's own; option names are the CLI ``dest`` names,
+and relative paths are resolved against the spec file's directory: the
+input, the outputs and the ``PATH_OPTIONS`` (a relative ``font`` only when
+that file exists there, so font names the system resolves keep working).
+
+The input is decoded once. Renders take a ``SharedWork`` that holds the
+intermediates which do not depend on the option being varied: the
+grayscale grid, the ASCII canvas and the quantized canvas. Before
+rendering, every variant's ASCII cell mask is registered with it, so one
+canvas drawn through the union of the masks serves every border width and
+radius with the same font, ramp and ``--color`` (a glyph drawn for a wider
+border only adds ink where a narrower border's mask is zero). Outputs are
+identical to running each tool separately.
+
+    python3 -m asciiart_common.pipeline SPEC [--input PATH] [--profile | --profile_out FILE]
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+from PIL import Image
+
+from .api import resolve_options
+from .errors import RenderError
+from .imagefile import open_rgb, save_image
+from .profile import NULL_PROFILER, Profiler, add_profile_argument, write_records
+
+# Tools a spec may name; options that render to something other than one image
+# are not available in pipelines or the render service
+TOOLS = ("ascii_border", "ascii_border_8bit", "eightbit_filter")
+UNSUPPORTED = ("stream", "sequence", "batch", "profile", "text_out", "ansi_out", "html_out")
+
+
+class SharedWork:
+    """Intermediates of one input image, computed once and reused by every variant."""
+
+    def __init__(self):
+        self.values = {}
+        # Union of the ASCII cell masks registered per canvas key
+        self.canvas_masks = {}
+
+    def get(self, key, build, profiler=NULL_PROFILER):
+        """The value of ``key``, calling ``build()`` the first time it is needed."""
+        try:
+            value = self.values[key]
+        except KeyError:
+            value = self.values[key] = build()
+            profiler.count("shared_builds")
+        else:
+            profiler.count("shared_hits")
+        return value
+
+    def add_canvas_mask(self, key, cell_mask):
+        """Register a variant's ASCII cell mask for the canvas ``key``."""
+        union = self.canvas_masks.get(key)
+        if union is not None:
+            # NumPy is only needed by the ASCII tools, which require it anyway
+            import numpy as np
+
+            cell_mask = Image.fromarray(np.maximum(np.asarray(union), np.asarray(cell_mask)))
+        self.canvas_masks[key] = cell_mask
+
+    def canvas_mask(self, key, cell_mask):
+        """The mask to draw the canvas ``key`` through: the registered union, if any."""
+        return self.canvas_masks.get(key, cell_mask)
+
+
+class NoSharing:
+    """Stand-in for a single render: every intermediate is built where it is needed."""
+
+    def get(self, key, build, profiler=NULL_PROFILER):
+        return build()
+
+    def canvas_mask(self, key, cell_mask):
+        return cell_mask
+
+
+NO_SHARING = NoSharing()
+
+# Options naming files or directories, resolved against the spec's directory
+PATH_OPTIONS = ("font", "palette_from", "save_palette", "glyph_cache", "mask_cache")
+
+
+def _tool(name):
+    if name not in TOOLS:
+        raise RenderError(f"Unknown tool {name!r}: expected one of {', '.join(TOOLS)}")
+    main = importlib.import_module(f"{name}.__main__")
+    core = importlib.import_module(f"{name}.core")
+    return main.build_parser, core
+
+
+def tool_options(tool, options, defaults=None):
+    """
+    Resolve ``options`` for an in-process render against ``tool``'s CLI
+    defaults, after those of the shared ``defaults`` that the tool has.
+    """
+    build_parser, _ = _tool(tool)
+    known = vars(build_parser().parse_args([]))
+    merged = {name: value for name, value in (defaults or {}).items() if name in known}
+    merged.update(options)
+    try:
+        args = resolve_options(build_parser, merged)
+    except TypeError as e:
+        raise RenderError(f"{tool}: {e}") from e
+    used = [name for name in UNSUPPORTED if getattr(args, name, None)]
+    if used:
+        raise RenderError(f"{tool}: --{used[0]} is not available for in-process renders")
+    return args
+
+
+def render_variants(img, variants, defaults=None, profiler=NULL_PROFILER, palette=False):
+    """
+    Render ``variants``, a list of ``(tool, options)`` pairs, of the RGB
+    image ``img`` and return the results in order, sharing the work they
+    have in common. ``defaults`` are options for every variant whose tool
+    has them. With ``palette``, tools with a ``render_palette`` return "P"
+    images, to be saved as indexed color.
+    """
+    resolved = [(tool, _tool(tool)[1], tool_options(tool, options, defaults))
+                for tool, options in variants]
+    shared = SharedWork()
+    with profiler.stage("masks"):
+        for _, core, args in resolved:
+            if hasattr(core, "register_canvas"):
+                core.register_canvas(img.size, args, shared, profiler)
+    results = []
+    for _, core, args in resolved:
+        render = getattr(core, "render_palette", core.render) if palette else core.render
+        results.append(render(img, args, profiler=profiler, shared=shared))
+    profiler.note(image=list(img.size), variants=len(results))
+    return results
+
+
+def _resolve_paths(options, base):
+    for name in PATH_OPTIONS:
+        value = options.get(name)
+        if not isinstance(value, str) or not value:
+            continue
+        path = os.path.join(base, value)
+        if name != "font" or os.path.isfile(path):
+            options[name] = path
+
+
+def load_spec(path):
+    """Read a pipeline spec, resolving its paths against the spec's directory."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            spec = json.load(fh)
+    except (OSError, ValueError) as e:
+        raise RenderError(f"Error reading pipeline spec: {e}") from e
+    base = os.path.dirname(os.path.abspath(path))
+    try:
+        if spec.get("input"):
+            spec["input"] = os.path.join(base, spec["input"])
+        for out in spec["outputs"]:
+            out["output"] = os.path.join(base, out["output"])
+        for options in [spec.get("options")] + [out.get("options") for out in spec["outputs"]]:
+            _resolve_paths(options or {}, base)
+    except (AttributeError, KeyError, TypeError) as e:
+        raise RenderError(f"Invalid pipeline spec: {e!r}") from e
+    return spec
+
+
+def run_pipeline(spec, profiler=NULL_PROFILER):
+    """
+    Decode ``spec["input"]``, render every entry of ``spec["outputs"]`` and
+    save each to its ``output`` path. Returns the output paths.
+    """
+    try:
+        defaults = dict(spec.get("options") or {})
+        variants = [(out["tool"], dict(out.get("options") or {})) for out in spec["outputs"]]
+        paths = [out["output"] for out in spec["outputs"]]
+    except (AttributeError, KeyError, TypeError) as e:
+        raise RenderError(f"Invalid pipeline spec: {e!r}") from e
+    if not spec.get("input"):
+        raise RenderError("Pipeline spec has no input")
+
+    with profiler.stage("decode"):
+        img = open_rgb(spec["input"])
+
+    # Palette outputs are saved as indexed color where the format allows
+    results = render_variants(img, variants, defaults, profiler=profiler, palette=True)
+
+    with profiler.stage("save"):
+        for (tool, options), result, path in zip(variants, results, paths):
+            save_image(result, path, tool_options(tool, options, defaults))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render several variants of one image from a JSON pipeline spec, "
+                    "computing their shared intermediates once.")
+    parser.add_argument("spec", help="Path to the JSON pipeline spec")
+    parser.add_argument(
+        "--input", default=None, help="Input image, instead of the spec's \"input\"")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        spec = load_spec(args.spec)
+        if args.input:
+            spec["input"] = args.input
+        if args.profile:
+            profiler = Profiler()
+            with profiler:
+                paths = run_pipeline(spec, profiler)
+            write_records(args.profile, [profiler.record(
+                tool="pipeline", input=spec["input"], output=paths)])
+        else:
+            paths = run_pipeline(spec)
+    except RenderError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"Saved {len(paths)} outputs")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
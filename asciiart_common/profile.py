@@ -0,0 +1,295 @@
+"""
+Per-stage profiling for ``--profile``.
+
+A ``Profiler`` is passed down the render path; each stage runs inside
+``profiler.stage(name)``, which adds its wall and CPU time to that name.
+Times are exclusive: a stage nested in another (a frame decoded while the
+animation is being saved) is not counted twice. While a profiler is
+active, ``tracemalloc`` records the peak memory allocated through Python
+and NumPy; Pillow's image buffers use their own allocator and are not
+traced, so the process's peak resident size is reported alongside.
+
+Caches count their hits and misses with ``profiler.count(name)``; the
+totals appear under ``counters`` in the record.
+
+``NULL_PROFILER`` is the default everywhere and costs one attribute lookup
+per stage.
+
+Records are one JSON object per image. ``summarize`` turns a list of them
+into percentiles per stage, which batch runs print and append to the
+profile file. Existing profile files can be summarized later with::
+
+    python3 -m asciiart_common.profile profile.jsonl [more.jsonl ...]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from .errors import RenderError
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Percentiles reported by summarize
+PERCENTILES = (50, 90, 99)
+
+
+class Profiler:
+    """Accumulates wall/CPU time per named stage and image dimensions."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.info = {}
+        self.counters = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_traced = 0
+        # Wall and CPU time of nested stages, per open stage
+        self._open = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall += time.perf_counter() - self._t0
+        self.cpu += time.process_time() - self._c0
+        if self.trace_memory:
+            self.peak_traced = max(self.peak_traced, tracemalloc.get_traced_memory()[1])
+            if self._started_tracing:
+                tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage ``name``."""
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        self._open.append([0.0, 0.0])
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - c0
+            nested = self._open.pop()
+            if self._open:
+                self._open[-1][0] += wall
+                self._open[-1][1] += cpu
+            entry = self.stages.setdefault(name, [0.0, 0.0, 0])
+            entry[0] += wall - nested[0]
+            entry[1] += cpu - nested[1]
+            entry[2] += 1
+
+    def note(self, **info):
+        """Record image or grid facts (``image``, ``grid``, ``cells``, ...)."""
+        self.info.update(info)
+
+    def count(self, name, n=1):
+        """Add ``n`` to the counter ``name`` (cache hits, misses, ...)."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, **extra):
+        """The JSON-serializable record of everything measured so far."""
+        rec = dict(extra)
+        rec.update({
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "peak_traced_mb": round(self.peak_traced / 1e6, 3),
+            "max_rss_mb": _max_rss_mb(),
+            "stages": {name: {"wall_s": round(w, 6), "cpu_s": round(c, 6), "calls": n}
+                       for name, (w, c, n) in self.stages.items()},
+        })
+        if self.counters:
+            rec["counters"] = dict(self.counters)
+        rec.update(self.info)
+        return rec
+
+
+def _max_rss_mb():
+    """High-water resident size of this process in MB, or None where unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1e6 if sys.platform == "darwin" else 1e3), 1)
+
+
+class NullProfiler:
+    """Stand-in for a disabled profiler: every call does nothing."""
+
+    _nothing = nullcontext()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stage(self, name):
+        return self._nothing
+
+    def note(self, **info):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _ProfileFlag(argparse.Action):
+    # A bare switch that never consumes the next argument, so it cannot take
+    # an input path for its file; keeps a --profile_out given before it
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        if not getattr(namespace, self.dest, None):
+            setattr(namespace, self.dest, "-")
+
+
+def add_profile_argument(parser):
+    """
+    Add ``--profile`` and ``--profile_out`` to a tool's argument parser.
+    Both set ``args.profile`` to the destination: ``"-"`` for stderr, else
+    the file.
+    """
+    parser.add_argument(
+        "--profile", action=_ProfileFlag, default=None,
+        help="Write a JSON record of per-stage wall/CPU time and peak memory for each "
+             "image to stderr")
+    parser.add_argument(
+        "--profile_out", "--profile-out", dest="profile", default=None, metavar="FILE",
+        help="Profile as --profile, appending the records to FILE as JSON lines")
+
+
+def tool_name(process):
+    """Name of the tool whose ``process`` function this is (its top-level package)."""
+    return process.__module__.partition(".")[0]
+
+
+def run_profiled(process, args, input_path, output_path):
+    """
+    Call ``process(args, input_path, output_path)``, profiled when
+    ``args.profile`` is set; return the record, or None when not profiling.
+    """
+    if not getattr(args, "profile", None):
+        process(args, input_path, output_path)
+        return None
+    profiler = Profiler()
+    with profiler:
+        process(args, input_path, output_path, profiler)
+    return profiler.record(tool=tool_name(process), input=input_path, output=output_path)
+
+
+def write_records(dest, records):
+    """
+    Append ``records`` as JSON lines to the file ``dest``, or stderr for
+    ``"-"``. Raises ``RenderError`` when the file cannot be written.
+    """
+    lines = "".join(json.dumps(rec) + "\n" for rec in records)
+    if dest == "-":
+        sys.stderr.write(lines)
+        return
+    try:
+        with open(dest, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+    except OSError as e:
+        raise RenderError(f"Error writing profile: {e}") from e
+
+
+def percentile(values, q):
+    """Nearest-rank ``q``-th percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _spread(values):
+    out = {f"p{q}": round(percentile(values, q), 6) for q in PERCENTILES}
+    out["max"] = round(max(values), 6)
+    return out
+
+
+def summarize(records):
+    """
+    Percentiles over per-image ``records`` of total wall/CPU time, peak
+    traced memory and each stage's wall time, and the totals of their
+    counters. Images without a stage count as zero for it.
+    """
+    records = [rec for rec in records if "stages" in rec]
+    if not records:
+        return {"images": 0}
+    names = []
+    counters = {}
+    for rec in records:
+        names.extend(name for name in rec["stages"] if name not in names)
+        for name, n in rec.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + n
+    return {
+        "images": len(records),
+        "wall_s": _spread([rec["wall_s"] for rec in records]),
+        "cpu_s": _spread([rec["cpu_s"] for rec in records]),
+        "peak_traced_mb": _spread([rec["peak_traced_mb"] for rec in records]),
+        "stages": {name: _spread([rec["stages"].get(name, {}).get("wall_s", 0.0)
+                                  for rec in records]) for name in names},
+        "counters": counters,
+    }
+
+
+def print_summary(summary, file=None):
+    """Print a percentile table from ``summarize`` (to stdout by default)."""
+    file = file or sys.stdout
+    if not summary["images"]:
+        print("No profile records", file=file)
+        return
+    cols = [f"p{q}" for q in PERCENTILES] + ["max"]
+    print(f"Profile of {summary['images']} images (wall seconds unless noted)", file=file)
+    print(f"{'stage':<16}" + "".join(f"{c:>10}" for c in cols), file=file)
+    rows = list(summary["stages"].items())
+    rows += [("total", summary["wall_s"]), ("total cpu", summary["cpu_s"]),
+             ("peak traced MB", summary["peak_traced_mb"])]
+    for name, spread in rows:
+        print(f"{name:<16}" + "".join(f"{spread[c]:>10.4f}" for c in cols), file=file)
+    for name, n in summary.get("counters", {}).items():
+        print(f"{name:<26}{n:>10}", file=file)
+
+
+def load_records(paths):
+    """Per-image records from JSON-lines profile files (summary lines are skipped)."""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            records.extend(json.loads(line) for line in fh if line.strip())
+    return [rec for rec in records if "stages" in rec]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize --profile records into per-stage percentiles.")
+    parser.add_argument("files", nargs="+", help="JSON-lines files written by --profile")
+    parser.add_argument(
+        "--tool", default=None, help="Only include records of this tool")
+    args = parser.parse_args(argv)
+    records = load_records(args.files)
+    if args.tool:
+        records = [rec for rec in records if rec.get("tool") == args.tool]
+    print_summary(summarize(records))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,246 @@
+"""
+Palette quantizers selectable with ``--method``.
+
+``mediancut`` and ``fastoctree`` are Pillow's built-in quantizers. The other
+two learn a palette in NumPy and map the image to it with Pillow:
+
+``octree``
+    Top-down octree over a 64^3 color histogram: starting from the whole
+    cube, the most populous node is split into its non-empty octants while
+    the leaf count stays within ``colors``. Each leaf's color is the mean of
+    its pixels.
+``kmeans``
+    Mini-batch k-means (Sculley, 2010) on a random subsample of
+    ``KMEANS_SAMPLE`` pixels, seeded with a median-cut palette of the sample
+    and a fixed random seed so results are reproducible.
+
+With ``--palette_sample N`` any method learns its palette from about ``N``
+pixels instead of the whole image, and the image is then mapped to that
+palette in one pass. ``stratified`` takes one pixel at a random position in
+each cell of a grid over the image, so the sample holds real colors spread
+evenly; ``thumbnail`` takes a box-filtered thumbnail, whose cell averages
+pull small saturated details toward their surroundings.
+"""
+import heapq
+import math
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # Pillow-only installs keep mediancut and fastoctree
+    np = None
+
+from .dither import ORDERED_MODES, ordered_offset, pillow_dither
+from .errors import RenderError
+
+METHODS = ("mediancut", "octree", "kmeans", "fastoctree")
+SAMPLE_METHODS = ("stratified", "thumbnail")
+
+# Pillow's own quantizers
+_PILLOW_METHODS = {
+    "mediancut": Image.MEDIANCUT,
+    "fastoctree": Image.FASTOCTREE,
+}
+
+# Bits per channel of the octree histogram (its deepest level)
+OCTREE_DEPTH = 6
+# Pixels per block while building the octree histogram
+OCTREE_BLOCK = 1 << 20
+# Pixels drawn for k-means, per-iteration batch size and iteration count
+KMEANS_SAMPLE = 1 << 16
+KMEANS_BATCH = 4096
+KMEANS_ITERATIONS = 40
+KMEANS_SEED = 0
+# Seed of the stratified sample's positions within their cells
+SAMPLE_SEED = 0
+
+
+def add_sample_arguments(parser):
+    """Add ``--palette_sample`` and ``--sample_method`` to a tool's argument parser."""
+    parser.add_argument(
+        "--palette_sample", "--palette-sample", type=int, default=None, metavar="PIXELS",
+        help="Learn the palette from about PIXELS sampled pixels, then map the whole image "
+             "to it (default: learn from every pixel)")
+    parser.add_argument(
+        "--sample_method", choices=SAMPLE_METHODS, default="stratified",
+        help="How --palette_sample picks pixels: one per grid cell at a random position "
+             "(stratified, the default) or a box-filtered thumbnail")
+
+
+def sample_pixels(img, pixels, method="stratified"):
+    """
+    About ``pixels`` pixels of ``img`` (RGB) to learn a palette from, as an
+    RGB image; ``img`` itself when it is no larger.
+    """
+    if pixels < 1:
+        raise RenderError("--palette_sample must be at least 1")
+    if method not in SAMPLE_METHODS:
+        raise RenderError(f"Unknown sample method '{method}'")
+    width, height = img.size
+    if width * height <= pixels:
+        return img
+    scale = math.sqrt(pixels / (width * height))
+    # Rows first, so a single-row image (a band's pixels) still gets ~pixels columns
+    rows = min(height, max(1, round(height * scale)))
+    cols = min(width, max(1, round(pixels / rows)))
+    if method == "thumbnail":
+        return img.resize((cols, rows), resample=Image.BOX)
+    if np is None:
+        raise RenderError("Stratified palette samples require NumPy")
+    # Cell edges, and one random position inside every cell
+    xe = np.arange(cols + 1) * width // cols
+    ye = np.arange(rows + 1) * height // rows
+    rng = np.random.default_rng(SAMPLE_SEED)
+    xs = xe[:-1] + (rng.random((rows, cols)) * np.diff(xe)).astype(np.intp)
+    ys = (rng.random((rows, cols)) * np.diff(ye)[:, np.newaxis]).astype(np.intp)
+    out = np.empty((rows, cols, 3), dtype=np.uint8)
+    # One row of cells at a time, so only a strip of the image is copied
+    for r in range(rows):
+        strip = np.asarray(img.crop((0, int(ye[r]), width, int(ye[r + 1]))))
+        out[r] = strip[ys[r], xs[r]]
+    return Image.fromarray(out)
+
+
+def pixels_of(img):
+    """All pixels of an RGB image as an ``(n, 3)`` ``uint8`` array."""
+    return np.asarray(img.convert("RGB")).reshape(-1, 3)
+
+
+def octree_colors(pixels, colors):
+    """Octree palette of ``(n, 3)`` ``uint8`` pixels, as an ``(k, 3)`` array."""
+    depth = OCTREE_DEPTH
+    side = 1 << depth
+    shift = 8 - depth
+    # Histogram of pixel counts and per-channel sums, built in pixel blocks
+    # to bound the temporaries
+    counts = np.zeros(side ** 3, dtype=np.int64)
+    sums = np.zeros((side ** 3, 3), dtype=np.float64)
+    for i in range(0, len(pixels), OCTREE_BLOCK):
+        block = pixels[i:i + OCTREE_BLOCK]
+        key = (block[:, 0] >> shift).astype(np.int32) << (2 * depth)
+        key |= (block[:, 1] >> shift).astype(np.int32) << depth
+        key |= block[:, 2] >> shift
+        counts += np.bincount(key, minlength=side ** 3)
+        for c in range(3):
+            sums[:, c] += np.bincount(key, weights=block[:, c], minlength=side ** 3)
+    counts = counts.reshape(side, side, side)
+
+    # Node (d, r, g, b) covers histogram bins [r << (depth - d), (r + 1) << (depth - d))
+    # on each axis; its population is a box sum of the histogram
+    def population(d, r, g, b):
+        s = depth - d
+        return int(counts[r << s:(r + 1) << s, g << s:(g + 1) << s, b << s:(b + 1) << s].sum())
+
+    leaves = []
+    heap = [(-len(pixels), 0, 0, 0, 0)]
+    count = 1
+    while heap:
+        neg, d, r, g, b = heapq.heappop(heap)
+        if d < depth:
+            children = []
+            for i in range(8):
+                child = (d + 1, 2 * r + (i >> 2), 2 * g + ((i >> 1) & 1), 2 * b + (i & 1))
+                n = population(*child)
+                if n:
+                    children.append((-n,) + child)
+            if count - 1 + len(children) <= colors:
+                count += len(children) - 1
+                for child in children:
+                    heapq.heappush(heap, child)
+                continue
+        leaves.append((d, r, g, b))
+
+    # Leaf of every histogram bin (empty octants were never made leaves and
+    # carry no weight), then each leaf's mean color
+    leaf_of = np.zeros((side, side, side), dtype=np.int64)
+    for i, (d, r, g, b) in enumerate(leaves):
+        s = depth - d
+        leaf_of[r << s:(r + 1) << s, g << s:(g + 1) << s, b << s:(b + 1) << s] = i
+    leaf_of = leaf_of.ravel()
+    n = np.bincount(leaf_of, weights=counts.ravel(), minlength=len(leaves))
+    mean = np.stack([np.bincount(leaf_of, weights=sums[:, c], minlength=len(leaves))
+                     for c in range(3)], axis=1) / np.maximum(n, 1)[:, np.newaxis]
+    return np.clip(np.rint(mean[n > 0]), 0, 255).astype(np.uint8)
+
+
+def kmeans_colors(pixels, colors):
+    """Mini-batch k-means palette of ``(n, 3)`` ``uint8`` pixels, as ``(k, 3)``."""
+    rng = np.random.default_rng(KMEANS_SEED)
+    if len(pixels) > KMEANS_SAMPLE:
+        pixels = pixels[rng.integers(0, len(pixels), KMEANS_SAMPLE)]
+    init = Image.fromarray(pixels[np.newaxis, :, :]).quantize(
+        colors=colors, method=Image.MEDIANCUT, dither=Image.NONE)
+    centers = np.array(init.getpalette("RGB"), dtype=np.float32).reshape(-1, 3)
+    sample = pixels.astype(np.float32)
+    seen = np.zeros(len(centers), dtype=np.float32)
+    for _ in range(KMEANS_ITERATIONS):
+        batch = sample[rng.integers(0, len(sample), min(KMEANS_BATCH, len(sample)))]
+        # Squared distances without the constant |x|^2 term
+        d = (centers * centers).sum(axis=1) - 2.0 * batch @ centers.T
+        nearest = d.argmin(axis=1)
+        m = np.bincount(nearest, minlength=len(centers)).astype(np.float32)
+        s = np.stack([np.bincount(nearest, weights=batch[:, c], minlength=len(centers))
+                      for c in range(3)], axis=1).astype(np.float32)
+        # Each center moves toward its batch mean with rate m / (points seen so far)
+        seen += m
+        hit = m > 0
+        centers[hit] += (s[hit] - m[hit, np.newaxis] * centers[hit]) / seen[hit, np.newaxis]
+    return np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+
+def palette_image(colors):
+    """A "P" image carrying ``colors`` as its palette."""
+    pal = Image.new("P", (1, 1))
+    pal.putpalette(np.asarray(colors, dtype=np.uint8).ravel().tolist())
+    return pal
+
+
+def learn_palette(img, colors, method="mediancut", sample=None, sample_method="stratified"):
+    """
+    Learn a palette of at most ``colors`` colors from ``img`` (RGB), or from
+    about ``sample`` of its pixels, and return a "P" image carrying it, for
+    ``Image.quantize(palette=...)``.
+    """
+    if method not in METHODS:
+        raise RenderError(f"Unknown quantization method '{method}'")
+    if sample is not None:
+        img = sample_pixels(img, sample, sample_method)
+    if method in _PILLOW_METHODS:
+        return img.quantize(colors=colors, method=_PILLOW_METHODS[method], dither=Image.NONE)
+    if np is None:
+        raise RenderError(f"Quantization method '{method}' requires NumPy")
+    if method == "octree":
+        return palette_image(octree_colors(pixels_of(img), colors))
+    return palette_image(kmeans_colors(pixels_of(img), colors))
+
+
+def map_palette(img, palette, dither=None, origin=(0, 0)):
+    """
+    Map ``img`` (RGB) to the palette of the "P" image ``palette`` with a
+    ``--dither`` mode (see ``asciiart_common.dither``) and return the "P"
+    image. ``origin`` places ``img`` in the full frame for ordered modes.
+    """
+    if dither in ORDERED_MODES:
+        if np is None:
+            raise RenderError(f"Dither mode '{dither}' requires NumPy")
+        colors = np.array(palette.getpalette("RGB"), dtype=np.uint8).reshape(-1, 3)
+        img = ordered_offset(img, dither, colors, origin)
+    return img.quantize(palette=palette, dither=pillow_dither(dither))
+
+
+def quantize(img, colors, method="mediancut", dither=None, sample=None,
+             sample_method="stratified"):
+    """
+    Quantize ``img`` (RGB) to at most ``colors`` colors with a ``--dither``
+    mode and return the "P" image. With ``sample`` the palette is learned
+    from about that many pixels and the whole image mapped to it.
+    """
+    if sample is not None:
+        palette = learn_palette(img, colors, method, sample, sample_method)
+        return map_palette(img, palette, dither)
+    if dither is None and method in _PILLOW_METHODS:
+        # Pillow assigns pixels while building its palette
+        return img.quantize(colors=colors, method=_PILLOW_METHODS[method], dither=Image.NONE)
+    # Pillow ignores dithering when it learns the palette, so map separately
+    return map_palette(img, learn_palette(img, colors, method), dither)
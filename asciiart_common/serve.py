@@ -0,0 +1,330 @@
+"""
+Long-running HTTP render service: ``python -m <tool> serve``.
+
+Renders run on a pool of worker processes that are warmed once (fonts,
+glyph atlases, palette lookup tables) and keep their per-process caches
+(masks, atlases, palettes) across requests, so a small image costs its
+render time rather than an interpreter start. At most ``--workers``
+renders run at once and at most ``--queue`` more wait; beyond that a
+request is refused immediately with 503 and ``Retry-After`` instead of
+piling up.
+
+Endpoints:
+
+``POST /render``
+    The request body is the image file. Options are a JSON object of CLI
+    option names (``{"border": 6, "radius": 4}``) in the ``X-Options``
+    header or the ``options`` query parameter; only ``CLIENT_OPTIONS`` may
+    be set, so a client can never name server files (fonts, palettes,
+    caches) or change resource limits. Responds with the image (PNG unless
+    ``format`` is given), or 400 with the error message for invalid input
+    or options.
+``GET /metrics``
+    Prometheus text format: request counts by status, histograms of
+    request and render latency, in-flight renders and queue depth.
+``GET /healthz``
+    200 while the service accepts requests.
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .errors import RenderError
+from .imagefile import FORMATS, MIME_TYPES, open_rgb, save_image
+from .pipeline import tool_options
+
+# Options a client may set: how the image looks and is encoded. Options
+# naming server paths or setting resources stay with the server.
+CLIENT_OPTIONS = frozenset({
+    "border", "fade", "chars", "match", "color", "font_size",
+    "colors", "dither", "dither_mode", "method", "palette_sample", "sample_method", "lut_bits",
+    "radius", "quant", "band_palette", "fade_ascii", "fade_quant",
+    "format", "compress_level", "optimize",
+})
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Busy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name):
+        out = [f"# TYPE {name} histogram"]
+        for bound, n in zip(self.buckets, self.counts):
+            out.append(f'{name}_bucket{{le="{bound}"}} {n}')
+        out.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum {self.sum:.6f}")
+        out.append(f"{name}_count {self.count}")
+        return out
+
+
+class Metrics:
+    """Request counters, latency histograms and occupancy, safe across handler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.request_seconds = Histogram()
+        self.render_seconds = Histogram()
+        self.inflight = 0
+
+    def finished(self, status, seconds, render_seconds=None):
+        with self.lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+            self.request_seconds.observe(seconds)
+            if render_seconds is not None:
+                self.render_seconds.observe(render_seconds)
+
+    def text(self, workers):
+        """The metrics in Prometheus text exposition format."""
+        with self.lock:
+            lines = ["# TYPE asciiart_requests_total counter"]
+            for status, n in sorted(self.requests.items()):
+                lines.append(f'asciiart_requests_total{{status="{status}"}} {n}')
+            lines += self.request_seconds.lines("asciiart_request_seconds")
+            lines += self.render_seconds.lines("asciiart_render_seconds")
+            lines += [
+                "# TYPE asciiart_inflight gauge",
+                f"asciiart_inflight {self.inflight}",
+                "# TYPE asciiart_queue_depth gauge",
+                f"asciiart_queue_depth {max(0, self.inflight - workers)}",
+                "# TYPE asciiart_workers gauge",
+                f"asciiart_workers {workers}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def check_client_options(options):
+    """Raise ``RenderError`` for any option a client may not set (see ``CLIENT_OPTIONS``)."""
+    refused = sorted(name for name in options if name not in CLIENT_OPTIONS)
+    if refused:
+        raise RenderError(f"Option --{refused[0]} cannot be set by a client")
+
+
+def _init_worker(tool):
+    try:
+        importlib.import_module(f"{tool}.core").warm(tool_options(tool, {}))
+    except Exception:
+        # Reported per request when a render hits the same failure
+        pass
+
+
+def _render(tool, options, data):
+    """
+    Render the encoded image ``data`` in a worker; return ``(encoded,
+    content_type, seconds)``.
+    """
+    t0 = time.perf_counter()
+    args = tool_options(tool, options)
+    img = open_rgb(io.BytesIO(data), args)
+    result = importlib.import_module(f"{tool}.core").render(img, args)
+    fmt = FORMATS[args.format] if args.format else "PNG"
+    buf = io.BytesIO()
+    save_image(result, buf, args, fmt)
+    return buf.getvalue(), MIME_TYPES[fmt], time.perf_counter() - t0
+
+
+class RenderService:
+    """A warmed worker pool with bounded admission for one tool."""
+
+    def __init__(self, tool, workers=None, queue=None, timeout=60.0):
+        self.tool = tool
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = self.workers * 2 if queue is None else queue
+        self.timeout = timeout
+        self.metrics = Metrics()
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(tool,))
+
+    def render(self, data, options):
+        """
+        Render ``data`` with ``options`` and return ``(encoded,
+        content_type, seconds)``.
+        Raises ``Busy`` when the queue is full, ``RenderError`` for invalid
+        input and ``TimeoutError`` past the timeout.
+        """
+        # Invalid options are refused before taking a slot
+        check_client_options(options)
+        tool_options(self.tool, options)
+        if not self.slots.acquire(blocking=False):
+            raise Busy()
+        with self.metrics.lock:
+            self.metrics.inflight += 1
+        try:
+            future = self.pool.submit(_render, self.tool, options, data)
+        except BaseException:
+            self._release()
+            raise
+        # A render past the timeout keeps its worker busy until it ends, so
+        # the slot is held until then rather than until the request returns
+        future.add_done_callback(lambda _: self._release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"Render exceeded {self.timeout:g} s") from None
+
+    def _release(self):
+        with self.metrics.lock:
+            self.metrics.inflight -= 1
+        self.slots.release()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = "asciiart"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="text/plain; charset=utf-8", headers=()):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self._send(200, service.metrics.text(service.workers),
+                       "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/healthz":
+            self._send(200, "ok\n")
+        else:
+            self._send(404, "Not found\n")
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        if url.path != "/render":
+            self._send(404, "Not found\n")
+            return
+        t0 = time.perf_counter()
+        status, render_seconds = self._render(service, url)
+        service.metrics.finished(status, time.perf_counter() - t0, render_seconds)
+
+    def _render(self, service, url):
+        """Answer one render request; return ``(status, render seconds or None)``."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send(400, "Request body must be the image file\n")
+            return 400, None
+        if length > self.server.max_upload:
+            self._send(413, "Image exceeds the upload limit\n")
+            return 413, None
+        data = self.rfile.read(length)
+        raw = self.headers.get("X-Options") or parse_qs(url.query).get("options", ["{}"])[0]
+        try:
+            options = json.loads(raw)
+            if not isinstance(options, dict):
+                raise ValueError("options must be a JSON object")
+        except ValueError as e:
+            self._send(400, f"Invalid options: {e}\n")
+            return 400, None
+        try:
+            body, content_type, seconds = service.render(data, options)
+        except Busy:
+            self._send(503, "Render queue is full\n", headers=[("Retry-After", "1")])
+            return 503, None
+        except RenderError as e:
+            self._send(400, f"{e}\n")
+            return 400, None
+        except TimeoutError as e:
+            self._send(504, f"{e}\n")
+            return 504, None
+        except Exception as e:
+            self._send(500, f"Render failed: {e}\n")
+            return 500, None
+        self._send(200, body, content_type)
+        return 200, seconds
+
+
+def make_server(tool, host="127.0.0.1", port=8080, workers=None, queue=None,
+                timeout=60.0, max_upload_mb=64, quiet=False):
+    """
+    Return a ``ThreadingHTTPServer`` rendering with ``tool``; call
+    ``serve_forever()`` on it, and ``server.service.close()`` after
+    ``shutdown()``. Port 0 picks a free port (see ``server.server_port``).
+    """
+    server = ThreadingHTTPServer((host, port), RenderHandler)
+    server.daemon_threads = True
+    server.service = RenderService(tool, workers, queue, timeout)
+    server.max_upload = max_upload_mb * 1024 * 1024
+    server.quiet = quiet
+    return server
+
+
+def serve_main(tool, argv=None):
+    """Entry point of ``python -m <tool> serve``."""
+    parser = argparse.ArgumentParser(
+        prog=f"{tool} serve",
+        description="Serve renders over HTTP from a pool of warm worker processes.")
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument(
+        "--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Worker processes rendering in parallel (default: CPU count)")
+    parser.add_argument(
+        "--queue", type=int, default=None,
+        help="Requests allowed to wait for a worker before new ones get 503 "
+             "(default: twice --workers)")
+    parser.add_argument(
+        "--timeout", type=float, default=60.0,
+        help="Seconds a request may wait for its render before 504 (default: 60)")
+    parser.add_argument(
+        "--max_upload_mb", type=int, default=64,
+        help="Largest accepted upload in MB (default: 64)")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not log each request")
+    args = parser.parse_args(argv)
+    server = make_server(tool, args.host, args.port, args.workers, args.queue,
+                         args.timeout, args.max_upload_mb, args.quiet)
+    service = server.service
+    print(f"Serving {tool} on http://{args.host}:{server.server_port} "
+          f"({service.workers} workers, queue {service.queue})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,286 @@
+"""
+Strip-wise image input and output for bounded-memory processing.
+
+``open_reader`` returns a reader whose ``read(y0, y1)`` yields RGB rows of
+the input. Uncompressed rasters (PPM/PGM, BMP, uncompressed TIFF) are read
+straight from the file one row range at a time, and raw and ``.npy`` inputs
+from a memory mapping of it; only these stream in bounded memory. Other
+formats (PNG, JPEG, compressed TIFF) cannot be decoded partially by Pillow
+and are decoded once in full: the reader then holds one full-size RGB
+image (the decoded one itself when it is RGB, else its conversion, with
+the decoded image released).
+
+``open_writer`` returns a writer that accepts consecutive RGB strips. PNG,
+PPM, raw and ``.npy`` outputs are written as the strips arrive; other
+formats (and ``--optimize`` PNGs, which need the whole image) are assembled
+in memory and saved on ``close`` with the encoder options.
+
+``ImageStripReader`` and ``ImageStripWriter`` do the same for an image
+already in memory, so strip renderers can also work in place.
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from .imagefile import (
+    array_image, input_format, map_array, npy_header, output_format, save_image, save_params)
+
+# Bytes per pixel of the raw layouts read directly from disk
+_RAW_BYTES = {
+    "L": 1, "RGB": 3, "BGR": 3, "RGBX": 4, "RGBA": 4, "BGRX": 4, "BGRA": 4,
+}
+
+
+class StripReader:
+    """Read horizontal bands of an image file as RGB images."""
+
+    def __init__(self, path):
+        self.path = path
+        self.image = Image.open(path)
+        self.size = self.image.size
+        self.mode = self.image.mode
+        self._tiles = _raw_tiles(self.image)
+        # True when rows are read from disk on demand rather than fully decoded
+        self.streaming = self._tiles is not None
+        self._fp = open(path, "rb") if self.streaming else None
+        self._full = None
+
+    def read(self, y0, y1):
+        """Return rows ``[y0, y1)`` as an RGB image."""
+        width = self.size[0]
+        if not self.streaming:
+            if self._full is None:
+                self.image.load()
+                if self.image.mode == "RGB":
+                    self._full = self.image
+                else:
+                    self._full = self.image.convert("RGB")
+                    # Keep one full-size image, not the decoded one as well
+                    self.image.close()
+            return self._full.crop((0, y0, width, y1))
+        parts = []
+        for ty0, ty1, offset, rawmode, stride, orientation in self._tiles:
+            a, b = max(y0, ty0), min(y1, ty1)
+            if a >= b:
+                continue
+            # Row r of the tile is stored at offset + r * stride, or counted
+            # from the bottom for bottom-up (orientation -1) layouts
+            if orientation < 0:
+                first = (ty1 - b)
+            else:
+                first = (a - ty0)
+            self._fp.seek(offset + first * stride)
+            data = self._fp.read((b - a) * stride)
+            part = Image.frombytes(
+                self.mode, (width, b - a), data, "raw", rawmode, stride, orientation)
+            parts.append(part if part.mode == "RGB" else part.convert("RGB"))
+        if len(parts) == 1:
+            return parts[0]
+        strip = Image.new("RGB", (width, y1 - y0))
+        y = 0
+        for part in parts:
+            strip.paste(part, (0, y))
+            y += part.height
+        return strip
+
+    def close(self):
+        self.image.close()
+        if self._fp is not None:
+            self._fp.close()
+        self._full = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _raw_tiles(image):
+    """
+    Describe the file as full-width uncompressed tiles
+    ``(y0, y1, offset, rawmode, stride, orientation)``, or None when any
+    tile needs a real decoder.
+    """
+    if image.mode not in ("L", "RGB", "RGBA", "RGBX"):
+        return None
+    width = image.size[0]
+    tiles = []
+    for tile in image.tile:
+        codec, extents, offset, args = tile[0], tile[1], tile[2], tile[3]
+        if codec != "raw" or extents[0] != 0 or extents[2] != width:
+            return None
+        if isinstance(args, str):
+            args = (args, 0, 1)
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+        if rawmode not in _RAW_BYTES:
+            return None
+        if not stride:
+            stride = width * _RAW_BYTES[rawmode]
+        tiles.append((extents[1], extents[3], offset, rawmode, stride, orientation))
+    return sorted(tiles) if tiles else None
+
+
+class ArrayStripReader:
+    """``StripReader`` over a memory-mapped pixel array (see ``map_array``)."""
+
+    streaming = True
+
+    def __init__(self, array):
+        self.array = array
+        self.size = (array.shape[1], array.shape[0])
+
+    def read(self, y0, y1):
+        strip = array_image(self.array[y0:y1])
+        return strip if strip.mode == "RGB" else strip.convert("RGB")
+
+    def close(self):
+        self.array = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_reader(path, args=None):
+    """Strip reader for ``path``; pixel arrays are mapped (``--input_format`` in ``args``)."""
+    if input_format(path, args):
+        return ArrayStripReader(map_array(path, args))
+    return StripReader(path)
+
+
+class ImageStripReader:
+    """``StripReader`` over an RGB image already in memory."""
+
+    streaming = False
+
+    def __init__(self, image):
+        self.image = image
+        self.size = image.size
+
+    def read(self, y0, y1):
+        return self.image.crop((0, y0, self.size[0], y1))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PNGStripWriter:
+    """
+    Encode an 8-bit RGB PNG from consecutive strips. Rows use the "Up"
+    filter, carrying the previous row across strip boundaries.
+    """
+
+    def __init__(self, path, size, compress_level=6):
+        self.size = size
+        self._fh = open(path, "wb")
+        self._fh.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", size[0], size[1], 8, 2, 0, 0, 0))
+        self._z = zlib.compressobj(compress_level)
+        self._prev = np.zeros(size[0] * 3, dtype=np.uint8)
+
+    def _chunk(self, kind, data):
+        self._fh.write(struct.pack(">I", len(data)))
+        self._fh.write(kind)
+        self._fh.write(data)
+        self._fh.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write(self, strip):
+        rows = np.asarray(strip.convert("RGB"), dtype=np.uint8).reshape(strip.height, -1)
+        prev = np.vstack([self._prev[np.newaxis, :], rows[:-1]])
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        np.subtract(rows, prev, out=filtered[:, 1:])
+        self._prev = rows[-1].copy()
+        data = self._z.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        self._chunk(b"IDAT", self._z.flush())
+        self._chunk(b"IEND", b"")
+        self._fh.close()
+
+
+class PPMStripWriter:
+    """Write a binary PPM (P6) from consecutive strips."""
+
+    def __init__(self, path, size):
+        self._fh = open(path, "wb")
+        self._fh.write(b"P6\n%d %d\n255\n" % size)
+
+    def write(self, strip):
+        self._fh.write(strip.convert("RGB").tobytes())
+
+    def close(self):
+        self._fh.close()
+
+
+class ArrayStripWriter(PPMStripWriter):
+    """Write raw RGB pixels, or a ``.npy`` array with ``fmt="NPY"``, from consecutive strips."""
+
+    def __init__(self, path, size, fmt="RAW"):
+        self._fh = open(path, "wb")
+        if fmt == "NPY":
+            self._fh.write(npy_header(size))
+
+
+class BufferedStripWriter:
+    """Assemble strips into one image and save it with Pillow on ``close``."""
+
+    def __init__(self, path, size, args=None):
+        self.path = path
+        self.args = args
+        self.image = Image.new("RGB", size)
+        self._y = 0
+
+    def write(self, strip):
+        self.image.paste(strip, (0, self._y))
+        self._y += strip.height
+
+    def close(self):
+        save_image(self.image, self.path, self.args)
+
+
+class ImageStripWriter:
+    """Write consecutive strips back into an image in memory."""
+
+    def __init__(self, image):
+        self.image = image
+        self._y = 0
+
+    def write(self, strip):
+        self.image.paste(strip, (0, self._y))
+        self._y += strip.height
+
+    def close(self):
+        pass
+
+
+def open_writer(path, size, args=None):
+    """
+    Pick a streaming writer for the output format (``--format`` in ``args``,
+    else the extension), else a buffered one.
+    """
+    fmt = output_format(path, args)
+    params = save_params(fmt, args)
+    if fmt == "PNG" and not params.get("optimize"):
+        return PNGStripWriter(path, size, params.get("compress_level", 6))
+    if fmt == "PPM" and os.path.splitext(path)[1].lower() in (".ppm", ".pnm"):
+        return PPMStripWriter(path, size)
+    if fmt in ("RAW", "NPY"):
+        return ArrayStripWriter(path, size, fmt)
+    return BufferedStripWriter(path, size, args)
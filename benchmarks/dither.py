@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Dither benchmark
+
+Maps images of several sizes to one learned palette with every
+``--dither_mode`` and reports, per case, the best wall time for the whole image, the best
+time when the image is cut into row tiles mapped on a thread pool (ordered
+modes only: ``fs`` cannot be tiled without seams), whether the tiles
+reassemble into exactly the whole-image result, and the error against the
+original after a Gaussian blur (a rough stand-in for viewing distance) as
+PSNR and mean CIE76 Delta E.
+
+    python3 -m benchmarks.dither [--image PATH] [--sizes 1024 4096]
+                                 [--colors 16 256] [--tile 512] [--threads 4] [--repeat 3]
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from asciiart_common.dither import MODES, ORDERED_MODES
+from asciiart_common.quantize import learn_palette, map_palette
+
+from .quantize import DEFAULT_IMAGE, best_of, delta_e, psnr, scaled
+
+# Blur radius, in pixels, applied before measuring error
+VIEW_RADIUS = 1.5
+
+
+def tiled(img, palette, mode, tile, pool):
+    """Map ``img`` in row tiles of ``tile`` rows on ``pool``; reassemble as RGB."""
+    boxes = [(0, y, img.width, min(y + tile, img.height)) for y in range(0, img.height, tile)]
+    parts = pool.map(lambda box: map_palette(img.crop(box), palette, mode, box[:2]).convert("RGB"),
+                     boxes)
+    out = Image.new("RGB", img.size)
+    for box, part in zip(boxes, parts):
+        out.paste(part, box[:2])
+    return out
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark dithering modes for speed, tiling and error.")
+    parser.add_argument(
+        "--image", default=DEFAULT_IMAGE,
+        help="Source image, rescaled to each size (default: samples/input.png)")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1024, 4096],
+        help="Longer image side in pixels (default: 1024 4096)")
+    parser.add_argument(
+        "--colors", type=int, nargs="+", default=[16, 256],
+        help="Palette sizes (default: 16 256)")
+    parser.add_argument(
+        "--tile", type=int, default=512,
+        help="Rows per tile for the tiled timing (default: 512)")
+    parser.add_argument(
+        "--threads", type=int, default=os.cpu_count() or 1,
+        help="Threads for the tiled timing (default: CPU count)")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timing repetitions per case; the best is reported (default: 3)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    source = Image.open(args.image).convert("RGB")
+    print(f"{'mode':<9} {'size':>11} {'colors':>6} {'whole (s)':>9} {'tiled (s)':>9} "
+          f"{'same':>4} {'PSNR (dB)':>9} {'mean dE':>8}")
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for size in args.sizes:
+            img = scaled(source, size)
+            ref = np.asarray(img.filter(ImageFilter.GaussianBlur(VIEW_RADIUS)))
+            for colors in args.colors:
+                palette = learn_palette(img, colors)
+                for mode in (None,) + MODES:
+                    seconds, out = best_of(lambda: map_palette(img, palette, mode), args.repeat)
+                    out = out.convert("RGB")
+                    tiled_s, same = "-", "-"
+                    if mode in ORDERED_MODES:
+                        t, parts = best_of(lambda: tiled(img, palette, mode, args.tile, pool),
+                                           args.repeat)
+                        tiled_s = f"{t:.3f}"
+                        same = "yes" if parts.tobytes() == out.tobytes() else "no"
+                    seen = np.asarray(out.filter(ImageFilter.GaussianBlur(VIEW_RADIUS)))
+                    print(f"{mode or 'none':<9} {f'{img.width}x{img.height}':>11} {colors:>6} "
+                          f"{seconds:>9.3f} {tiled_s:>9} {same:>4} {psnr(ref, seen):>9.2f} "
+                          f"{delta_e(ref, seen):>8.2f}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
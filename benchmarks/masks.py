@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Mask construction benchmark
+
+Times the original per-cell ``putpixel`` loops against the vectorized NumPy
+masks across grid sizes, and checks that both produce identical bytes.
+
+    python3 -m benchmarks.masks [--sizes 64 256 1024] [--repeat 3]
+"""
+import argparse
+import time
+
+from PIL import Image
+
+from ascii_border.masks import border_mask
+from ascii_border_8bit.masks import region_masks
+
+
+def legacy_border_mask(cols, rows, border_chars, fade_chars):
+    """Reference implementation of the ``ascii_border`` mask loop."""
+    cell_mask = Image.new("L", (cols, rows), 0)
+    for y in range(rows):
+        for x in range(cols):
+            d = min(x, cols - 1 - x, y, rows - 1 - y)
+            if d >= border_chars:
+                m = 0
+            elif d < border_chars - fade_chars:
+                m = 255
+            else:
+                m = int(round((border_chars - d) * 255.0 / fade_chars))
+                m = max(0, min(255, m))
+            cell_mask.putpixel((x, y), m)
+    return cell_mask
+
+
+def _outside(x, y, cx, cy, rr):
+    dx = abs(x - cx) + 0.5 if x >= cx else cx - x - 0.5
+    dy = abs(y - cy) + 0.5 if y >= cy else cy - y - 0.5
+    return dx * dx + dy * dy > rr * rr
+
+
+def legacy_region_masks(cols, rows, bc, qc, fade_a, fade_q, rr):
+    """Reference implementation of the ``ascii_border_8bit`` mask loops."""
+    cell_mask_ascii = Image.new("L", (cols, rows), 0)
+    cell_mask_quant = Image.new("L", (cols, rows), 0)
+    for y in range(rows):
+        for x in range(cols):
+            d = min(x, cols - 1 - x, y, rows - 1 - y)
+            if fade_a > 0:
+                if d <= bc - fade_a:
+                    m1 = 255
+                elif d < bc:
+                    m1 = int(round((bc - d) * 255.0 / fade_a))
+                else:
+                    m1 = 0
+            else:
+                m1 = 255 if d < bc else 0
+            if rr > 0:
+                if x < rr and y < rr:
+                    if _outside(x, y, rr, rr, rr):
+                        m1 = 255
+                elif x >= cols - rr and y < rr:
+                    if _outside(x, y, cols - rr, rr, rr):
+                        m1 = 255
+                elif x < rr and y >= rows - rr:
+                    if _outside(x, y, rr, rows - rr, rr):
+                        m1 = 255
+                elif x >= cols - rr and y >= rows - rr:
+                    if _outside(x, y, cols - rr, rows - rr, rr):
+                        m1 = 255
+            cell_mask_ascii.putpixel((x, y), max(0, min(255, m1)))
+            if d < bc:
+                m2 = 0
+            elif d < bc + fade_a and fade_a > 0:
+                m2 = int(round((d - bc) * 255.0 / fade_a))
+            elif d <= bc + qc - fade_q:
+                m2 = 255
+            elif d < bc + qc and fade_q > 0:
+                m2 = int(round((bc + qc - d) * 255.0 / fade_q))
+            else:
+                m2 = 0
+            if rr > 0 and m2 > 0:
+                o = bc + rr
+                if x < o and y < o:
+                    if _outside(x, y, o, o, rr):
+                        m2 = 0
+                elif x >= cols - o and y < o:
+                    if _outside(x, y, cols - o, o, rr):
+                        m2 = 0
+                elif x < o and y >= rows - o:
+                    if _outside(x, y, o, rows - o, rr):
+                        m2 = 0
+                elif x >= cols - o and y >= rows - o:
+                    if _outside(x, y, cols - o, rows - o, rr):
+                        m2 = 0
+            cell_mask_quant.putpixel((x, y), max(0, min(255, m2)))
+    return cell_mask_ascii, cell_mask_quant
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark putpixel mask loops against vectorized masks.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[32, 128, 512, 1024],
+        help="Square grid sizes in cells (default: 32 128 512 1024)")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timing repetitions per size; the best is reported (default: 3)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"{'tool':<18} {'grid':>11} {'loops (s)':>10} {'numpy (s)':>10} {'speedup':>8}")
+    for n in args.sizes:
+        border = max(1, n // 10)
+        cases = [
+            ("ascii_border",
+             lambda: legacy_border_mask(n, n, border, border // 2),
+             lambda: border_mask(n, n, border, border // 2),
+             lambda a, b: a.tobytes() == b.tobytes()),
+            ("ascii_border_8bit",
+             lambda: legacy_region_masks(n, n, border, border, 1, 2, border // 2),
+             lambda: region_masks(n, n, border, border, 1, 2, border // 2),
+             lambda a, b: all(x.tobytes() == y.tobytes() for x, y in zip(a, b))),
+        ]
+        for name, legacy, vectorized, same in cases:
+            t_loop, ref = best_of(legacy, args.repeat)
+            t_np, out = best_of(vectorized, args.repeat)
+            if not same(ref, out):
+                raise SystemExit(f"{name}: masks differ at {n}x{n}")
+            print(f"{name:<18} {f'{n}x{n}':>11} {t_loop:>10.4f} {t_np:>10.4f} "
+                  f"{t_loop / max(t_np, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Quantizer benchmark
+
+Times every ``--method`` across image sizes and palette sizes and reports,
+per case, the best wall time, the peak memory above the decoded input
+(measured in a fresh process), and the error against the original as PSNR
+and mean CIE76 color difference (Delta E in CIELAB).
+
+With ``--samples`` every case is repeated with the palette learned from that
+many sampled pixels (``--palette_sample``) and reports, next to the same
+figures, the PSNR change against the full-image palette of the same method.
+
+    python3 -m benchmarks.quantize [--image PATH] [--sizes 256 1024 2048]
+                                   [--colors 16 64 256] [--methods ...] [--repeat 3]
+                                   [--samples 16384 65536] [--sample_method stratified]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from asciiart_common.quantize import METHODS, SAMPLE_METHODS, quantize
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "samples", "input.png")
+
+# sRGB (D65) to XYZ, and the D65 white point
+_RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]], dtype=np.float32)
+_WHITE = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+
+def srgb_to_lab(rgb):
+    """CIELAB coordinates of an ``(..., 3)`` ``uint8`` sRGB array."""
+    c = rgb.astype(np.float32) / 255.0
+    lin = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    t = (lin @ _RGB_TO_XYZ.T) / _WHITE
+    eps = (6.0 / 29.0) ** 3
+    f = np.where(t > eps, np.cbrt(t), t / (3 * (6.0 / 29.0) ** 2) + 4.0 / 29.0)
+    return np.stack([116.0 * f[..., 1] - 16.0,
+                     500.0 * (f[..., 0] - f[..., 1]),
+                     200.0 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio in dB between two ``uint8`` arrays."""
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else 10.0 * np.log10(255.0 ** 2 / mse)
+
+
+def delta_e(a, b):
+    """Mean CIE76 color difference between two ``(h, w, 3)`` ``uint8`` arrays."""
+    return float(np.linalg.norm(srgb_to_lab(a) - srgb_to_lab(b), axis=-1).mean())
+
+
+def _peak_rss_kb():
+    """Peak resident set size in kB since the last ``_reset_peak``."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux, and cannot be reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak():
+    """Reset the peak RSS to the current RSS where Linux allows it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_memory(path, colors, method, sample=None, sample_method="stratified"):
+    """Run one quantization in this (fresh) process; return its extra peak RSS in MB."""
+    img = Image.open(path).convert("RGB")
+    img.load()
+    _reset_peak()
+    before = _peak_rss_kb()
+    quantize(img, colors, method, sample=sample, sample_method=sample_method).convert("RGB")
+    return (_peak_rss_kb() - before) / 1024.0
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def scaled(img, size):
+    """``img`` resized so its longer side is ``size`` pixels."""
+    scale = size / max(img.size)
+    return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                      resample=Image.LANCZOS)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark quantization methods for speed, memory and error.")
+    parser.add_argument(
+        "--image", default=DEFAULT_IMAGE,
+        help="Source image, rescaled to each size (default: samples/input.png)")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[256, 1024, 2048],
+        help="Longer image side in pixels (default: 256 1024 2048)")
+    parser.add_argument(
+        "--colors", type=int, nargs="+", default=[16, 64, 256],
+        help="Palette sizes (default: 16 64 256)")
+    parser.add_argument(
+        "--methods", nargs="+", choices=METHODS, default=list(METHODS),
+        help="Methods to compare (default: all)")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timing repetitions per case; the best is reported (default: 3)")
+    parser.add_argument(
+        "--samples", type=int, nargs="+", default=[],
+        help="Also learn each palette from this many sampled pixels (default: none)")
+    parser.add_argument(
+        "--sample_method", choices=SAMPLE_METHODS, default="stratified",
+        help="How --samples picks pixels (default: stratified)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    source = Image.open(args.image).convert("RGB")
+    # A fresh interpreter per case, so one case's peak does not hide the next
+    pool = ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1)
+    print(f"{'method':<11} {'size':>11} {'colors':>6} {'sample':>7} {'time (s)':>9} "
+          f"{'peak (MB)':>9} {'PSNR (dB)':>9} {'mean dE':>8} {'vs all':>7}")
+    with tempfile.TemporaryDirectory() as tmpdir, pool:
+        for size in args.sizes:
+            img = scaled(source, size)
+            path = os.path.join(tmpdir, f"{size}.ppm")
+            img.save(path)
+            ref = np.asarray(img)
+            for colors in args.colors:
+                for method in args.methods:
+                    full = None
+                    for sample in [None] + args.samples:
+                        seconds, out = best_of(
+                            lambda: quantize(img, colors, method, sample=sample,
+                                             sample_method=args.sample_method),
+                            args.repeat)
+                        peak = pool.submit(_peak_memory, path, colors, method, sample,
+                                           args.sample_method).result()
+                        out = np.asarray(out.convert("RGB"))
+                        error = psnr(ref, out)
+                        full = error if full is None else full
+                        label = "all" if sample is None else str(sample)
+                        vs = "" if sample is None else f"{error - full:+.2f}"
+                        print(f"{method:<11} {f'{img.width}x{img.height}':>11} {colors:>6} "
+                              f"{label:>7} {seconds:>9.3f} {peak:>9.1f} {error:>9.2f} "
+                              f"{delta_e(ref, out):>8.2f} {vs:>7}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for all three tools
+
+Renders a synthetic RCA-style test pattern (gradient, circles, crosshair and
+diagonals, as in the functional tests) in-process with ``ascii_border``,
+``ascii_border_8bit`` and ``eightbit_filter``. Each tool is timed across
+image sizes at its default options, then across one option axis at a time
+(font size, ``--chars`` length, ``--colors``, ``--dither_mode``, ``--radius``,
+``--color``) at ``--axis_size``. After a warm-up render, the best time of
+``--repeat`` runs is kept.
+
+Results are written as JSON with ``--output``. With ``--baseline`` they are
+compared case by case against a stored run, and the exit status is 1 when a
+case is slower by more than ``--threshold`` (a fraction) and by more than
+``--min_delta`` seconds, so timer noise on tiny cases is not reported.
+Timings only compare on the same machine, so no baseline is committed:
+record one there with ``--output benchmarks/baseline.json`` (ignored by
+git) before changing the code. A baseline from another environment is
+reported before the comparison.
+
+    python3 -m benchmarks.suite [--tools ...] [--sizes 256 1024 4096 7680]
+                                [--axis_size 1024] [--repeat 3] [--filter TEXT]
+                                [--output FILE] [--baseline [FILE]]
+                                [--threshold 0.2] [--min_delta 0.005]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+
+from ascii_border import render_ascii_border
+from ascii_border_8bit import render_composite
+from eightbit_filter import quantize_8bit
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FORMAT_VERSION = 1
+
+TOOLS = {
+    "ascii_border": render_ascii_border,
+    "ascii_border_8bit": render_composite,
+    "eightbit_filter": quantize_8bit,
+}
+
+# Options every case of a tool starts from
+DEFAULTS = {
+    "ascii_border": {"border": 6},
+    "ascii_border_8bit": {"border": 4, "quant": 4},
+    "eightbit_filter": {},
+}
+
+RAMPS = {
+    2: "@ ",
+    10: "@%#*+=-:. ",
+    70: "$@B%8&WM#*oahkbdpqwmZO0QLCJUYXzcvunxrjft/\\|()1{}[]?-_+~<>i!lI;:,\"^`'. ",
+}
+
+# Values swept per option; "font_size" uses the default font at that size
+AXES = {
+    "ascii_border": {
+        "font_size": [8, 12, 24],
+        "chars": sorted(RAMPS),
+        "color": [False, True],
+    },
+    "ascii_border_8bit": {
+        "font_size": [8, 12, 24],
+        "chars": sorted(RAMPS),
+        "colors": [16, 64, 256],
+        "dither_mode": [None, "fs", "ordered", "bluenoise"],
+        "radius": [0, 4, 16],
+        "color": [False, True],
+    },
+    "eightbit_filter": {
+        "colors": [16, 64, 256],
+        "dither_mode": [None, "fs", "ordered", "bluenoise"],
+    },
+}
+
+
+def rca_pattern(width, height):
+    """Indian-head RCA-style test pattern: gradient, circles, crosshair, diagonals."""
+    shade = np.linspace(0, 255, width).astype(np.uint8)
+    img = Image.fromarray(np.repeat(np.repeat(shade[np.newaxis, :, np.newaxis], height, 0), 3, 2))
+    draw = ImageDraw.Draw(img)
+    line = max(1, min(width, height) // 200)
+    draw.ellipse((0, 0, width - 1, height - 1), outline=(255, 0, 0), width=line)
+    draw.ellipse((width // 4, height // 4, width * 3 // 4, height * 3 // 4),
+                 outline=(0, 255, 0), width=line)
+    draw.line((width // 2, 0, width // 2, height), fill=(0, 0, 255), width=line)
+    draw.line((0, height // 2, width, height // 2), fill=(0, 0, 255), width=line)
+    draw.line((0, 0, width, height), fill=(255, 255, 0), width=line)
+    draw.line((width, 0, 0, height), fill=(255, 255, 0), width=line)
+    return img
+
+
+def frame_size(size):
+    """16:9 frame whose longer side is ``size`` (7680 gives 8K UHD)."""
+    return size, max(1, size * 9 // 16)
+
+
+def default_font(size):
+    """PIL's default font at ``size`` points, or None where Pillow cannot scale it."""
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1
+        return None
+
+
+def cases(tools, sizes, axis_size):
+    """Yield ``(case_id, tool, (width, height), params)`` for the sweep."""
+    for tool in tools:
+        for size in sizes:
+            w, h = frame_size(size)
+            yield f"{tool}/{w}x{h}", tool, (w, h), dict(DEFAULTS[tool])
+        w, h = frame_size(axis_size)
+        for axis, values in AXES[tool].items():
+            for value in values:
+                params = dict(DEFAULTS[tool])
+                params[axis] = RAMPS[value] if axis == "chars" else value
+                label = f"{axis}={value if value is not None else 'none'}"
+                yield f"{tool}/{w}x{h}/{label}", tool, (w, h), params
+
+
+def run_case(tool, img, params, repeat):
+    """Best wall time of ``repeat`` renders of ``img``, after one untimed warm-up."""
+    kwargs = {}
+    if "font_size" in params:
+        kwargs["font"] = default_font(params["font_size"])
+    # Fonts, glyph atlases and threshold maps are built once per process
+    TOOLS[tool](img, params, **kwargs)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        TOOLS[tool](img, params, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print the change per case against ``baseline``; return the regressed case ids."""
+    before = {case["id"]: case["seconds"] for case in baseline.get("cases", [])}
+    regressions = []
+    print(f"\n{'case':<48} {'base (s)':>9} {'now (s)':>9} {'change':>8}")
+    for case in results["cases"]:
+        old = before.get(case["id"])
+        if old is None:
+            continue
+        new = case["seconds"]
+        change = new / old - 1.0 if old > 0 else 0.0
+        slower = change > threshold and new - old > min_delta
+        if slower:
+            regressions.append(case["id"])
+        print(f"{case['id']:<48} {old:>9.4f} {new:>9.4f} {change:>+7.0%}"
+              f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time every tool across sizes and options; compare with a baseline.")
+    parser.add_argument(
+        "--tools", nargs="+", choices=list(TOOLS), default=list(TOOLS),
+        help="Tools to benchmark (default: all)")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[256, 1024, 2048, 4096, 7680],
+        help="Longer side of the 16:9 test image (default: 256 1024 2048 4096 7680)")
+    parser.add_argument(
+        "--axis_size", type=int, default=1024,
+        help="Longer image side used when sweeping options (default: 1024)")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timing repetitions per case; the best is kept (default: 3)")
+    parser.add_argument(
+        "--filter", default=None,
+        help="Only run cases whose id contains this text")
+    parser.add_argument(
+        "--output", default=None,
+        help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--baseline", nargs="?", const=BASELINE, default=None,
+        help="Compare against this JSON results file (default when given bare: "
+             "benchmarks/baseline.json)")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="Fractional slowdown reported as a regression (default: 0.2)")
+    parser.add_argument(
+        "--min_delta", type=float, default=0.005,
+        help="Ignore slowdowns smaller than this many seconds (default: 0.005)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+        except FileNotFoundError:
+            sys.exit(f"No baseline at {args.baseline}: record one on this machine first "
+                     f"with --output {args.baseline}")
+        if baseline.get("environment") != environment():
+            print(f"Warning: {args.baseline} was recorded in another environment "
+                  f"{baseline.get('environment')}; timings may not compare", file=sys.stderr)
+    results = {"version": FORMAT_VERSION, "environment": environment(),
+               "repeat": args.repeat, "cases": []}
+    images = {}
+    print(f"{'case':<48} {'time (s)':>9} {'MP/s':>7}")
+    for case_id, tool, size, params in cases(args.tools, args.sizes, args.axis_size):
+        if args.filter and args.filter not in case_id:
+            continue
+        if size not in images:
+            images[size] = rca_pattern(*size)
+        seconds = run_case(tool, images[size], params, args.repeat)
+        mpix = size[0] * size[1] / 1e6
+        results["cases"].append({"id": case_id, "tool": tool, "size": list(size),
+                                 "params": params, "seconds": round(seconds, 6)})
+        print(f"{case_id:<48} {seconds:>9.4f} {mpix / seconds:>7.1f}")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+            fh.write("\n")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Thread scaling benchmark
+
+Renders one large image with ``ascii_border`` and ``ascii_border_8bit`` at
+``--threads`` 1, 2, 4, ... up to the CPU count and reports, per thread
+count, the best wall time, the speedup over one thread and whether the
+output is identical to the single-threaded render. Masks are rebuilt on
+every render (``--mask_cache_mb 0``) so their banded upscale is timed too.
+``ascii_border_8bit`` runs with ``--palette_from`` so whole-image palette
+learning, which stays single-threaded, does not hide the banded stages.
+
+    python3 -m benchmarks.threads [--image PATH] [--size 4096] [--threads 1 2 4]
+                                  [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from ascii_border import render_ascii_border
+from ascii_border_8bit import render_composite
+from asciiart_common.palette import image_palette, save_palette
+
+from .quantize import DEFAULT_IMAGE, best_of, scaled
+
+
+def thread_counts(limit):
+    """1, 2, 4, ... below ``limit``, then ``limit`` itself."""
+    counts = []
+    n = 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    return counts + [limit]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark --threads scaling of the ASCII tools on one large image.")
+    parser.add_argument(
+        "--image", default=DEFAULT_IMAGE,
+        help="Source image, rescaled to --size (default: samples/input.png)")
+    parser.add_argument(
+        "--size", type=int, default=4096,
+        help="Longer image side in pixels (default: 4096)")
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=None,
+        help="Thread counts to time (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Timing repetitions per case; the best is reported (default: 3)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    img = scaled(Image.open(args.image).convert("RGB"), args.size)
+    counts = args.threads or thread_counts(os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        palette = os.path.join(tmp, "palette.txt")
+        save_palette(palette, image_palette(img.quantize(colors=64)))
+        cases = [
+            ("ascii_border", render_ascii_border, {"color": True}),
+            ("ascii_border_8bit", render_composite,
+             {"color": True, "radius": 4, "palette_from": palette}),
+        ]
+        print(f"{img.width}x{img.height}, {os.cpu_count()} CPUs")
+        print(f"{'tool':<18} {'threads':>7} {'time (s)':>8} {'speedup':>7} {'same':>4}")
+        for name, render, options in cases:
+            options = dict(options, mask_cache_mb=0)
+            ref = np.asarray(render(img, options, threads=1))
+            base = None
+            for n in counts:
+                seconds, out = best_of(lambda: render(img, options, threads=n), args.repeat)
+                base = base or seconds
+                same = "yes" if np.array_equal(np.asarray(out), ref) else "no"
+                print(f"{name:<18} {n:>7} {seconds:>8.3f} {base / seconds:>6.2f}x {same:>4}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,4 +1,6 @@
 """
 8-bit Color Quantization Filter
 """
-__version__ = "0.1.0"
\ No newline at end of file
+__version__ = "0.1.0"
+
+from .core import quantize_8bit  # noqa: E402
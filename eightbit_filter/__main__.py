@@ -2,60 +2,87 @@
 """
 8-bit Color Quantization Filter
 
-Reduces an image to an 8-bit (256-color) palette using median-cut quantization.
+Reduces an image to an 8-bit (256-color) palette using median-cut (or another
+selectable) quantization.
 Optionally applies dithering.
 """
 import argparse
 import sys
-from PIL import Image
 
-def parse_args():
+from asciiart_common.batch import (
+    add_batch_arguments, batch_exit_code, check_io_arguments, run_batch)
+from asciiart_common.dither import MODES as DITHER_MODES
+from asciiart_common.cache import add_result_cache_arguments, run_cached
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import add_input_arguments, add_output_arguments
+from asciiart_common.profile import add_profile_argument, write_records
+from asciiart_common.quantize import METHODS, add_sample_arguments
+from asciiart_common.serve import serve_main
+
+from .core import process, warm
+
+def build_parser():
     parser = argparse.ArgumentParser(
         description="Apply 8-bit color quantization filter to an image.")
     parser.add_argument(
-        "input", help="Path to the input image file")
+        "input", nargs="?", help="Path to the input image file")
     parser.add_argument(
-        "output", help="Path to save the output image file")
+        "output", nargs="?", help="Path to save the output image file")
     parser.add_argument(
         "--colors", type=int, default=256,
         help="Number of colors in the output palette (default: 256)")
     parser.add_argument(
         "--dither", action="store_true",
-        help="Enable dithering (Floyd–Steinberg) in quantization")
-    return parser.parse_args()
+        help="Dither while mapping to the palette with Floyd–Steinberg error diffusion")
+    parser.add_argument(
+        "--dither_mode", "--dither-mode", choices=DITHER_MODES, default=None,
+        help="Dither mode: fs (Floyd–Steinberg, as --dither), or ordered (Bayer) "
+             "or bluenoise threshold maps")
+    parser.add_argument(
+        "--method", choices=METHODS, default="mediancut",
+        help="Quantizer: Pillow's median cut (default) or fast octree, or a NumPy "
+             "octree or mini-batch k-means")
+    add_sample_arguments(parser)
+    parser.add_argument(
+        "--save_palette", "--save-palette", metavar="FILE", default=None,
+        help="Write the computed palette to FILE (one RRGGBB color per line)")
+    parser.add_argument(
+        "--palette_from", "--palette-from", metavar="FILE", default=None,
+        help="Map to the fixed palette in FILE instead of computing one per image")
+    parser.add_argument(
+        "--lut_bits", type=int, choices=(5, 6, 7), default=6,
+        help="Bits per channel of the --palette_from lookup table (default: 6, a 64^3 table)")
+    add_input_arguments(parser)
+    add_output_arguments(parser)
+    add_batch_arguments(parser)
+    add_result_cache_arguments(parser)
+    add_profile_argument(parser)
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_io_arguments(parser, args)
+    if args.save_palette and args.palette_from:
+        parser.error("--save_palette cannot be combined with --palette_from")
+    return args
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        serve_main("eightbit_filter", sys.argv[2:])
+        return
     args = parse_args()
-
-    # Load original image
-    try:
-        img = Image.open(args.input).convert("RGB")
-    except Exception as e:
-        print(f"Error opening input image: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    # Quantize to 8-bit palette
-    dither = Image.FLOYDSTEINBERG if args.dither else Image.NONE
-    try:
-        pal = img.quantize(
-            colors=args.colors,
-            method=Image.MEDIANCUT,
-            dither=dither
-        )
-    except Exception as e:
-        print(f"Error quantizing image: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    # Convert back to RGB for saving
-    out = pal.convert("RGB")
-
-    # Save output image
+    if args.batch:
+        summary = run_batch(process, args, *args.batch, workers=args.workers, warm=warm)
+        sys.exit(batch_exit_code(summary))
     try:
-        out.save(args.output)
-        print(f"Saved 8-bit filtered image to {args.output}")
-    except Exception as e:
-        print(f"Error saving output image: {e}", file=sys.stderr)
+        record, _ = run_cached(process, args, args.input, args.output)
+        if record is not None:
+            write_records(args.profile, [record])
+    except RenderError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
+    print(f"Saved 8-bit filtered image to {args.output}")
 
 if __name__ == "__main__":  # pragma: no cover
-    main()
\ No newline at end of file
+    main()
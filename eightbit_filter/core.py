@@ -0,0 +1,120 @@
+"""
+Library entry points for the 8-bit color quantization filter.
+
+``render`` takes an RGB image and the parsed CLI options and returns the
+quantized image (``render_palette`` returns it in "P" mode); ``process``
+wraps it with decoding and saving for one file.
+``quantize_8bit`` is the public entry point for in-memory images.
+Failures raise ``RenderError`` with the message the CLI prints.
+"""
+from asciiart_common.api import like_input, resolve_options, to_image
+from asciiart_common.dither import args_dither
+from asciiart_common.errors import RenderError
+from asciiart_common.imagefile import open_rgb, save_image
+from asciiart_common.pipeline import NO_SHARING
+from asciiart_common.profile import NULL_PROFILER
+from asciiart_common.quantize import quantize
+
+
+def warm(args):
+    """Build the palette lookup table ahead of the first render (e.g. per worker)."""
+    if args.palette_from:
+        # NumPy is only needed for palette files
+        from asciiart_common.palette import get_lut
+
+        get_lut(args.palette_from, args.lut_bits)
+
+
+def _quantize_key(args, dither):
+    # Identifies the quantized image among a pipeline's shared intermediates
+    if args.palette_from:
+        return ("lut_quantize", args.palette_from, args.lut_bits, dither)
+    return ("quantize", args.colors, args.method, dither, args.palette_sample,
+            args.sample_method)
+
+
+def render_palette(img, args, profiler=NULL_PROFILER, shared=NO_SHARING):
+    """
+    Quantize ``img`` (RGB) to an 8-bit palette and return the "P" image.
+    Stages are timed on ``profiler`` (see ``asciiart_common.profile``);
+    ``shared`` holds intermediates reused by pipeline variants of the same
+    image (see ``asciiart_common.pipeline``).
+    """
+    dither = args_dither(args)
+    key = _quantize_key(args, dither)
+    profiler.note(image=list(img.size))
+    # Map to a fixed palette through its lookup table
+    if args.palette_from:
+        from asciiart_common.palette import get_lut
+
+        with profiler.stage("palette"):
+            lut = get_lut(args.palette_from, args.lut_bits)
+        with profiler.stage("quantize"):
+            try:
+                return shared.get(key, lambda: lut.to_palette(img, dither), profiler)
+            except Exception as e:
+                raise RenderError(f"Error quantizing image: {e}") from e
+
+    # Quantize to 8-bit palette
+    with profiler.stage("quantize"):
+        try:
+            pal = shared.get(
+                key,
+                lambda: quantize(img, args.colors, args.method, dither, args.palette_sample,
+                                 args.sample_method),
+                profiler)
+        except Exception as e:
+            raise RenderError(f"Error quantizing image: {e}") from e
+
+    if args.save_palette:
+        from asciiart_common.palette import image_palette, save_palette
+
+        with profiler.stage("palette"):
+            save_palette(args.save_palette, image_palette(pal))
+    return pal
+
+
+def render(img, args, profiler=NULL_PROFILER, shared=NO_SHARING):
+    """
+    Quantize ``img`` (RGB) to an 8-bit palette and return it as RGB; see
+    ``render_palette``.
+    """
+    pal = render_palette(img, args, profiler, shared)
+    # Convert back to RGB
+    with profiler.stage("convert"):
+        key = _quantize_key(args, args_dither(args)) + ("RGB",)
+        return shared.get(key, lambda: pal.convert("RGB"), profiler)
+
+
+def quantize_8bit(img, options=None, profiler=NULL_PROFILER, **params):
+    """
+    Return ``img`` (a PIL image or ``uint8`` array) quantized to an 8-bit
+    palette, as the same type.
+
+    ``options`` is a namespace or dict of CLI options (``colors``,
+    ``dither``, ``method``, ``palette_from``, ...); keyword ``params``
+    override it and anything unset takes the CLI default. Pass an
+    ``asciiart_common.profile.Profiler`` as ``profiler`` to time the stages.
+    Raises ``RenderError`` on invalid input.
+    """
+    # Imported here: __main__ imports this module
+    from .__main__ import build_parser
+
+    opts = resolve_options(build_parser, options, **params)
+    image, was_array = to_image(img)
+    with profiler:
+        return like_input(render(image, opts, profiler=profiler), was_array)
+
+
+def process(args, input_path, output_path, profiler=NULL_PROFILER):
+    """Decode ``input_path``, render it and save the result to ``output_path``."""
+    # Load original image
+    with profiler.stage("decode"):
+        img = open_rgb(input_path, args)
+
+    # Palette output is saved as indexed color where the format allows
+    out = render_palette(img, args, profiler=profiler)
+
+    # Save output image
+    with profiler.stage("save"):
+        save_image(out, output_path, args)
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border import render_ascii_border
+    from ascii_border_8bit import render_composite
+    from asciiart_common.errors import RenderError
+    from eightbit_filter import quantize_8bit
+
+
+def make_pattern(width=200, height=160):
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for x in range(width):
+        shade = int(x * 255 / (width - 1))
+        draw.line((x, 0, x, height), fill=(shade, 255 - shade, (shade * 7) % 256))
+    draw.ellipse((0, 0, width, height), outline=(255, 0, 0))
+    draw.line((0, 0, width, height), fill=(255, 255, 0))
+    return img
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestLibraryAPI(unittest.TestCase):
+    """The in-process functions must match the CLIs without touching disk."""
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.size, b.size)
+        self.assertIsNone(ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox())
+
+    def test_matches_cli(self):
+        img = make_pattern()
+        cases = [
+            ("ascii_border", render_ascii_border,
+             {"border": 3, "fade": 1, "color": True}),
+            ("ascii_border_8bit", render_composite,
+             {"border": 3, "quant": 2, "radius": 2, "colors": 16, "dither": True}),
+            ("eightbit_filter", quantize_8bit, {"colors": 8}),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            img.save(inp)
+            for tool, fn, params in cases:
+                with self.subTest(tool=tool):
+                    outp = os.path.join(tmpdir, f"{tool}.png")
+                    cmd = [sys.executable, "-m", tool, inp, outp]
+                    for key, value in params.items():
+                        if value is True:
+                            cmd.append(f"--{key}")
+                        else:
+                            cmd += [f"--{key}", str(value)]
+                    subprocess.run(cmd, check=True, capture_output=True)
+                    with Image.open(outp) as expected:
+                        self.assertSameImage(fn(img, **params), expected)
+
+    def test_arrays_in_arrays_out(self):
+        arr = np.asarray(make_pattern())
+        out = render_composite(arr, {"border": 2, "quant": 2}, no_glyph_cache=True)
+        self.assertIsInstance(out, np.ndarray)
+        self.assertEqual(out.shape, arr.shape)
+        # The caller's image is left untouched
+        self.assertTrue(np.array_equal(arr, np.asarray(make_pattern())))
+
+    def test_preloaded_font_and_errors(self):
+        img = make_pattern()
+        font = ImageFont.load_default()
+        a = render_ascii_border(img, font=font, border=2)
+        b = render_ascii_border(img, border=2)
+        self.assertSameImage(a, b)
+        with self.assertRaises(TypeError):
+            quantize_8bit(img, colours=8)
+        with self.assertRaises(RenderError):
+            render_composite(img, border=50, quant=50)
+        # Values are checked as the CLI would check them
+        for params in ({"border": "5"}, {"border": True}, {"match": "bogus"},
+                       {"format": "tiff"}, {"chars": 5}):
+            with self.subTest(params=params), self.assertRaises(RenderError):
+                render_composite(img, **params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border_8bit.bands import composite_strips, mask_ring, quantize_strips
+    from ascii_border_8bit.masks import region_masks
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestBands(unittest.TestCase):
+    """Strip-restricted compositing must match full-frame compositing."""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.size = (157, 123)
+        self.fg = Image.fromarray(rng.integers(0, 256, (123, 157, 3), dtype=np.uint8))
+        self.bg = Image.fromarray(rng.integers(0, 256, (123, 157, 3), dtype=np.uint8))
+
+    def test_composite_strips_matches_full_composite(self):
+        cols, rows = 22, 15
+        for params in [(3, 2, 3, 2, 2), (2, 3, 5, 1, 0), (0, 4, 0, 4, 0), (4, 3, 1, 2, 4)]:
+            with self.subTest(params=params):
+                for cell_mask in region_masks(cols, rows, *params):
+                    mask = cell_mask.resize(self.size, resample=Image.NEAREST)
+                    expected = Image.composite(self.fg, self.bg, mask)
+                    strips = mask_ring(cell_mask, self.size)
+                    actual = composite_strips(self.fg, self.bg.copy(), mask, strips)
+                    self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test_quantize_strips_uses_shared_palette(self):
+        _, cell_mask = region_masks(22, 15, 2, 3, 0, 0, 0)
+        strips = mask_ring(cell_mask, self.size)
+        self.assertEqual(len(strips), 4)
+        quantized = quantize_strips(self.fg, strips, 8, "mediancut", Image.NONE)
+        self.assertEqual([q.size for q in quantized],
+                         [(b[2] - b[0], b[3] - b[1]) for b in strips])
+        colors = set()
+        for q in quantized:
+            colors.update(c for _, c in q.getcolors(256))
+        self.assertLessEqual(len(colors), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestBatchMode(unittest.TestCase):
+    """--batch processes a directory on a worker pool and reports failures per file."""
+
+    def make_inputs(self, tmpdir):
+        in_dir = os.path.join(tmpdir, "in")
+        os.makedirs(in_dir)
+        for i in range(3):
+            Image.new("RGB", (120, 96), (40 * i, 90, 200 - 40 * i)).save(
+                os.path.join(in_dir, f"img{i}.png"))
+        with open(os.path.join(in_dir, "broken.png"), "w") as fh:
+            fh.write("not an image")
+        return in_dir
+
+    def test_batch_all_tools(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            in_dir = self.make_inputs(tmpdir)
+            for tool, extra in [
+                ("eightbit_filter", ["--colors", "8"]),
+                ("ascii_border", ["--border", "2", "--no_glyph_cache"]),
+                ("ascii_border_8bit", ["--border", "2", "--quant", "2", "--no_glyph_cache"]),
+            ]:
+                with self.subTest(tool=tool):
+                    out_dir = os.path.join(tmpdir, tool)
+                    proc = subprocess.run(
+                        [sys.executable, "-m", tool, "--batch", in_dir, out_dir,
+                         "--workers", "2"] + extra,
+                        capture_output=True, text=True)
+                    # One broken file fails the batch but not the other images
+                    self.assertEqual(proc.returncode, 1, proc.stderr)
+                    self.assertIn("broken.png", proc.stderr)
+                    self.assertIn("Processed 4 images (1 failed)", proc.stdout)
+                    self.assertIn("images/s", proc.stdout)
+                    for i in range(3):
+                        with Image.open(os.path.join(out_dir, f"img{i}.png")) as im:
+                            self.assertEqual(im.size, (120, 96))
+
+    def test_batch_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            in_dir = self.make_inputs(tmpdir)
+            manifest = os.path.join(tmpdir, "list.txt")
+            with open(manifest, "w") as fh:
+                fh.write("# selected inputs\nin/img0.png\nin/img2.png\n")
+            out_dir = os.path.join(tmpdir, "out")
+            subprocess.run(
+                [sys.executable, "-m", "eightbit_filter", "--batch", manifest, out_dir,
+                 "--workers", "1"],
+                check=True, capture_output=True)
+            self.assertEqual(sorted(os.listdir(out_dir)), ["img0.png", "img2.png"])
+
+    def test_result_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            in_dir = self.make_inputs(tmpdir)
+            os.remove(os.path.join(in_dir, "broken.png"))
+            cache = os.path.join(tmpdir, "cache")
+
+            def run(*extra):
+                out_dir = os.path.join(tmpdir, "out")
+                proc = subprocess.run(
+                    [sys.executable, "-m", "eightbit_filter", "--batch", in_dir, out_dir,
+                     "--workers", "1", "--result_cache", cache] + list(extra),
+                    check=True, capture_output=True, text=True)
+                outputs = {}
+                for name in sorted(os.listdir(out_dir)):
+                    with open(os.path.join(out_dir, name), "rb") as fh:
+                        outputs[name] = fh.read()
+                return proc.stdout, outputs
+
+            stdout, first = run("--colors", "8")
+            self.assertIn("Result cache: 0 of 3 hits (0.0%)", stdout)
+            stdout, again = run("--colors", "8")
+            self.assertIn("Result cache: 3 of 3 hits (100.0%)", stdout)
+            self.assertEqual(again, first)
+            # A changed input or option renders again
+            Image.new("RGB", (120, 96), "white").save(os.path.join(in_dir, "img1.png"))
+            stdout, _ = run("--colors", "8")
+            self.assertIn("Result cache: 2 of 3 hits", stdout)
+            stdout, _ = run("--colors", "16")
+            self.assertIn("Result cache: 0 of 3 hits", stdout)
+            # Eviction keeps the directory within --result_cache_mb
+            run("--colors", "4", "--result_cache_mb", "0")
+            self.assertEqual(len(os.listdir(cache)), 1)
+
+    def test_result_cache_key(self):
+        from ascii_border.__main__ import build_parser
+        from asciiart_common.cache import ResultCache
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            Image.new("RGB", (64, 48), "gray").save(inp)
+            cache = ResultCache(os.path.join(tmpdir, "cache"))
+
+            def key(*argv):
+                args = build_parser().parse_args([inp, "out.png"] + list(argv))
+                return cache.key("ascii_border", args, inp, args.output)
+
+            base = key("--border", "3")
+            # Options that only change how the render runs share the entry
+            self.assertEqual(key("--border", "3", "--threads", "4", "--no_glyph_cache"), base)
+            self.assertNotEqual(key("--border", "4"), base)
+            # Font names Pillow looks up itself are keyed by name
+            self.assertNotEqual(key("--border", "3", "--font", "NoSuchFont.ttf"), base)
+            # Any change to the rendering code invalidates the entries
+            with mock.patch("asciiart_common.cache.code_digest", return_value="changed"):
+                self.assertNotEqual(key("--border", "3"), base)
+            self.assertIsNone(cache.key("ascii_border", build_parser().parse_args(
+                [inp, "out.png"]), os.path.join(tmpdir, "missing.png"), "out.png"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+try:
+    from PIL import Image, ImageChops, ImageFont
+except ImportError:
+    Image = None
+
+if Image:
+    import numpy as np
+    from ascii_border.canvas import GlyphStack, ShapeMatch, cell_colors, glyph_index, ramp_index
+    from ascii_border.glyphs import GlyphAtlas, cell_size
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestCanvas(unittest.TestCase):
+    """The array-assembled canvas must match pasting glyphs cell by cell."""
+
+    chars = "$@B%8&WM#*oahkbdpqwmZO0QLCJUYXzcvunxrjft/\\|()1{}[]?-_+~<>i!lI;:,\"^`'. "
+
+    def fonts(self):
+        yield ImageFont.load_default()
+        try:
+            for size in (8, 24):
+                yield ImageFont.load_default(size)
+        except TypeError:  # Pillow < 10.1 has a single default size
+            pass
+
+    def test_matches_per_cell_paste(self):
+        for font in self.fonts():
+            atlas = GlyphAtlas(font)
+            cell_w, cell_h = cell_size(font)
+            stack = GlyphStack(atlas, self.chars, cell_w, cell_h)
+            # Partial cells on the right and bottom edges, as in real images
+            size = (17 * cell_w + 5, 11 * cell_h + 3)
+            rows, cols = size[1] // cell_h, size[0] // cell_w
+            rng = np.random.default_rng(cell_h)
+            idx = rng.integers(0, stack.blank + 1, (rows, cols))
+            for colors in (None, rng.integers(0, 256, (rows, cols, 3))):
+                with self.subTest(cell=(cell_w, cell_h), color=colors is not None):
+                    ref = Image.new("RGB", size, "white")
+                    for y in range(rows):
+                        for x in range(cols):
+                            if idx[y, x] == stack.blank:
+                                continue
+                            fill = (0, 0, 0) if colors is None else tuple(int(c) for c in colors[y, x])
+                            atlas.draw(ref, (x * cell_w, y * cell_h), self.chars[idx[y, x]], fill)
+                    whole = stack.render(idx, colors, (0, 0) + size)
+                    self.assertIsNone(ImageChops.difference(whole, ref).getbbox())
+                    box = (cell_w // 2, cell_h + 1, size[0] - 3, 7 * cell_h + 2)
+                    part = stack.render(idx, colors, box)
+                    self.assertIsNone(ImageChops.difference(part, ref.crop(box)).getbbox())
+
+    def test_ramp_index_and_cell_colors(self):
+        gs = Image.fromarray(np.arange(256, dtype=np.uint8).reshape(16, 16))
+        idx = ramp_index(gs, "@%#*+=-:. ")
+        np.testing.assert_array_equal(idx.ravel(), np.arange(256) * 9 // 255)
+        rgb = np.random.default_rng(0).integers(0, 256, (23, 37, 3), dtype=np.uint8)
+        colors = cell_colors(Image.fromarray(rgb), 4, 2, 8, 10).astype(np.int64)
+        means = rgb[:20, :32].reshape(2, 10, 4, 8, 3).mean(axis=(1, 3))
+        self.assertLessEqual(np.abs(colors - means).max(), 1)
+
+    def test_shape_match_recovers_glyphs(self):
+        chars = "@%#*+=-:. "
+        for font in self.fonts():
+            atlas = GlyphAtlas(font)
+            cell_w, cell_h = cell_size(font)
+            stack = GlyphStack(atlas, chars, cell_w, cell_h)
+            tx0, ty0, tx1, ty1 = stack.extent
+            # Glyphs far enough apart that no footprint holds another's ink
+            rows, cols = 12, 15
+            rng = np.random.default_rng(cell_h)
+            idx = np.full((rows, cols), chars.index(" "))
+            sel = np.zeros((rows, cols), dtype=bool)
+            sel[-ty0::ty1 - ty0 + 1, -tx0::tx1 - tx0 + 1] = True
+            idx[sel] = rng.integers(0, len(chars), sel.sum())
+            size = (cols * cell_w + 5, rows * cell_h + 3)
+            img = stack.render(idx, None, (0, 0) + size)
+            gs = img.convert("L").resize((cols, rows), resample=Image.BILINEAR)
+            with self.subTest(cell=(cell_w, cell_h)):
+                matched = glyph_index(img, gs, atlas, chars, (cell_w, cell_h), "shape")
+                np.testing.assert_array_equal(matched[sel], idx[sel])
+                # Strips of any height match the same glyphs as the whole image
+                shapes = ShapeMatch(stack, cols, rows, size)
+                for y0 in range(0, size[1], 7):
+                    y1 = min(size[1], y0 + 7)
+                    shapes.add(y0, y1, img.crop((0, y0, size[0], y1)))
+                np.testing.assert_array_equal(shapes.idx, matched)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+if Image:
+    import ascii_border_8bit.__main__ as border_main
+    import eightbit_filter.__main__ as filter_main
+    from asciiart_common.dither import args_dither, bayer, void_and_cluster
+    from asciiart_common.palette import PaletteLUT
+    from asciiart_common.quantize import learn_palette, map_palette
+
+
+def gradient(width=160, height=120):
+    x = np.linspace(0, 255, width)[np.newaxis, :]
+    y = np.linspace(0, 255, height)[:, np.newaxis]
+    rgb = np.stack(np.broadcast_arrays(x, y, (x + y) / 2), axis=-1)
+    return Image.fromarray(rgb.astype(np.uint8))
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestDither(unittest.TestCase):
+    """Ordered dithering depends only on absolute position, so tiles line up."""
+
+    def test_threshold_maps_are_permutations(self):
+        for ranks in (bayer(8), void_and_cluster(16)):
+            self.assertEqual(sorted(ranks.ravel()), list(range(ranks.size)))
+
+    def test_tiles_match_whole_image(self):
+        img = gradient()
+        palette = learn_palette(img, 8)
+        lut = PaletteLUT(np.array(palette.getpalette("RGB"), dtype=np.uint8).reshape(-1, 3))
+        for mode in ("ordered", "bluenoise"):
+            with self.subTest(mode=mode):
+                whole = map_palette(img, palette, mode).convert("RGB")
+                whole_lut = lut.quantize(img, mode)
+                for box in [(0, 0, 160, 37), (13, 37, 101, 120), (101, 37, 160, 120)]:
+                    tile = map_palette(img.crop(box), palette, mode, box[:2]).convert("RGB")
+                    self.assertIsNone(ImageChops.difference(tile, whole.crop(box)).getbbox())
+                    tile = lut.quantize(img.crop(box), mode, box[:2])
+                    self.assertIsNone(ImageChops.difference(tile, whole_lut.crop(box)).getbbox())
+
+    def test_ordered_keeps_mean_level(self):
+        # Two-color palette: the dithered pattern reproduces each gray level
+        gray = np.repeat(np.linspace(0, 255, 64, dtype=np.uint8)[np.newaxis, :], 64, axis=0)
+        img = Image.fromarray(np.stack([gray] * 3, axis=-1))
+        palette = Image.new("P", (1, 1))
+        palette.putpalette([0, 0, 0, 255, 255, 255])
+        out = np.asarray(map_palette(img, palette, "ordered").convert("L"), dtype=np.float64)
+        self.assertLess(abs(out.mean() - gray.mean()), 4.0)
+        self.assertGreater(len(np.unique(out)), 1)
+
+    def test_dither_switch_leaves_positionals(self):
+        for main in (filter_main, border_main):
+            parser = main.build_parser()
+            args = parser.parse_args(["--dither", "in.png", "out.png"])
+            self.assertEqual((args.input, args.output), ("in.png", "out.png"))
+            self.assertEqual(args_dither(args), "fs")
+            args = parser.parse_args(["in.png", "out.png", "--dither_mode", "ordered"])
+            self.assertEqual(args_dither(args), "ordered")
+            self.assertIsNone(args_dither(parser.parse_args(["in.png", "out.png"])))
+
+    def test_stream_matches_full_render(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.ppm")
+            gradient(213, 187).save(inp)
+            outs = [os.path.join(tmpdir, "full.png"), os.path.join(tmpdir, "strip.png")]
+            opts = ["--border", "3", "--quant", "4", "--colors", "8", "--dither_mode", "bluenoise",
+                    "--no_glyph_cache"]
+            subprocess.run([sys.executable, "-m", "ascii_border_8bit", inp, outs[0],
+                            "--band_palette"] + opts, check=True, capture_output=True)
+            subprocess.run([sys.executable, "-m", "ascii_border_8bit", inp, outs[1],
+                            "--stream", "--strip_rows", "2"] + opts,
+                           check=True, capture_output=True)
+            with Image.open(outs[0]) as a, Image.open(outs[1]) as b:
+                self.assertIsNone(ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from PIL import Image, ImageChops, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+if Image:
+    import numpy as np
+    from ascii_border.glyphs import GlyphAtlas, font_key, visible_cells
+    from ascii_border.masks import border_mask
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestGlyphAtlas(unittest.TestCase):
+    """Glyph atlas blitting must match ImageDraw.text exactly."""
+
+    chars = "@%#*+=-:. "
+
+    def render(self, draw_char):
+        canvas = Image.new("RGB", (120, 40), "white")
+        for i, ch in enumerate(self.chars):
+            draw_char(canvas, (i * 11, 5 + (i % 3) * 9), ch, (200, 30 * i, 10))
+        return canvas
+
+    def test_matches_draw_text(self):
+        font = ImageFont.load_default()
+        atlas = GlyphAtlas(font)
+
+        def with_text(canvas, xy, ch, fill):
+            ImageDraw.Draw(canvas).text(xy, ch, font=font, fill=fill)
+
+        expected = self.render(with_text)
+        actual = self.render(atlas.draw)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test_disk_round_trip(self):
+        font = ImageFont.load_default()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = GlyphAtlas(font, cache_dir=cache_dir)
+            first.prepare(self.chars)
+            self.assertEqual(first.rasterized, len(self.chars))
+            self.assertTrue(os.path.exists(first.path))
+            second = GlyphAtlas(font, cache_dir=cache_dir)
+            second.prepare(self.chars)
+            self.assertEqual(second.rasterized, 0)
+            a = self.render(first.draw)
+            b = self.render(second.draw)
+            self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def test_failed_write_leaves_no_temp_file(self):
+        font = ImageFont.load_default()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            atlas = GlyphAtlas(font, cache_dir=cache_dir)
+            with mock.patch("json.dump", side_effect=OSError("disk full")):
+                atlas.prepare(self.chars)
+            self.assertEqual(atlas.rasterized, len(self.chars))
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_font_found_by_name(self):
+        # Pillow finds --font names in the system font directories; the key
+        # uses the file it opened, or the name when there is no such file
+        font = ImageFont.load_default()
+        font.path = "NoSuchFont.ttf"
+        self.assertIn("<name:NoSuchFont.ttf>", font_key(font, "NoSuchFont.ttf"))
+        try:
+            named = ImageFont.truetype("DejaVuSans.ttf", 12)
+        except OSError:
+            self.skipTest("DejaVuSans.ttf is not installed")
+        from ascii_border import render_ascii_border
+        from ascii_border.glyphs import load_font
+
+        self.assertIn(os.path.realpath(named.path), font_key(named, "DejaVuSans.ttf"))
+        img = Image.new("RGB", (160, 120), (90, 120, 200))
+        expected = render_ascii_border(img, font=load_font(named.path, 12), border=2)
+        actual = render_ascii_border(img, {"font": "DejaVuSans.ttf", "border": 2})
+        self.assertEqual(actual.tobytes(), expected.tobytes())
+
+    def test_visible_cells_render_matches_full_render(self):
+        font = ImageFont.load_default()
+        atlas = GlyphAtlas(font)
+        cell_w, cell_h = 7, 8
+        # Sizes that are not multiples of the cell stretch the NEAREST mask
+        size = (213, 187)
+        cols, rows = size[0] // cell_w, size[1] // cell_h
+        rng = np.random.default_rng(0)
+        idx = rng.integers(0, len(self.chars), size=(rows, cols))
+        cell_mask = border_mask(cols, rows, 3, 2)
+        mask = cell_mask.resize(size, resample=Image.NEAREST)
+        visible = visible_cells(atlas, self.chars, idx, cell_w, cell_h, cell_mask, size)
+        self.assertLess(visible.sum(), visible.size // 2)
+        full = Image.new("RGB", size, "white")
+        partial = Image.new("RGB", size, "white")
+        for y in range(rows):
+            for x in range(cols):
+                ch = self.chars[idx[y, x]]
+                atlas.draw(full, (x * cell_w, y * cell_h), ch, (0, 0, 0))
+                if visible[y, x]:
+                    atlas.draw(partial, (x * cell_w, y * cell_h), ch, (0, 0, 0))
+        black = Image.new("RGB", size, "black")
+        a = Image.composite(full, black, mask)
+        b = Image.composite(partial, black, mask)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+
+if __name__ == '__main__':
+    unittest.main()
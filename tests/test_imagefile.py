@@ -0,0 +1,109 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from asciiart_common.errors import RenderError
+    from asciiart_common.imagefile import map_array, open_rgb, save_image
+    from asciiart_common.strips import open_reader
+
+
+def run(*argv):
+    subprocess.run([sys.executable, "-m", *argv], check=True, capture_output=True)
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestImageFile(unittest.TestCase):
+    """Outputs keep palettes where possible and honour the encoder options."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.inp = os.path.join(self.tmp.name, "in.png")
+        img = Image.linear_gradient("L").resize((192, 144)).convert("RGB")
+        img.save(self.inp)
+        self.img = img
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_palette_output_is_indexed(self):
+        run("eightbit_filter", self.inp, self.path("p.png"), "--colors", "16")
+        run("eightbit_filter", self.inp, self.path("p.jpg"), "--colors", "16")
+        with Image.open(self.path("p.png")) as png, Image.open(self.path("p.jpg")) as jpg:
+            self.assertEqual(png.mode, "P")
+            self.assertEqual(jpg.mode, "RGB")
+            self.assertEqual(png.convert("RGB").tobytes(),
+                             Image.open(self.inp).quantize(16).convert("RGB").tobytes())
+
+    def test_format_and_compress_level(self):
+        run("ascii_border", self.inp, self.path("out.png"), "--format", "jpeg")
+        with Image.open(self.path("out.png")) as out:
+            self.assertEqual(out.format, "JPEG")
+        sizes = []
+        for level in ("0", "9"):
+            name = self.path(f"s{level}.png")
+            run("ascii_border", self.inp, name, "--stream", "--compress-level", level)
+            sizes.append(os.path.getsize(name))
+        self.assertGreater(sizes[0], sizes[1])
+
+    def test_optimize(self):
+        pal = self.img.quantize(64)
+        for optimize in (False, True):
+            args = argparse.Namespace(format=None, compress_level=None, optimize=optimize)
+            save_image(pal, self.path(f"o{optimize}.png"), args)
+        self.assertLessEqual(os.path.getsize(self.path("oTrue.png")),
+                             os.path.getsize(self.path("oFalse.png")))
+
+    def test_array_inputs(self):
+        rgb = np.asarray(self.img)
+        rgba = np.dstack([rgb, np.full(rgb.shape[:2], 7, np.uint8)])
+        np.save(self.path("in.npy"), rgb)
+        rgba.tofile(self.path("in.raw"))
+        raw = argparse.Namespace(input_format="raw", input_width=192, input_height=144,
+                                 input_channels=4)
+        for path, args in ((self.path("in.npy"), None), (self.path("in.raw"), raw)):
+            with self.subTest(path=path):
+                self.assertIsInstance(map_array(path, args), np.memmap)
+                self.assertEqual(open_rgb(path, args).tobytes(), self.img.tobytes())
+                with open_reader(path, args) as reader:
+                    self.assertTrue(reader.streaming)
+                    self.assertEqual(reader.read(50, 90).tobytes(),
+                                     self.img.crop((0, 50, 192, 90)).tobytes())
+        with self.assertRaises(RenderError):
+            open_rgb(self.path("in.raw"), argparse.Namespace(input_format="raw"))
+        # The file must be exactly the declared geometry, neither short nor long
+        for height in (200, 100):
+            raw.input_height = height
+            with self.assertRaises(RenderError):
+                open_rgb(self.path("in.raw"), raw)
+
+    def test_array_outputs_match_png(self):
+        run("ascii_border_8bit", self.inp, self.path("ref.png"), "--border", "3")
+        expected = np.asarray(Image.open(self.path("ref.png")).convert("RGB"))
+        np.save(self.path("in.npy"), np.asarray(self.img))
+        for extra in ((), ("--stream",)):
+            run("ascii_border_8bit", self.path("in.npy"), self.path("out.npy"), "--border", "3",
+                *extra)
+            run("ascii_border_8bit", self.path("in.npy"), self.path("out.bin"), "--border", "3",
+                "--format", "raw", *extra)
+            with self.subTest(extra=extra):
+                if not extra:
+                    np.testing.assert_array_equal(np.load(self.path("out.npy")), expected)
+                self.assertEqual(np.load(self.path("out.npy")).tobytes(),
+                                 open(self.path("out.bin"), "rb").read())
+
+
+if __name__ == '__main__':
+    unittest.main()
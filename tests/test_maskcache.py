@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border import render_ascii_border
+    from ascii_border.maskcache import MaskCache
+    from ascii_border_8bit import render_composite
+    from asciiart_common.profile import Profiler
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestMaskCache(unittest.TestCase):
+    """Masks are reused across same-geometry renders, from memory or disk."""
+
+    def build(self, value, size=(40, 30)):
+        calls = []
+
+        def make():
+            calls.append(value)
+            return {"pixels": Image.new("L", size, value)}
+        return make, calls
+
+    def test_memory_lru_and_disk(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = MaskCache(max_bytes=2 * 40 * 30, cache_dir=tmpdir)
+            profiler = Profiler(trace_memory=False)
+            for value in (1, 2, 1, 3, 2):
+                make, calls = self.build(value)
+                masks = cache.get(("test", value), make, profiler)
+                self.assertEqual(masks["pixels"].getpixel((0, 0)), value)
+            # 1 and 2 are built, 1 hits memory, 3 evicts 2, which comes back from disk
+            self.assertEqual((cache.misses, cache.hits, cache.disk_hits), (3, 1, 1))
+            self.assertEqual(profiler.record()["counters"],
+                             {"mask_cache_misses": 3, "mask_cache_hits": 1,
+                              "mask_cache_disk_hits": 1})
+            # A new process sees the files written by the first one
+            make, calls = self.build(9)
+            masks = MaskCache(cache_dir=tmpdir).get(("test", 3), make)
+            self.assertEqual((calls, masks["pixels"].getpixel((5, 5))), ([], 3))
+            self.assertEqual(len([n for n in os.listdir(tmpdir) if n.endswith(".npz")]), 3)
+
+    def test_failed_write_leaves_no_temp_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            make, calls = self.build(4)
+            with mock.patch("numpy.savez", side_effect=OSError("disk full")):
+                masks = MaskCache(cache_dir=tmpdir).get(("test", 4), make)
+            self.assertEqual((calls, masks["pixels"].getpixel((0, 0))), ([4], 4))
+            self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_renders_reuse_masks(self):
+        img = Image.new("RGB", (240, 180), (90, 120, 200))
+        for render, params in ((render_ascii_border, {"border": 4}),
+                               (render_composite, {"border": 3, "quant": 3, "radius": 2})):
+            with self.subTest(render=render.__name__):
+                ref = render(img, mask_cache_mb=0, **params)
+                records = []
+                for _ in range(2):
+                    profiler = Profiler(trace_memory=False)
+                    out = render(img, profiler=profiler, **params)
+                    self.assertEqual(out.tobytes(), ref.tobytes())
+                    records.append(profiler.record()["counters"])
+                self.assertEqual(records[1], {"mask_cache_hits": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
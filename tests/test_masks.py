@@ -0,0 +1,44 @@
+import itertools
+import unittest
+
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border.masks import border_mask
+    from ascii_border_8bit.masks import region_masks
+    from benchmarks.masks import legacy_border_mask, legacy_region_masks
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestVectorizedMasks(unittest.TestCase):
+    """Vectorized masks must be byte-identical to the original putpixel loops."""
+
+    grids = [(1, 1), (3, 7), (12, 9), (25, 40), (31, 31)]
+
+    def test_border_mask(self):
+        for (cols, rows), border in itertools.product(self.grids, range(0, 7)):
+            for fade in range(0, border + 1):
+                with self.subTest(cols=cols, rows=rows, border=border, fade=fade):
+                    self.assertEqual(
+                        border_mask(cols, rows, border, fade).tobytes(),
+                        legacy_border_mask(cols, rows, border, fade).tobytes())
+
+    def test_region_masks(self):
+        params = itertools.product(
+            self.grids, [0, 1, 3], [0, 2, 4], [0, 1, 3], [0, 2], [0, 1, 3, 6])
+        for (cols, rows), bc, qc, fade_a, fade_q, rr in params:
+            rr = min(rr, bc)
+            with self.subTest(cols=cols, rows=rows, bc=bc, qc=qc,
+                              fade_a=fade_a, fade_q=fade_q, rr=rr):
+                new = region_masks(cols, rows, bc, qc, fade_a, fade_q, rr)
+                old = legacy_region_masks(cols, rows, bc, qc, fade_a, fade_q, rr)
+                self.assertEqual(new[0].tobytes(), old[0].tobytes())
+                self.assertEqual(new[1].tobytes(), old[1].tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from asciiart_common.palette import PaletteLUT, load_palette, save_palette
+    from eightbit_filter.core import quantize_8bit
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestPalette(unittest.TestCase):
+    """Palette files round-trip and the lookup table maps to the nearest color."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.colors = rng.integers(0, 256, size=(40, 3), dtype=np.uint8)
+        self.pixels = rng.integers(0, 256, size=(30, 50, 3), dtype=np.uint8)
+
+    def test_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "look.hex")
+            save_palette(path, self.colors)
+            np.testing.assert_array_equal(load_palette(path), self.colors)
+
+    def test_lut_matches_nearest_box_centre(self):
+        for bits in (5, 6):
+            with self.subTest(bits=bits):
+                lut = PaletteLUT(self.colors, bits)
+                shift = 8 - bits
+                centre = ((self.pixels >> shift).astype(np.int32) << shift) + ((1 << shift) >> 1)
+                d = ((centre[:, :, np.newaxis, :] - self.colors.astype(np.int32)) ** 2).sum(axis=3)
+                np.testing.assert_array_equal(lut.indices(self.pixels), d.argmin(axis=2))
+
+    def test_palette_from_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "look.hex")
+            img = Image.fromarray(self.pixels)
+            quantize_8bit(img, colors=16, save_palette=path)
+            palette = load_palette(path)
+            out = quantize_8bit(self.pixels, palette_from=path)
+            used = np.unique(out.reshape(-1, 3), axis=0)
+            self.assertTrue(all((palette == c).all(axis=1).any() for c in used))
+
+
+if __name__ == '__main__':
+    unittest.main()
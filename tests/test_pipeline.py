@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border import render_ascii_border
+    from ascii_border_8bit import render_composite
+    from asciiart_common.errors import RenderError
+    from asciiart_common.pipeline import load_spec, render_variants
+    from asciiart_common.profile import Profiler
+    from eightbit_filter import quantize_8bit
+
+    RENDERS = {
+        "ascii_border": render_ascii_border,
+        "ascii_border_8bit": render_composite,
+        "eightbit_filter": quantize_8bit,
+    }
+
+
+def pattern():
+    img = Image.new("RGB", (240, 180), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for x in range(img.width):
+        draw.line((x, 0, x, img.height), fill=(x, 255 - x, (3 * x) % 256))
+    draw.ellipse((20, 10, 220, 170), outline=(255, 0, 0), width=3)
+    return img
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestPipeline(unittest.TestCase):
+    """Pipeline variants share intermediates and match separate renders."""
+
+    def test_variants_match_separate_renders(self):
+        img = pattern()
+        variants = [("ascii_border_8bit", {"border": 3, "quant": 3, "radius": r}) for r in (0, 2, 3)]
+        variants += [
+            ("ascii_border_8bit", {"border": 2, "quant": 4, "color": True}),
+            ("ascii_border_8bit", {"border": 4, "quant": 2, "band_palette": True}),
+            ("ascii_border", {"border": 5}),
+            ("ascii_border", {"border": 2, "color": True}),
+            ("eightbit_filter", {}),
+        ]
+        profiler = Profiler(trace_memory=False)
+        results = render_variants(img, variants, profiler=profiler)
+        for (tool, options), result in zip(variants, results):
+            with self.subTest(tool=tool, **options):
+                self.assertEqual(result.tobytes(), RENDERS[tool](img, options).tobytes())
+        counters = profiler.record()["counters"]
+        self.assertGreater(counters["shared_hits"], counters["shared_builds"])
+
+    def test_rejects_unsupported_options(self):
+        for tool, options in (("ascii_border", {"stream": True}),
+                              ("ascii_border_8bit", {"bogus": 1}),
+                              ("nonexistent", {})):
+            with self.subTest(tool=tool):
+                with self.assertRaises(RenderError):
+                    render_variants(pattern(), [(tool, options)])
+
+    def test_cli_spec(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pattern().save(os.path.join(tmpdir, "in.png"))
+            spec = {
+                "input": "in.png",
+                "options": {"border": 3, "colors": 32},
+                "outputs": [{"tool": "ascii_border_8bit", "output": f"r{r}.png",
+                             "options": {"radius": r}} for r in (0, 3)]
+                + [{"tool": "eightbit_filter", "output": "8bit.png",
+                    "options": {"save_palette": "palette.txt"}}],
+            }
+            path = os.path.join(tmpdir, "spec.json")
+            with open(path, "w") as fh:
+                json.dump(spec, fh)
+            subprocess.run([sys.executable, "-m", "asciiart_common.pipeline", path],
+                           check=True, capture_output=True)
+            with Image.open(os.path.join(tmpdir, "r3.png")) as out:
+                ref = render_composite(pattern(), border=3, colors=32, radius=3)
+                self.assertEqual(out.convert("RGB").tobytes(), ref.tobytes())
+            with Image.open(os.path.join(tmpdir, "8bit.png")) as out:
+                # Saved indexed, as eightbit_filter's CLI saves it
+                self.assertEqual(out.mode, "P")
+                self.assertLessEqual(len(out.convert("RGB").getcolors(256)), 32)
+            # Path options are relative to the spec, not the working directory
+            self.assertTrue(os.path.isfile(os.path.join(tmpdir, "palette.txt")))
+
+    def test_spec_path_options(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "spec.json")
+            with open(path, "w") as fh:
+                json.dump({"input": "in.png", "options": {"mask_cache": "masks"},
+                           "outputs": [{"tool": "ascii_border", "output": "a.png",
+                                        "options": {"font": "DejaVuSans.ttf",
+                                                    "palette_from": "p.txt"}}]}, fh)
+            spec = load_spec(path)
+            self.assertEqual(spec["options"]["mask_cache"], os.path.join(tmpdir, "masks"))
+            options = spec["outputs"][0]["options"]
+            self.assertEqual(options["palette_from"], os.path.join(tmpdir, "p.txt"))
+            # No such file beside the spec: left for the system font search
+            self.assertEqual(options["font"], "DejaVuSans.ttf")
+
+
+if __name__ == '__main__':
+    unittest.main()
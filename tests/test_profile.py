@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from asciiart_common.profile import Profiler, percentile, summarize
+
+if Image:
+    from ascii_border_8bit import render_composite
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestProfile(unittest.TestCase):
+    """--profile records per-stage times, dimensions and percentiles."""
+
+    def test_library_hook(self):
+        img = Image.new("RGB", (240, 180), (90, 120, 200))
+        profiler = Profiler()
+        render_composite(img, profiler=profiler, border=3, quant=3, radius=2)
+        rec = profiler.record()
+        for stage in ("grayscale", "masks", "quantize", "glyphs", "composite", "rounding"):
+            self.assertIn(stage, rec["stages"])
+        self.assertEqual(rec["image"], [240, 180])
+        self.assertEqual(rec["cells"], rec["grid"][0] * rec["grid"][1])
+        self.assertLessEqual(sum(s["wall_s"] for s in rec["stages"].values()),
+                             rec["wall_s"] + 1e-6)
+        self.assertGreater(rec["peak_traced_mb"], 0)
+
+    def test_nested_stages_are_exclusive(self):
+        profiler = Profiler(trace_memory=False)
+        with profiler:
+            with profiler.stage("save"):
+                with profiler.stage("decode"):
+                    sum(range(200000))
+        stages = profiler.record()["stages"]
+        self.assertLess(stages["save"]["wall_s"], stages["decode"]["wall_s"])
+
+    def test_percentiles(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 90), 90)
+        records = [{"wall_s": t, "cpu_s": t, "peak_traced_mb": 1.0,
+                    "stages": {"save": {"wall_s": t}}} for t in (1.0, 2.0, 3.0, 4.0)]
+        records.append({"summary": {}})
+        summary = summarize(records)
+        self.assertEqual(summary["images"], 4)
+        self.assertEqual(summary["stages"]["save"]["p50"], 2.0)
+        self.assertEqual(summary["wall_s"]["max"], 4.0)
+
+    def test_cli_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            Image.new("RGB", (120, 90), (200, 40, 40)).save(inp)
+            out = os.path.join(tmpdir, "out.png")
+            log = os.path.join(tmpdir, "profile.jsonl")
+            for _ in range(2):
+                subprocess.run([sys.executable, "-m", "eightbit_filter", inp, out,
+                                "--colors", "16", "--profile_out", log],
+                               check=True, capture_output=True)
+            with open(log) as fh:
+                records = [json.loads(line) for line in fh]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["tool"], "eightbit_filter")
+        self.assertEqual(set(records[0]["stages"]), {"decode", "quantize", "save"})
+
+    def test_profile_flag_takes_no_value(self):
+        from ascii_border.__main__ import parse_args
+
+        args = parse_args(["--profile", "in.png", "out.png"])
+        self.assertEqual((args.input, args.output, args.profile), ("in.png", "out.png", "-"))
+        args = parse_args(["--profile_out", "p.jsonl", "--profile", "in.png", "out.png"])
+        self.assertEqual((args.input, args.profile), ("in.png", "p.jsonl"))
+
+    def test_unwritable_profile_is_a_clean_error(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            Image.new("RGB", (120, 90), (200, 40, 40)).save(inp)
+            proc = subprocess.run(
+                [sys.executable, "-m", "eightbit_filter", inp, os.path.join(tmpdir, "out.png"),
+                 "--profile_out", os.path.join(tmpdir, "missing", "p.jsonl")],
+                capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn("Error writing profile", proc.stderr)
+        self.assertNotIn("Traceback", proc.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+if Image:
+    from asciiart_common.quantize import METHODS, SAMPLE_METHODS, quantize, sample_pixels
+    from eightbit_filter.core import quantize_8bit
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "samples", "input.png")
+
+
+def gradient(width=120, height=90):
+    x = np.linspace(0, 255, width, dtype=np.float64)[np.newaxis, :]
+    y = np.linspace(0, 255, height, dtype=np.float64)[:, np.newaxis]
+    rgb = np.stack(np.broadcast_arrays(x, y, (x + y) / 2), axis=-1)
+    return Image.fromarray(rgb.astype(np.uint8))
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestQuantize(unittest.TestCase):
+    """Every --method yields at most the requested colors."""
+
+    def test_methods_respect_color_count(self):
+        img = gradient()
+        for method in METHODS:
+            for colors in (2, 16, 64):
+                with self.subTest(method=method, colors=colors):
+                    out = quantize(img, colors, method)
+                    self.assertEqual(out.mode, "P")
+                    self.assertLessEqual(len(out.convert("RGB").getcolors(1 << 16)), colors)
+
+    def test_mediancut_matches_pillow(self):
+        img = gradient()
+        palette = img.quantize(colors=32, method=Image.MEDIANCUT)
+        self.assertIsNone(ImageChops.difference(
+            quantize_8bit(img, colors=32), palette.convert("RGB")).getbbox())
+        # Pillow only dithers when mapping to a given palette
+        dithered = img.quantize(palette=palette, dither=Image.FLOYDSTEINBERG).convert("RGB")
+        self.assertIsNone(ImageChops.difference(
+            quantize_8bit(img, colors=32, dither=True), dithered).getbbox())
+
+    def test_numpy_methods_are_exact_on_few_colors(self):
+        # Eight flat colors fit an 8-color palette exactly
+        rgb = np.zeros((40, 80, 3), dtype=np.uint8)
+        for i in range(8):
+            rgb[:, i * 10:(i + 1) * 10] = [(i & 1) * 200, (i >> 1 & 1) * 150, (i >> 2) * 100]
+        img = Image.fromarray(rgb)
+        for method in ("octree", "kmeans"):
+            with self.subTest(method=method):
+                out = np.asarray(quantize(img, 8, method).convert("RGB"))
+                np.testing.assert_array_equal(out, rgb)
+
+    def test_kmeans_is_deterministic(self):
+        img = gradient()
+        a = quantize(img, 16, "kmeans")
+        b = quantize(img, 16, "kmeans")
+        self.assertEqual(a.tobytes(), b.tobytes())
+        self.assertEqual(a.getpalette(), b.getpalette())
+
+    def test_sample_size_and_determinism(self):
+        img = gradient(400, 300)
+        for method in SAMPLE_METHODS:
+            with self.subTest(method=method):
+                sample = sample_pixels(img, 1200, method)
+                self.assertAlmostEqual(sample.width * sample.height, 1200, delta=60)
+                self.assertEqual(sample.tobytes(), sample_pixels(img, 1200, method).tobytes())
+        # A single row of band pixels is sampled along its length
+        row = img.resize((120000, 1))
+        self.assertEqual(sample_pixels(row, 1000).size, (1000, 1))
+        self.assertIs(sample_pixels(img, 10 ** 6), img)
+
+    def test_sampled_palette_is_close_to_full(self):
+        img = Image.open(SAMPLE_IMAGE).convert("RGB")
+        ref = np.asarray(img, dtype=np.float64)
+
+        def psnr(out):
+            mse = np.mean((np.asarray(out.convert("RGB"), dtype=np.float64) - ref) ** 2)
+            return 10 * np.log10(255.0 ** 2 / mse)
+
+        for method in METHODS:
+            full = psnr(quantize(img, 64, method))
+            for sample_method in SAMPLE_METHODS:
+                with self.subTest(method=method, sample_method=sample_method):
+                    out = quantize(img, 64, method, sample=1 << 15, sample_method=sample_method)
+                    self.assertLessEqual(len(out.getcolors(256)), 64)
+                    self.assertGreater(psnr(out), full - 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops, ImageDraw
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border_8bit.__main__ import build_parser
+    from ascii_border_8bit.core import render
+    from ascii_border_8bit.sequence import render_sequence
+
+
+def make_frames(count, width=180, height=150):
+    frames = []
+    for i in range(count):
+        img = Image.new("RGB", (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for x in range(width):
+            shade = int(x * 255 / (width - 1))
+            draw.line((x, 0, x, height), fill=(shade, (shade * 3) % 256, 255 - shade))
+        # A moving blob that crosses the border, and a frame-local flash
+        draw.ellipse((i * 20, 10, i * 20 + 40, 50), fill=(255, 30 * i, 0))
+        if i == 2:
+            draw.rectangle((width - 30, height - 30, width, height), fill=(0, 0, 0))
+        frames.append(img)
+    return frames
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestSequence(unittest.TestCase):
+    """--sequence renders each frame as a standalone --band_palette render would."""
+
+    argv = ["in", "out", "--border", "3", "--quant", "3", "--radius", "2",
+            "--colors", "16", "--color", "--no_glyph_cache"]
+
+    def test_frames_match_single_renders(self):
+        frames = make_frames(5)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, frame in enumerate(frames):
+                frame.save(os.path.join(tmpdir, f"frame{i}.png"))
+            out = os.path.join(tmpdir, "out.png")
+            args = build_parser().parse_args(self.argv + ["--sequence", "--fps", "20"])
+            render_sequence(os.path.join(tmpdir, "frame*.png"), out, args)
+            single = build_parser().parse_args(self.argv + ["--band_palette"])
+            with Image.open(out) as anim:
+                self.assertEqual(anim.n_frames, len(frames))
+                for i, frame in enumerate(frames):
+                    anim.seek(i)
+                    self.assertEqual(anim.info["duration"], 50)
+                    expected = render(frame, single)
+                    self.assertIsNone(
+                        ImageChops.difference(anim.convert("RGB"), expected).getbbox(), i)
+
+    def test_static_frames_are_reused(self):
+        frame = make_frames(1)[0]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            frames = os.path.join(tmpdir, "frames")
+            os.mkdir(frames)
+            for i in range(4):
+                frame.save(os.path.join(frames, f"{i}.png"))
+            args = build_parser().parse_args(
+                self.argv + ["--sequence", "--shared_palette"])
+            stats = render_sequence(frames, os.path.join(tmpdir, "out.gif"), args)
+            # Only the first frame draws the canvas and quantizes the band
+            self.assertEqual(stats["frames"], 4)
+            self.assertEqual(stats["rows_redrawn"], frame.height)
+            self.assertEqual(stats["strips_quantized"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border_8bit import render_composite
+    from asciiart_common.serve import make_server
+
+
+@unittest.skipUnless(Image, "Pillow is required for this test")
+class TestServe(unittest.TestCase):
+    """The render service answers over localhost and refuses work beyond its queue."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = make_server("ascii_border_8bit", port=0, workers=1, queue=0, quiet=True)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.service.close()
+
+    def post(self, data, options=None):
+        req = urllib.request.Request(f"{self.url}/render", data=data, method="POST")
+        if options is not None:
+            req.add_header("X-Options", json.dumps(options))
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def test_render_matches_library(self):
+        img = Image.new("RGB", (160, 120), (30, 140, 220))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        for _ in range(2):
+            status, body = self.post(buf.getvalue(), {"border": 3, "radius": 2})
+            self.assertEqual(status, 200)
+            with Image.open(io.BytesIO(body)) as out:
+                self.assertEqual(out.convert("RGB").tobytes(),
+                                 render_composite(img, border=3, radius=2).tobytes())
+        with urllib.request.urlopen(f"{self.url}/metrics", timeout=10) as resp:
+            metrics = resp.read().decode()
+        self.assertIn('asciiart_requests_total{status="200"}', metrics)
+        self.assertIn('asciiart_render_seconds_bucket{le="+Inf"}', metrics)
+        self.assertIn("asciiart_queue_depth 0", metrics)
+
+    def test_errors(self):
+        self.assertEqual(self.post(b"not an image")[0], 400)
+        self.assertEqual(self.post(b"x", {"bogus": 1})[0], 400)
+        self.assertEqual(self.post(b"x", {"stream": True})[0], 400)
+        buf = io.BytesIO()
+        Image.new("RGB", (160, 120)).save(buf, "PNG")
+        for options in ({"format": "tiff"}, {"match": "bogus"}, {"border": "5"}):
+            with self.subTest(options=options):
+                self.assertEqual(self.post(buf.getvalue(), options)[0], 400)
+
+    def test_path_options_are_refused(self):
+        service = self.server.service
+        for name in ("save_palette", "palette_from", "font", "glyph_cache", "mask_cache",
+                     "input_format"):
+            with self.subTest(option=name):
+                status, body = self.post(b"x", {name: "/tmp/asciiart-client-path"})
+                self.assertEqual(status, 400)
+                self.assertIn(b"cannot be set by a client", body)
+        # Refused before taking a slot
+        self.assertEqual(service.metrics.inflight, 0)
+        self.assertFalse(os.path.exists("/tmp/asciiart-client-path"))
+
+    def test_timed_out_render_keeps_its_slot(self):
+        service = self.server.service
+        timeout, service.timeout = service.timeout, 0.001
+        img = Image.new("RGB", (1600, 1200), (30, 140, 220))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        try:
+            status, _ = self.post(buf.getvalue(), {"border": 3})
+            self.assertEqual(status, 504)
+            # The render still runs: its slot is not free yet
+            self.assertEqual(self.post(b"x", {})[0], 503)
+        finally:
+            service.timeout = timeout
+        for _ in range(600):
+            if service.metrics.inflight == 0:
+                break
+            time.sleep(0.05)
+        self.assertEqual(service.metrics.inflight, 0)
+
+    def test_backpressure(self):
+        # Hold the only slot: the next request is refused at once
+        service = self.server.service
+        self.assertTrue(service.slots.acquire(blocking=False))
+        try:
+            status, _ = self.post(b"x", {})
+        finally:
+            service.slots.release()
+        self.assertEqual(status, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops, ImageDraw
+except ImportError:
+    Image = None
+
+if Image:
+    from asciiart_common.strips import open_reader, open_writer
+
+
+def make_pattern(width, height):
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for x in range(width):
+        shade = int(x * 255 / (width - 1))
+        draw.line((x, 0, x, height), fill=(shade, (shade * 3) % 256, 255 - shade))
+    draw.ellipse((0, 0, width, height), outline=(255, 0, 0))
+    draw.line((0, 0, width, height), fill=(255, 255, 0))
+    return img
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestStreaming(unittest.TestCase):
+    """--stream renders strip by strip with the same pixels as a full render."""
+
+    def test_reader_writer_round_trip(self):
+        img = make_pattern(131, 97)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for ext in ("bmp", "ppm", "tif", "png"):
+                with self.subTest(ext=ext):
+                    inp = os.path.join(tmpdir, f"in.{ext}")
+                    outp = os.path.join(tmpdir, f"out_{ext}.png")
+                    img.save(inp)
+                    with open_reader(inp) as reader:
+                        self.assertEqual(reader.streaming, ext != "png")
+                        writer = open_writer(outp, reader.size)
+                        for y0 in range(0, 97, 10):
+                            writer.write(reader.read(y0, min(97, y0 + 10)))
+                        writer.close()
+                    with Image.open(outp) as out:
+                        self.assertIsNone(ImageChops.difference(out.convert("RGB"), img).getbbox())
+
+    def run_tool(self, *cmd):
+        subprocess.run([sys.executable, "-m"] + list(cmd), check=True, capture_output=True)
+
+    def test_ascii_border_stream_matches_full_render(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.bmp")
+            make_pattern(213, 187).save(inp)
+            full = os.path.join(tmpdir, "full.png")
+            strip = os.path.join(tmpdir, "strip.png")
+            for match in ("ramp", "shape"):
+                with self.subTest(match=match):
+                    opts = ["--border", "4", "--fade", "2", "--color", "--no_glyph_cache",
+                            "--match", match]
+                    self.run_tool("ascii_border", inp, full, *opts)
+                    # Strips of a single cell row exercise glyphs overhanging strips
+                    self.run_tool("ascii_border", inp, strip, "--stream", "--strip_rows", "1",
+                                  *opts)
+                    with Image.open(full) as a, Image.open(strip) as b:
+                        self.assertIsNone(
+                            ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox())
+
+    def test_8bit_stream_matches_band_palette(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.ppm")
+            make_pattern(213, 187).save(inp)
+            full = os.path.join(tmpdir, "full.png")
+            strip = os.path.join(tmpdir, "strip.png")
+            opts = ["--border", "3", "--quant", "3", "--radius", "2", "--colors", "8",
+                    "--color", "--no_glyph_cache"]
+            self.run_tool("ascii_border_8bit", inp, full, "--band_palette", *opts)
+            self.run_tool("ascii_border_8bit", inp, strip, "--stream", "--strip_rows", "2", *opts)
+            with Image.open(full) as a, Image.open(strip) as b:
+                self.assertIsNone(ImageChops.difference(a.convert("RGB"), b.convert("RGB")).getbbox())
+
+
+# Peak resident growth of a --max_memory render, in bytes per pixel, measured
+# in a fresh interpreter after resetting the kernel's high-water mark
+PEAK_RSS_SCRIPT = """
+import sys
+from PIL import Image
+from ascii_border_8bit import render_composite
+from ascii_border_8bit.core import render
+from ascii_border_8bit.__main__ import build_parser
+def hwm():
+    with open("/proc/self/status") as fh:
+        return next(int(l.split()[1]) * 1024 for l in fh if l.startswith("VmHWM"))
+img = Image.radial_gradient("L").resize((2400, 2400)).convert("RGB")
+render_composite(img.resize((320, 240)), border=2, quant=2)  # load the font and glyphs
+args = build_parser().parse_args(["in", "out"] + sys.argv[1:])
+try:
+    with open("/proc/self/clear_refs", "w") as fh:
+        fh.write("5")
+except OSError:
+    sys.exit(3)
+base = hwm()
+render(img, args, inplace=True)
+print((hwm() - base) / (img.width * img.height))
+"""
+
+
+# Peak resident growth, in bytes per pixel, of reading every strip of the
+# image file argv[1], measured as PEAK_RSS_SCRIPT does
+READER_RSS_SCRIPT = """
+import sys
+from asciiart_common.strips import open_reader
+def hwm():
+    with open("/proc/self/status") as fh:
+        return next(int(l.split()[1]) * 1024 for l in fh if l.startswith("VmHWM"))
+try:
+    with open("/proc/self/clear_refs", "w") as fh:
+        fh.write("5")
+except OSError:
+    sys.exit(3)
+base = hwm()
+with open_reader(sys.argv[1]) as reader:
+    width, height = reader.size
+    for y0 in range(0, height, 64):
+        reader.read(y0, min(height, y0 + 64))
+print((hwm() - base) / (width * height))
+"""
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestReaderMemory(unittest.TestCase):
+    """Inputs that must be decoded in full are held as one RGB image."""
+
+    def test_png_input_keeps_one_full_image(self):
+        if not os.path.exists("/proc/self/clear_refs"):
+            self.skipTest("peak resident size needs /proc/self/clear_refs")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            Image.radial_gradient("L").resize((2400, 2400)).convert("RGB").save(
+                inp, compress_level=1)
+            proc = subprocess.run([sys.executable, "-c", READER_RSS_SCRIPT, inp],
+                                  capture_output=True, text=True)
+        if proc.returncode == 3:
+            self.skipTest("/proc/self/clear_refs is not writable")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        # Pillow keeps RGB in 4 bytes per pixel: one decoded image, no copy
+        self.assertLess(float(proc.stdout), 6.0)
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestLowMemory(unittest.TestCase):
+    """--max_memory composites strip by strip into one buffer."""
+
+    def setUp(self):
+        self.img = make_pattern(613, 487)
+
+    def test_matches_full_render_with_fixed_palette(self):
+        from ascii_border_8bit import render_composite
+        from asciiart_common.palette import save_palette
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            palette = os.path.join(tmpdir, "palette.txt")
+            save_palette(palette, [(0, 0, 0), (255, 255, 255), (255, 0, 0), (0, 0, 255),
+                                   (255, 255, 0), (0, 128, 0)])
+            for opts in [{"palette_from": palette, "radius": 3, "color": True},
+                         {"palette_from": palette, "dither": "ordered", "fade_ascii": 0,
+                          "quant": 4, "strip_rows": 3}]:
+                with self.subTest(opts=opts):
+                    full = render_composite(self.img, opts)
+                    low = render_composite(self.img, opts, max_memory=0)
+                    self.assertIsNone(ImageChops.difference(full, low).getbbox())
+
+    def test_budget_selects_strips(self):
+        from ascii_border_8bit.__main__ import build_parser
+        from ascii_border_8bit.stream import full_render_bytes, low_memory
+
+        args = build_parser().parse_args(["in", "out", "--band_palette"])
+        self.assertFalse(low_memory(args, self.img.size))
+        need = full_render_bytes(self.img.size, args)
+        args.max_memory = need // (1024 * 1024) + 1
+        self.assertFalse(low_memory(args, self.img.size))
+        args.max_memory = need // (1024 * 1024) - 1
+        self.assertTrue(low_memory(args, self.img.size))
+        # Strips would change the pixels of these
+        args.dither = True
+        self.assertFalse(low_memory(args, self.img.size))
+        args.dither, args.band_palette = False, False
+        self.assertFalse(low_memory(args, self.img.size))
+
+    def test_budget_keeps_pixels(self):
+        from ascii_border_8bit import render_composite
+
+        for opts in [{}, {"band_palette": True}, {"band_palette": True, "dither": True},
+                     {"band_palette": True, "dither_mode": "bluenoise", "palette_sample": 5000}]:
+            with self.subTest(opts=opts):
+                full = render_composite(self.img, opts)
+                low = render_composite(self.img, opts, max_memory=0)
+                self.assertIsNone(ImageChops.difference(full, low).getbbox())
+
+    def test_peak_memory_within_budget(self):
+        import tracemalloc
+
+        from ascii_border_8bit import render_composite
+
+        decoded = self.img.width * self.img.height * 3
+        opts = {"border": 4, "quant": 6, "band_palette": True, "max_memory": 0}
+        render_composite(self.img, opts)
+        # Python and NumPy allocations, traced: grid-sized masks, one strip
+        # and the 8-bit band pixels the palette is learned from
+        tracemalloc.start()
+        try:
+            render_composite(self.img, opts)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, decoded)
+        # Pillow's own buffers are not traced: check the resident high-water
+        # mark where the kernel can reset it
+        if not os.path.exists("/proc/self/clear_refs"):
+            self.skipTest("peak resident size needs /proc/self/clear_refs")
+        growth = {}
+        for opts in ([], ["--band_palette", "--max_memory", "0"]):
+            proc = subprocess.run([sys.executable, "-c", PEAK_RSS_SCRIPT] + opts,
+                                  capture_output=True, text=True)
+            if proc.returncode == 3:
+                self.skipTest("/proc/self/clear_refs is not writable")
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            growth[bool(opts)] = float(proc.stdout)
+        # Decoded RGB is 3 bytes per pixel: stay within about twice that
+        # besides the image itself, well below the one-pass render
+        self.assertLess(growth[True], 6.0)
+        self.assertGreater(growth[False], 2 * growth[True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border.text import cell_grid, grid_lines, grid_size
+    from asciiart_common.errors import RenderError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestTextOutput(unittest.TestCase):
+    """The text outputs map cells through the ramp without rasterizing."""
+
+    def setUp(self):
+        # One gray level per cell column, the first of each ramp step
+        gray = -(-np.arange(10) * 255 // 9)
+        self.img = Image.fromarray(np.tile(gray.astype(np.uint8), (2, 1))).convert("RGB")
+
+    def test_grid_size(self):
+        self.assertEqual(grid_size((800, 600), (8, 16)), (100, 37))
+        self.assertEqual(grid_size((800, 600), (8, 16), columns=40), (40, 15))
+        with self.assertRaises(RenderError):
+            grid_size((4, 4), (8, 16))
+
+    def test_gradient_follows_ramp(self):
+        chars = "@%#*+=-:. "
+        lines, colors = cell_grid(self.img, (10, 2), chars)
+        self.assertIsNone(colors)
+        self.assertEqual(lines, [chars, chars])
+        self.assertEqual("".join(grid_lines(lines, None, "text")), f"{chars}\n{chars}\n")
+
+    def test_ansi_and_html_color_runs(self):
+        lines, colors = cell_grid(self.img, (10, 1), "<&>  ", color=True)
+        ansi = "".join(grid_lines(lines, colors, "ansi"))
+        self.assertEqual(ansi.count("\x1b[38;2;"), 10)
+        self.assertTrue(ansi.startswith("\x1b[38;2;0;0;0m<"))
+        self.assertTrue(ansi.endswith("\x1b[0m\n"))
+        page = "".join(grid_lines(lines, colors, "html"))
+        self.assertIn('<span style="color:#000000">&lt;</span>', page)
+        self.assertIn("&amp;", page)
+        self.assertTrue(page.rstrip().endswith("</html>"))
+        # A single color is one run per line
+        lines, colors = cell_grid(Image.new("RGB", (40, 16), (9, 8, 7)), (4, 2), "@ ", True)
+        self.assertEqual("".join(grid_lines(lines, colors, "ansi")),
+                         "\x1b[38;2;9;8;7m@@@@\x1b[0m\n" * 2)
+
+    def test_cli_writes_stdout_without_output_image(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inp = os.path.join(tmpdir, "in.png")
+            self.img.resize((400, 300), Image.NEAREST).save(inp)
+            result = subprocess.run(
+                [sys.executable, "-m", "ascii_border", inp, "--text-out", "-", "--columns", "25"],
+                check=True, capture_output=True, text=True, cwd=ROOT)
+            lines = result.stdout.splitlines()
+            self.assertTrue(lines)
+            self.assertTrue(all(len(line) == 25 for line in lines))
+            self.assertEqual(os.listdir(tmpdir), ["in.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()
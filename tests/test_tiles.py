@@ -0,0 +1,69 @@
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+if Image:
+    from ascii_border import render_ascii_border
+    from ascii_border.masks import border_mask
+    from ascii_border.tiles import cell_bands, composite_bands, upscale_nearest
+    from ascii_border_8bit import render_composite
+    from ascii_border_8bit.masks import region_masks
+    from asciiart_common.errors import RenderError
+
+
+@unittest.skipUnless(Image, "Pillow and NumPy are required for this test")
+class TestTiles(unittest.TestCase):
+    """Band-parallel rendering must be bit-identical to the single-threaded path."""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.img = Image.fromarray(rng.integers(0, 256, (241, 319, 3), dtype=np.uint8))
+
+    def test_cell_bands_cover_height_in_whole_cells(self):
+        self.assertEqual(cell_bands(100, 7, 1), [(0, 100)])
+        for threads in (2, 3, 8, 64):
+            bands = cell_bands(100, 7, threads)
+            self.assertEqual(bands[0][0], 0)
+            self.assertEqual(bands[-1][1], 100)
+            for (_, y1), (y0, _) in zip(bands, bands[1:]):
+                self.assertEqual(y1, y0)
+                self.assertEqual(y0 % 7, 0)
+
+    def test_upscale_and_composite_match_pillow(self):
+        size = (157, 123)
+        cell_mask = border_mask(22, 15, 4, 2)
+        bands = cell_bands(size[1], 8, 3)
+        mask = upscale_nearest(cell_mask, size, bands, 3)
+        self.assertEqual(mask.tobytes(), cell_mask.resize(size, Image.NEAREST).tobytes())
+        fg = self.img.crop((0, 0) + size)
+        bg = self.img.transpose(Image.ROTATE_180).crop((0, 0) + size)
+        expected = Image.composite(fg, bg, mask)
+        actual = composite_bands(fg, bg.copy(), mask, [(0, 0) + size], bands, 3)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test_threads_render_identically(self):
+        cases = [
+            (render_ascii_border, {"border": 5, "fade": 2, "color": True}),
+            (render_composite, {"border": 3, "quant": 3, "radius": 2, "color": True}),
+            (render_composite,
+             {"border": 2, "quant": 4, "band_palette": True, "dither": "ordered"}),
+        ]
+        for render, options in cases:
+            options = dict(options, mask_cache_mb=0)
+            expected = render(self.img, options).tobytes()
+            for threads in (2, 5):
+                with self.subTest(render=render.__name__, options=options, threads=threads):
+                    actual = render(self.img, options, threads=threads)
+                    self.assertEqual(actual.tobytes(), expected)
+
+    def test_negative_threads_is_an_error(self):
+        with self.assertRaises(RenderError):
+            render_ascii_border(self.img, threads=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()